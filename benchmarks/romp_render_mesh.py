@@ -0,0 +1,100 @@
+"""
+Time ROMP with and without mesh rendering.
+
+Compares the verts-only settings used by the API (ROMP_RENDER_MESH=False)
+with the rendered overlay (--render_mesh), for the in-process engine and,
+optionally, for the romp CLI as run by the subprocess backend.
+
+Usage:
+    python benchmarks/romp_render_mesh.py -i IMG20250908193054.jpg --runs 10 --cli
+"""
+
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from typing import Callable, List
+
+import cv2
+import numpy as np
+import torch
+
+VERTS_ONLY_ARGS = ["--mode=image"]
+RENDER_ARGS = ["--mode=image", "--render_mesh"]
+
+
+def time_runs(fn: Callable[[], object], runs: int, warmup: int) -> List[float]:
+    """Wall time in seconds of every run after the warmup runs"""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name: str, times: List[float], baseline: List[float] = None) -> None:
+    median = statistics.median(times)
+    line = f"{name:<28} median {median * 1000:9.1f} ms   mean {statistics.mean(times) * 1000:9.1f} ms"
+    if baseline is not None:
+        saved = statistics.median(baseline) - median
+        line += f"   saved {saved * 1000:8.1f} ms ({saved / statistics.median(baseline):.0%})"
+    print(line)
+
+
+def bench_engine(image: np.ndarray, runs: int, warmup: int) -> None:
+    import romp
+
+    results = {}
+    for name, args in (("engine --render_mesh", RENDER_ARGS), ("engine verts only", VERTS_ONLY_ARGS)):
+        model = romp.ROMP(romp.romp_settings(input_args=args))
+        with torch.no_grad():
+            outputs = model(image)
+        assert outputs is not None and "verts" in outputs, "ROMP found no person in the image"
+        with torch.no_grad():
+            results[name] = time_runs(lambda: model(image), runs, warmup)
+        del model
+
+    report("engine --render_mesh", results["engine --render_mesh"])
+    report("engine verts only", results["engine verts only"], results["engine --render_mesh"])
+
+
+def bench_cli(image_path: str, runs: int, warmup: int) -> None:
+    from romp_pipeline.api.services.romp_service import ROMPService
+
+    command = ROMPService()._resolve_command_path()
+    if not command:
+        print("romp CLI not found, skipping the subprocess benchmark")
+        return
+
+    results = {}
+    for name, args in (("cli --render_mesh", RENDER_ARGS), ("cli verts only", VERTS_ONLY_ARGS)):
+        with tempfile.TemporaryDirectory() as output_dir:
+            romp_cmd = command + args + [f"-i={image_path}", f"-o={output_dir}"]
+            results[name] = time_runs(lambda: subprocess.run(romp_cmd, check=True, capture_output=True),
+                                      runs, warmup)
+
+    report("cli --render_mesh", results["cli --render_mesh"])
+    report("cli verts only", results["cli verts only"], results["cli --render_mesh"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ROMP with and without mesh rendering")
+    parser.add_argument("-i", "--input", type=str, required=True, help="Path to an image with a person")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per setting")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs per setting")
+    parser.add_argument("--cli", action="store_true", help="Also time the romp CLI (one process per run)")
+    args = parser.parse_args()
+
+    image = cv2.imread(args.input)
+    if image is None:
+        raise SystemExit(f"Could not read image {args.input}")
+
+    print(f"ROMP on {args.input} ({image.shape[1]}x{image.shape[0]}), "
+          f"{'GPU' if torch.cuda.is_available() else 'CPU'}, {args.runs} runs")
+    bench_engine(image, args.runs, args.warmup)
+    if args.cli:
+        bench_cli(args.input, args.runs, args.warmup)
@@ -1,4 +1,5 @@
-from typing import List, Union
+from pathlib import Path
+from typing import List, Optional, Union
 from pydantic import AnyHttpUrl, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -30,10 +31,81 @@ class Settings(BaseSettings):
     # File Upload Limits
     MAX_UPLOAD_SIZE_BYTES: int = 20 * 1024 * 1024  # 20 MB
     
+    # ROMP backend: "engine" keeps the model loaded in-process,
+    # "subprocess" runs the romp CLI per request (also the fallback)
+    ROMP_BACKEND: str = "engine"
+    # Render the mesh overlay image, not needed for measurements
+    ROMP_RENDER_MESH: bool = False
+    
+    # RAM-backed scratch directories for the romp subprocess
+    SCRATCH_DIR: str = "/dev/shm/romp_pipeline"
+    SCRATCH_POOL_SIZE: int = 4
+    
+    # Per-stage concurrency limits
+    DOWNLOAD_CONCURRENCY: int = 16  # image downloads in flight
+    ROMP_CONCURRENCY: int = 1  # ROMP inference workers (engine threads or romp processes)
+    ROMP_QUEUE_SIZE: int = 16  # requests waiting for a ROMP worker, 429 beyond that
+    MEASUREMENT_WORKERS: int = 4  # threads measuring SMPL meshes
+    
+    # Micro-batching of the ROMP engine: images arriving within the window
+    # run as one batched forward pass; the engine gets up to
+    # ROMP_CONCURRENCY * ROMP_BATCH_MAX_SIZE inference workers to fill them
+    ROMP_BATCH_WINDOW_MS: float = 20.0
+    ROMP_BATCH_MAX_SIZE: int = 8
+    
+    # Adaptive admission control of /measure
+    ADMISSION_CONTROL: bool = True
+    LATENCY_TARGET_P95_MS: float = 20000.0  # end-to-end p95 latency target
+    QUEUE_SOJOURN_TARGET_MS: float = 5000.0  # standing ROMP queue wait target
+    ADMISSION_INTERVAL_MS: float = 1000.0  # how often the limit is adjusted
+    
+    # /measure/video
+    VIDEO_MAX_UPLOAD_SIZE_BYTES: int = 200 * 1024 * 1024  # 200 MB
+    VIDEO_MAX_FRAMES: int = 900  # sampled frames measured per video
+    
+    # /measure/batch
+    MEASURE_BATCH_MAX_UPLOAD_SIZE_BYTES: int = 200 * 1024 * 1024  # whole request, each image keeps MAX_UPLOAD_SIZE_BYTES
+    MEASURE_BATCH_MAX_ITEMS: int = 256
+    MEASURE_BATCH_CONCURRENCY: int = 8  # images of one batch in flight, one engine batch by default
+    MEASURE_BATCH_MAX_WAIT_S: float = 60.0  # an image waits out a full ROMP queue this long, then fails with 429
+    
     # Timeouts (seconds)
     DOWNLOAD_TIMEOUT: int = 20
     ROMP_TIMEOUT: int = 60
     
+    # /measure/shape request coalescing
+    SHAPE_BATCH_WINDOW_MS: float = 2.0
+    SHAPE_BATCH_MAX_SIZE: int = 256
+    
+    # /measure result cache, keyed by the SHA-256 of the image
+    RESULT_CACHE_SIZE: int = 4096  # entries kept in memory, 0 disables the memory tier
+    RESULT_CACHE_DIR: Optional[str] = None  # on-disk tier, disabled when unset
+    RESULT_CACHE_TTL_S: int = 7 * 24 * 3600
+    
+    # Store of ROMP output verts for re-measurement, disabled when unset
+    VERTS_STORE_DIR: Optional[str] = None
+    VERTS_STORE_MAX_MB: int = 2048
+    VERTS_STORE_DTYPE: str = "float32"  # float16 halves the size but moves slice-based circumferences
+    
+    # Asynchronous /jobs, persisted in SQLite so they survive a restart;
+    # opened at startup, kept out of the source tree by default
+    JOBS_DB_PATH: str = str(Path.home() / ".romp_pipeline" / "jobs.db")
+    JOBS_CONCURRENCY: int = 4  # jobs holding a place in the ROMP queue at once
+    JOBS_MAX_PENDING: int = 1000  # unfinished jobs, 429 beyond that
+    JOBS_MAX_WAIT_S: float = 600.0  # a job waits out a full ROMP queue this long, then fails
+    JOBS_RETENTION_S: int = 24 * 3600  # finished jobs are deleted after this
+    JOBS_SSE_KEEPALIVE_S: float = 15.0
+    
+    # Work queue between /measure (and /jobs) and the ROMP and measurement
+    # stages: memory://, sqlite:///path/to/queue.db or redis://host:6379/0.
+    # Unset runs the stages in the API process. Workers on other nodes are
+    # started with `romp-worker`; with memory:// the API consumes the queue
+    WORK_QUEUE_URL: Optional[str] = None
+    WORK_QUEUE_NAME: str = "romp"  # key prefix on the broker
+    WORK_QUEUE_TIMEOUT_S: float = 120.0  # how long the API waits for a worker
+    WORK_QUEUE_MAX_WAITING: int = 64  # API threads waiting for worker results
+    WORK_QUEUE_WORKER_CONCURRENCY: Optional[int] = None  # items per worker at once, default its inference workers
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
@@ -1,14 +1,61 @@
 import logging
 from logging import Logger
+from typing import AsyncIterator, Optional
 
+from fastapi import Request
+
+from romp_pipeline.core.assets import measurement_definitions_version
 from romp_pipeline.api.services.romp_service import ROMPService
 from romp_pipeline.api.services.image_service import ImageService
 from romp_pipeline.api.services.measurement_service import MeasurementService
+from romp_pipeline.api.services.shape_service import ShapeService
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.admission_control import AdmissionController
+from romp_pipeline.api.services.result_cache import ResultCache
+from romp_pipeline.api.services.verts_store import VertsStore
+from romp_pipeline.api.services.single_flight import SingleFlight
+from romp_pipeline.api.services.video_service import VideoService
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+from romp_pipeline.api.services.job_store import JobStore
+from romp_pipeline.api.services.job_service import JobService
+from romp_pipeline.api.services.work_queue import WorkQueue, create_work_queue
+from romp_pipeline.api.services.queue_worker import QueueWorker
+from romp_pipeline.api.services.batch_service import BatchService
+from romp_pipeline.api.config import settings
 
 # Singleton instances
 _romp_service = ROMPService()
 _image_service = ImageService()
 _measurement_service = MeasurementService()
+_shape_service = ShapeService(_measurement_service)
+_result_cache = ResultCache(settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_DIR,
+                            settings.RESULT_CACHE_TTL_S, measurement_definitions_version("smpl"))
+_verts_store = (VertsStore(settings.VERTS_STORE_DIR, settings.VERTS_STORE_MAX_MB * 1024 * 1024,
+                           settings.VERTS_STORE_DTYPE)
+                if settings.VERTS_STORE_DIR else None)
+_single_flight = SingleFlight()
+_admission_controller = AdmissionController(
+    min_limit=settings.ROMP_CONCURRENCY,
+    max_limit=settings.ROMP_CONCURRENCY + settings.ROMP_QUEUE_SIZE,
+    latency_target_s=settings.LATENCY_TARGET_P95_MS / 1000,
+    sojourn_target_s=settings.QUEUE_SOJOURN_TARGET_MS / 1000,
+    interval_s=settings.ADMISSION_INTERVAL_MS / 1000,
+    enabled=settings.ADMISSION_CONTROL
+)
+_inference_scheduler = InferenceScheduler(settings.ROMP_CONCURRENCY, settings.ROMP_QUEUE_SIZE,
+                                          on_wait=_admission_controller.observe_sojourn)
+_video_service = VideoService(_romp_service, _measurement_service, _inference_scheduler)
+_work_queue = create_work_queue(settings.WORK_QUEUE_URL, settings.WORK_QUEUE_NAME,
+                                settings.WORK_QUEUE_TIMEOUT_S)
+_measure_pipeline = MeasurePipeline(_image_service, _romp_service, _measurement_service,
+                                    _inference_scheduler, _result_cache, _verts_store, _single_flight,
+                                    _work_queue)
+_batch_service = BatchService(_image_service, _measure_pipeline, settings.MEASURE_BATCH_CONCURRENCY,
+                              settings.MEASURE_BATCH_MAX_WAIT_S)
+_queue_worker = QueueWorker(_work_queue, _measure_pipeline) if _work_queue is not None else None
+_job_service = JobService(JobStore(settings.JOBS_DB_PATH, settings.JOBS_RETENTION_S),
+                          _measure_pipeline, _inference_scheduler,
+                          settings.JOBS_CONCURRENCY, settings.JOBS_MAX_PENDING, settings.JOBS_MAX_WAIT_S)
 
 def get_logger() -> Logger:
     """
@@ -28,3 +75,63 @@ def get_image_service() -> ImageService:
 def get_measurement_service() -> MeasurementService:
     """Get Measurement service instance"""
     return _measurement_service
+
+def get_shape_service() -> ShapeService:
+    """Get Shape service instance"""
+    return _shape_service
+
+def get_inference_scheduler() -> InferenceScheduler:
+    """Get ROMP inference scheduler instance"""
+    return _inference_scheduler
+
+def get_result_cache() -> ResultCache:
+    """Get result cache instance"""
+    return _result_cache
+
+def get_verts_store() -> Optional[VertsStore]:
+    """Get verts store instance, None when not configured"""
+    return _verts_store
+
+def get_single_flight() -> SingleFlight:
+    """Get single-flight de-duplication of /measure"""
+    return _single_flight
+
+def get_video_service() -> VideoService:
+    """Get Video service instance"""
+    return _video_service
+
+def get_measure_pipeline() -> MeasurePipeline:
+    """Get the /measure pipeline instance"""
+    return _measure_pipeline
+
+def get_batch_service() -> BatchService:
+    """Get Batch service instance"""
+    return _batch_service
+
+def get_work_queue() -> Optional[WorkQueue]:
+    """Get work queue instance, None when the stages run in the API process"""
+    return _work_queue
+
+def get_queue_worker() -> Optional[QueueWorker]:
+    """Get the consumer of the work queue, None without a work queue"""
+    return _queue_worker
+
+def get_job_service() -> JobService:
+    """Get Job service instance"""
+    return _job_service
+
+def get_admission_controller() -> AdmissionController:
+    """Get admission controller instance"""
+    return _admission_controller
+
+async def admit_request(request: Request) -> AsyncIterator[None]:
+    """
+    Admit a request through the admission controller, or shed it with 503.
+    RequestMiddleware reports the request latency back to the controller.
+    """
+    _admission_controller.acquire()
+    request.state.admission_controller = _admission_controller
+    try:
+        yield
+    finally:
+        _admission_controller.release()
@@ -1,15 +1,18 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from typing import Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
 class APIException(Exception):
     """Base class for API exceptions"""
-    def __init__(self, message: str, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+    def __init__(self, message: str, status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
+                 headers: Optional[Dict[str, str]] = None):
         self.message = message
         self.status_code = status_code
+        self.headers = headers
         super().__init__(self.message)
 
 class ROMPNotAvailableError(APIException):
@@ -17,6 +20,12 @@ class ROMPNotAvailableError(APIException):
     def __init__(self):
         super().__init__("ROMP is not installed or not available", status.HTTP_503_SERVICE_UNAVAILABLE)
 
+class VideoNotSupportedError(APIException):
+    """Raised when a video is sent while ROMP runs as a subprocess"""
+    def __init__(self):
+        super().__init__("Video measurement requires the in-process ROMP engine (ROMP_BACKEND=engine)",
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+
 class ImageDownloadError(APIException):
     """Raised when image download fails"""
     def __init__(self, detail: str):
@@ -27,6 +36,31 @@ class ImageValidationError(APIException):
     def __init__(self, detail: str):
         super().__init__(f"Invalid image: {detail}", status.HTTP_400_BAD_REQUEST)
 
+class PayloadTooLargeError(APIException):
+    """Raised when an image or request body exceeds MAX_UPLOAD_SIZE_BYTES"""
+    def __init__(self, limit_bytes: int):
+        super().__init__(f"Payload too large (>{limit_bytes / 1024 / 1024}MB)", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+class BatchValidationError(APIException):
+    """Raised when a /measure/batch request is invalid as a whole"""
+    def __init__(self, detail: str):
+        super().__init__(f"Invalid batch: {detail}", status.HTTP_400_BAD_REQUEST)
+
+class VertsValidationError(APIException):
+    """Raised when an uploaded vertex array is malformed"""
+    def __init__(self, detail: str):
+        super().__init__(f"Invalid vertices: {detail}", status.HTTP_400_BAD_REQUEST)
+
+class VertsStoreDisabledError(APIException):
+    """Raised when the verts store is used but not configured"""
+    def __init__(self):
+        super().__init__("Verts store is not enabled (set VERTS_STORE_DIR)", status.HTTP_404_NOT_FOUND)
+
+class JobNotFoundError(APIException):
+    """Raised when a job id is unknown or expired"""
+    def __init__(self, job_id: str):
+        super().__init__(f"Job not found: {job_id}", status.HTTP_404_NOT_FOUND)
+
 class MeasurementExtractionError(APIException):
     """Raised when measurement extraction fails"""
     def __init__(self, detail: str):
@@ -37,12 +71,30 @@ class ROMPProcessingError(APIException):
     def __init__(self, detail: str):
         super().__init__(f"ROMP processing failed: {detail}", status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class ServiceOverloadedError(APIException):
+    """Raised when the inference queue is full"""
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, retry later", status.HTTP_429_TOO_MANY_REQUESTS,
+                         headers={"Retry-After": str(retry_after)})
+
+class LoadSheddingError(APIException):
+    """Raised when admission control sheds a request under overload"""
+    def __init__(self, retry_after: int):
+        super().__init__("Server overloaded, request shed", status.HTTP_503_SERVICE_UNAVAILABLE,
+                         headers={"Retry-After": str(retry_after)})
+
+class WorkQueueTimeoutError(APIException):
+    """Raised when no worker finishes a queued image in time"""
+    def __init__(self, timeout_s: float):
+        super().__init__(f"No worker finished the request within {timeout_s:g}s", status.HTTP_504_GATEWAY_TIMEOUT)
+
 async def api_exception_handler(request: Request, exc: APIException):
     """Handle custom API exceptions"""
     logger.error(f"API Exception: {exc.message} (Status: {exc.status_code})")
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.message}
+        content={"detail": exc.message},
+        headers=exc.headers
     )
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
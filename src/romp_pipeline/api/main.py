@@ -5,15 +5,22 @@ from fastapi.exceptions import RequestValidationError
 
 from romp_pipeline.api.config import settings
 from romp_pipeline.api.logging_config import setup_logging
-from romp_pipeline.api.middleware import RequestMiddleware
-from romp_pipeline.api.routers import measurement, health
+from romp_pipeline.api.middleware import RequestMiddleware, BodySizeLimitMiddleware
+from romp_pipeline.api.routers import measurement, jobs, health
 from romp_pipeline.api.exceptions import (
     APIException, 
     api_exception_handler, 
     validation_exception_handler,
     general_exception_handler
 )
-from romp_pipeline.api.dependencies import get_romp_service
+from romp_pipeline.api.dependencies import (
+    get_admission_controller,
+    get_job_service,
+    get_shape_service,
+    get_work_queue,
+    get_queue_worker
+)
+from romp_pipeline.api.startup import start_inference, stop_inference
 
 # Setup logging
 logger = setup_logging()
@@ -25,16 +32,29 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("Starting up ROMP API...")
-    romp_service = get_romp_service()
-    if romp_service.check_availability():
-        logger.info("ROMP is available")
-    else:
-        logger.warning("ROMP command not found! API will be degraded.")
+    work_queue = get_work_queue()
+    shared_queue = work_queue is not None and work_queue.shared
+    # with a shared queue /measure runs on the romp-worker processes, which hold the engine
+    scheduler = start_inference(logger, load_engine=not shared_queue)
+    get_admission_controller().set_limits(scheduler.workers, scheduler.workers + scheduler.queue_size)
+    
+    queue_worker = get_queue_worker()
+    if queue_worker is not None and not shared_queue:
+        # nobody else can reach an in-memory queue
+        queue_worker.start(settings.WORK_QUEUE_WORKER_CONCURRENCY or scheduler.workers, logger)
+    
+    job_service = get_job_service()
+    await job_service.start(logger)
         
     yield
     
     # Shutdown
     logger.info("Shutting down ROMP API...")
+    await job_service.stop()
+    await get_shape_service().stop()
+    if queue_worker is not None:
+        await queue_worker.stop()
+    await stop_inference()
 
 def create_app() -> FastAPI:
     """
@@ -55,6 +75,7 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(BodySizeLimitMiddleware)
     app.add_middleware(RequestMiddleware)
 
     # Exception Handlers
@@ -64,6 +85,7 @@ def create_app() -> FastAPI:
 
     # Routers
     app.include_router(measurement.router, tags=["measurements"])
+    app.include_router(jobs.router, tags=["jobs"])
     app.include_router(health.router, tags=["health"])
 
     return app
@@ -2,7 +2,13 @@ import time
 import uuid
 import logging
 from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import PayloadTooLargeError
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +43,14 @@ class RequestMiddleware(BaseHTTPMiddleware):
             # Calculate duration
             process_time = (time.time() - start_time) * 1000
             
+            # Feed admission control with the latency of admitted requests.
+            # A streamed body (/measure/batch) is still being produced here and
+            # takes as long as its batch, so it is left out; its images are
+            # seen through the sojourn times of the ROMP queue.
+            admission_controller = getattr(request.state, "admission_controller", None)
+            if admission_controller is not None and "content-length" in response.headers:
+                admission_controller.observe_latency(process_time / 1000)
+            
             # Log response
             logger.info(
                 f"Response: {response.status_code} "
@@ -55,3 +69,77 @@ class RequestMiddleware(BaseHTTPMiddleware):
                 extra={"correlation_id": correlation_id}
             )
             raise
+
+class BodySizeLimitMiddleware:
+    """
+    Cap the request body at the upload limit while it is received.
+
+    A declared Content-Length over the limit is rejected before any of the
+    body is read. Every other body, chunked ones included, is counted as it
+    arrives and cut off with a 413 as soon as it passes the limit, before
+    Starlette has spooled the rest of it.
+    """
+    # room for the multipart boundaries and the other form fields
+    MULTIPART_OVERHEAD = 64 * 1024
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _limit(path: str) -> int:
+        if path.endswith("/measure/video"):
+            return settings.VIDEO_MAX_UPLOAD_SIZE_BYTES
+        if path.endswith("/measure/batch"):
+            return settings.MEASURE_BATCH_MAX_UPLOAD_SIZE_BYTES
+        return settings.MAX_UPLOAD_SIZE_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit(scope["path"])
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit():
+            if int(content_length) > limit + self.MULTIPART_OVERHEAD:
+                await self._reject(limit, scope, receive, send)
+                return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit + self.MULTIPART_OVERHEAD:
+                    exceeded = True
+                    raise PayloadTooLargeError(limit)
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # whatever the app answers to the cut-off body is replaced by the 413
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # the parser may wrap the error or fail on the truncated body
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await self._reject(limit, scope, receive, send)
+
+    @staticmethod
+    async def _reject(limit: int, scope: Scope, receive: Receive, send: Send) -> None:
+        error = PayloadTooLargeError(limit)
+        response = JSONResponse(status_code=error.status_code, content={"detail": error.message})
+        await response(scope, receive, send)
@@ -1,5 +1,9 @@
-from typing import Dict, Optional
-from pydantic import BaseModel, Field, HttpUrl
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+from typing_extensions import Annotated
+from pydantic import BaseModel, Field, HttpUrl, field_validator
+
+ImageHash = Annotated[str, Field(pattern=r"^[0-9a-f]{64}$")]
 
 class MeasureRequest(BaseModel):
     """
@@ -8,12 +12,195 @@ class MeasureRequest(BaseModel):
     image_url: HttpUrl = Field(..., description="URL to image file")
     target_height_cm: float = Field(..., ge=30, le=300, description="Target height in cm (30-300)")
 
+class ShapeRequest(BaseModel):
+    """
+    JSON request body for /measure/shape endpoint.
+    """
+    gender: Literal["male", "female", "neutral"] = Field("neutral", description="Body model gender")
+    betas: List[float] = Field(..., min_length=10, max_length=10, description="SMPL shape parameters")
+    target_height_cm: Optional[float] = Field(None, ge=30, le=300, description="Target height in cm (30-300), omit to keep the model scale")
+
+    @field_validator("gender", mode="before")
+    def lower_gender(cls, v):
+        return v.lower() if isinstance(v, str) else v
+
+class StoredMeasureRequest(BaseModel):
+    """
+    JSON request body for /measure/stored endpoint.
+    """
+    image_hashes: List[ImageHash] = Field(..., min_length=1, max_length=256, description="SHA-256 of the images, lowercase hex")
+    target_height_cm: Optional[float] = Field(None, ge=30, le=300, description="Target height in cm (30-300), omit to keep the model scale")
+
+class MeasureBatchRequest(BaseModel):
+    """
+    JSON request body for /measure/batch endpoint.
+    """
+    image_urls: List[HttpUrl] = Field(..., min_length=1, description="URLs to image files")
+    target_height_cm: float = Field(..., ge=30, le=300, description="Target height in cm (30-300)")
+
 class MeasurementResponse(BaseModel):
     """
     Response model for measurements.
     """
     measurements: Dict[str, float] = Field(..., description="Dictionary of body measurements in cm")
 
+class PersonMeasurement(BaseModel):
+    """
+    Measurements of one person detected by ROMP.
+    """
+    index: int = Field(..., description="Index of the person in ROMP's outputs")
+    primary: bool = Field(..., description="Whether this is the main subject (largest projected area)")
+    cam_trans: Optional[List[float]] = Field(None, description="ROMP camera translation (x, y, z)")
+    bbox: Optional[List[float]] = Field(None, description="Image bounding box (x_min, y_min, x_max, y_max) in pixels")
+    measurements: Dict[str, float] = Field(..., description="Dictionary of body measurements in cm")
+
+class PeopleMeasurementResponse(BaseModel):
+    """
+    Response model for /measure/people.
+    """
+    people: List[PersonMeasurement]
+
+class MeasurementAggregate(BaseModel):
+    """
+    One measurement aggregated over the frames of a video.
+    """
+    median: float
+    trimmed_mean: float = Field(..., description="Mean without the lowest and highest 10% of the frames")
+    frames: int = Field(..., description="Frames the measurement was found in")
+
+class VideoMeasurementResponse(BaseModel):
+    """
+    Response model for /measure/video.
+    """
+    frames_decoded: int
+    frames_sampled: int
+    frames_measured: int
+    frames_without_person: int
+    measurements: Dict[str, MeasurementAggregate] = Field(..., description="Aggregated body measurements in cm")
+
+class StoredMeasurementResponse(BaseModel):
+    """
+    Response model for /measure/stored.
+    """
+    measurements: Dict[str, Dict[str, float]] = Field(..., description="Body measurements in cm per image hash")
+    missing: List[str] = Field(default_factory=list, description="Image hashes without stored verts")
+
+class BatchItemResult(BaseModel):
+    """
+    One NDJSON line of /measure/batch: the result of one image.
+    """
+    index: int = Field(..., description="Position of the image in the request")
+    source: str = Field(..., description="File name, archive member or URL of the image")
+    image_hash: Optional[str] = Field(None, description="SHA-256 of the image, once read")
+    measurements: Optional[Dict[str, float]] = Field(None, description="Body measurements in cm")
+    error: Optional[str] = Field(None, description="Why the image could not be measured")
+    status_code: Optional[int] = Field(None, description="HTTP status /measure would have returned for the error")
+
+class BatchSummary(BaseModel):
+    """
+    Last NDJSON line of /measure/batch.
+    """
+    items: int
+    succeeded: int
+    failed: int
+
+class JobResponse(BaseModel):
+    """
+    Response model for /jobs.
+    """
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: datetime
+    updated_at: datetime
+    measurements: Optional[Dict[str, float]] = Field(None, description="Body measurements in cm, once done")
+    error: Optional[str] = Field(None, description="Why the job failed")
+
+class InferenceStats(BaseModel):
+    """
+    ROMP inference queue and worker statistics.
+    """
+    workers: int
+    busy_workers: int
+    utilization: float
+    queue_depth: int
+    queue_capacity: int
+    mean_wait_ms: float
+    p95_wait_ms: float
+    mean_service_ms: float
+    completed: int
+    rejected: int
+
+class BatchingStats(BaseModel):
+    """
+    Micro-batching statistics of the ROMP engine.
+    """
+    window_ms: float
+    max_batch_size: int
+    batches: int
+    images: int
+    mean_batch_size: float
+    mean_batch_ms: float
+
+class CacheStats(BaseModel):
+    """
+    /measure result cache counters.
+    """
+    entries: int
+    max_entries: int
+    disk: bool
+    hits: int
+    disk_hits: int
+    misses: int
+    hit_rate: float
+
+class VertsStoreStats(BaseModel):
+    """
+    Verts store size.
+    """
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+class DedupStats(BaseModel):
+    """
+    Single-flight de-duplication of concurrent /measure requests.
+    """
+    in_flight: int
+    leaders: int
+    shared: int
+
+class AdmissionStats(BaseModel):
+    """
+    Adaptive admission control state of /measure.
+    """
+    enabled: bool
+    limit: int
+    in_flight: int
+    p95_latency_ms: float
+    latency_target_ms: float
+    shed: int
+
+class JobStats(BaseModel):
+    """
+    Asynchronous job counts.
+    """
+    queued: int
+    running: int
+    done: int
+    failed: int
+    pending: int
+    max_pending: int
+
+class WorkQueueStats(BaseModel):
+    """
+    Work queue depth, and the items this process consumed from it.
+    """
+    backend: str
+    depth: int
+    consumers: Optional[int] = None
+    processed: Optional[int] = None
+    failed: Optional[int] = None
+
 class HealthResponse(BaseModel):
     """
     Response model for health check.
@@ -22,6 +209,14 @@ class HealthResponse(BaseModel):
     romp_available: bool
     device: str
     version: str
+    inference: Optional[InferenceStats] = None
+    batching: Optional[BatchingStats] = None
+    admission: Optional[AdmissionStats] = None
+    cache: Optional[CacheStats] = None
+    verts_store: Optional[VertsStoreStats] = None
+    dedup: Optional[DedupStats] = None
+    jobs: Optional[JobStats] = None
+    work_queue: Optional[WorkQueueStats] = None
 
 class ErrorDetail(BaseModel):
     """
@@ -1,28 +1,76 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 import torch
 
-from romp_pipeline.api.models.schemas import HealthResponse
-from romp_pipeline.api.dependencies import get_romp_service
+from romp_pipeline.api.models.schemas import HealthResponse, InferenceStats, BatchingStats, AdmissionStats, CacheStats, VertsStoreStats, DedupStats, JobStats, WorkQueueStats
+from romp_pipeline.api.dependencies import (
+    get_romp_service,
+    get_inference_scheduler,
+    get_admission_controller,
+    get_result_cache,
+    get_verts_store,
+    get_single_flight,
+    get_job_service,
+    get_work_queue,
+    get_queue_worker
+)
 from romp_pipeline.api.services.romp_service import ROMPService
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.admission_control import AdmissionController
+from romp_pipeline.api.services.result_cache import ResultCache
+from romp_pipeline.api.services.verts_store import VertsStore
+from romp_pipeline.api.services.single_flight import SingleFlight
+from romp_pipeline.api.services.job_service import JobService
+from romp_pipeline.api.services.work_queue import WorkQueue
+from romp_pipeline.api.services.queue_worker import QueueWorker
 from romp_pipeline.api.config import settings
 
 router = APIRouter()
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check(
-    romp_service: ROMPService = Depends(get_romp_service)
+    romp_service: ROMPService = Depends(get_romp_service),
+    scheduler: InferenceScheduler = Depends(get_inference_scheduler),
+    admission_controller: AdmissionController = Depends(get_admission_controller),
+    result_cache: ResultCache = Depends(get_result_cache),
+    verts_store: Optional[VertsStore] = Depends(get_verts_store),
+    single_flight: SingleFlight = Depends(get_single_flight),
+    job_service: JobService = Depends(get_job_service),
+    work_queue: Optional[WorkQueue] = Depends(get_work_queue),
+    queue_worker: Optional[QueueWorker] = Depends(get_queue_worker)
 ):
     """
     General health check.
     """
     romp_available = romp_service.check_availability()
+    batch_stats = romp_service.batch_stats()
+    # the first call reads the store's index from disk
+    verts_store_stats = await run_in_threadpool(verts_store.stats) if verts_store else None
+    work_queue_stats = None
+    if work_queue is not None:
+        # the broker may be on another node
+        queue_stats = await run_in_threadpool(work_queue.stats)
+        worker_stats = queue_worker.stats()
+        if worker_stats["consumers"]:
+            queue_stats.update(worker_stats)
+        work_queue_stats = WorkQueueStats(**queue_stats)
     
     return HealthResponse(
         status="ready" if romp_available else "degraded",
         romp_available=romp_available,
         device="GPU" if torch.cuda.is_available() else "CPU",
-        version=settings.VERSION
+        version=settings.VERSION,
+        inference=InferenceStats(**scheduler.stats()),
+        batching=BatchingStats(**batch_stats) if batch_stats else None,
+        admission=AdmissionStats(**admission_controller.stats()),
+        cache=CacheStats(**result_cache.stats()),
+        verts_store=VertsStoreStats(**verts_store_stats) if verts_store_stats else None,
+        dedup=DedupStats(**single_flight.stats()),
+        jobs=JobStats(**await job_service.stats()),
+        work_queue=work_queue_stats
     )
 
 @router.get("/health/live")
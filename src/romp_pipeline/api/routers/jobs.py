@@ -0,0 +1,74 @@
+from typing import Optional
+from logging import Logger
+
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.models.schemas import JobResponse
+from romp_pipeline.api.dependencies import (
+    get_logger,
+    get_image_service,
+    get_job_service
+)
+from romp_pipeline.api.services.image_service import ImageService
+from romp_pipeline.api.services.job_service import JobService
+
+router = APIRouter()
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(
+    request: Request,
+    response: Response,
+    image: Optional[UploadFile] = File(None),
+    image_url: Optional[str] = Form(None),
+    target_height_cm: Optional[float] = Form(None),
+    logger: Logger = Depends(get_logger),
+    image_service: ImageService = Depends(get_image_service),
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Queue a measurement of an image and return its job id right away.
+    Takes the same input as /measure. Poll GET /jobs/{id}, or follow
+    GET /jobs/{id}/events, for the result.
+    """
+    payload, height = await image_service.read_measure_input(request, image, image_url,
+                                                             target_height_cm, logger)
+
+    job = await job_service.submit(payload, height, logger)
+
+    response.headers["Location"] = f"{settings.API_V1_STR}/jobs/{job['id']}"
+    return JobResponse(**job)
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Status of a job, with its measurements once done.
+    """
+    return JobResponse(**await job_service.get(job_id))
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service)
+):
+    """
+    Server-sent events of a job: its current status, then every change,
+    until it is done or failed. Each event is named after the status and
+    carries the job as JSON; comments keep idle connections open.
+    """
+    # unknown jobs get a 404 before the stream starts
+    await job_service.get(job_id)
+
+    async def stream():
+        async for job in job_service.events(job_id, settings.JOBS_SSE_KEEPALIVE_S):
+            if job is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {JobResponse(**job).model_dump_json()}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -1,25 +1,51 @@
-import tempfile
-from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from logging import Logger
 
-from fastapi import APIRouter, Depends, File, UploadFile, Form, Request
+import numpy as np
 
-from romp_pipeline.api.models.schemas import MeasureRequest, MeasurementResponse
+from fastapi import APIRouter, Depends, File, UploadFile, Form, Query, Request
+from fastapi.responses import StreamingResponse
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.models.schemas import (
+    MeasureBatchRequest,
+    ShapeRequest,
+    StoredMeasureRequest,
+    MeasurementResponse,
+    PeopleMeasurementResponse,
+    PersonMeasurement,
+    StoredMeasurementResponse,
+    VideoMeasurementResponse,
+    BatchItemResult,
+    BatchSummary
+)
 from romp_pipeline.api.dependencies import (
     get_logger, 
     get_image_service, 
-    get_romp_service, 
-    get_measurement_service
+    get_measurement_service,
+    get_shape_service,
+    get_verts_store,
+    get_video_service,
+    get_measure_pipeline,
+    get_batch_service,
+    admit_request
 )
 from romp_pipeline.api.services.image_service import ImageService
-from romp_pipeline.api.services.romp_service import ROMPService
 from romp_pipeline.api.services.measurement_service import MeasurementService
-from romp_pipeline.api.exceptions import ImageValidationError
+from romp_pipeline.api.services.shape_service import ShapeService
+from romp_pipeline.api.services.verts_store import VertsStore
+from romp_pipeline.api.services.video_service import VideoService
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+from romp_pipeline.api.services.batch_service import BatchService
+from romp_pipeline.api.exceptions import (
+    BatchValidationError,
+    PayloadTooLargeError,
+    VertsStoreDisabledError
+)
 
 router = APIRouter()
 
-@router.post("/measure", response_model=MeasurementResponse)
+@router.post("/measure", response_model=MeasurementResponse, dependencies=[Depends(admit_request)])
 async def measure_body(
     request: Request,
     image: Optional[UploadFile] = File(None),
@@ -27,62 +53,198 @@ async def measure_body(
     target_height_cm: Optional[float] = Form(None),
     logger: Logger = Depends(get_logger),
     image_service: ImageService = Depends(get_image_service),
-    romp_service: ROMPService = Depends(get_romp_service),
-    measurement_service: MeasurementService = Depends(get_measurement_service)
+    pipeline: MeasurePipeline = Depends(get_measure_pipeline)
 ):
     """
     Extract body measurements from an image.
     Supports both JSON (image_url) and multipart/form-data (file upload).
+    The image is kept in memory; only the subprocess backend touches
+    (RAM-backed) scratch space. A repeated image is served from the
+    result cache and only rescaled to the requested height; concurrent
+    requests for the same image share one inference.
     """
-    tmp_path: Optional[Path] = None
-    output_dir: Optional[Path] = None
+    # 1. Input Parsing & Validation
+    payload, height = await image_service.read_measure_input(request, image, image_url,
+                                                             target_height_cm, logger)
+
+    # 2. Result cache lookup, by the hash computed while the image was read,
+    # 3. ROMP Inference, queued for one of the fixed inference workers, and
+    # 4. Measurement Extraction, at model scale so concurrent requests
+    # for the same image can share it whatever their height
+    measurements = await pipeline.measure(payload.content, payload.sha256, height, logger)
     
+    return MeasurementResponse(measurements=measurements)
+
+@router.post("/measure/people", response_model=PeopleMeasurementResponse, dependencies=[Depends(admit_request)])
+async def measure_people(
+    request: Request,
+    image: Optional[UploadFile] = File(None),
+    image_url: Optional[str] = Form(None),
+    target_height_cm: Optional[float] = Form(None),
+    logger: Logger = Depends(get_logger),
+    image_service: ImageService = Depends(get_image_service),
+    measurement_service: MeasurementService = Depends(get_measurement_service),
+    pipeline: MeasurePipeline = Depends(get_measure_pipeline)
+):
+    """
+    Extract body measurements of every person in an image.
+    Takes the same input as /measure. All people detected by one ROMP pass
+    are measured in one batch; the main subject is flagged as primary.
+    """
+    payload, height = await image_service.read_measure_input(request, image, image_url,
+                                                             target_height_cm, logger)
+
+    results = await pipeline.infer(payload.content, logger)
+    
+    people = await measurement_service.run_in_pool(
+        measurement_service.measure_people, results, height, logger)
+    
+    return PeopleMeasurementResponse(people=[PersonMeasurement(**person) for person in people])
+
+@router.post("/measure/batch", response_class=StreamingResponse, dependencies=[Depends(admit_request)])
+async def measure_batch(
+    request: Request,
+    images: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    image_urls: Optional[List[str]] = Form(None),
+    target_height_cm: Optional[float] = Form(None),
+    logger: Logger = Depends(get_logger),
+    batch_service: BatchService = Depends(get_batch_service)
+):
+    """
+    Extract body measurements from many images, streamed back as NDJSON.
+    Accepts image files (images), a zip of images (archive) and image URLs
+    (image_urls), as multipart/form-data, or a JSON body with image_urls.
+    One line is sent per image as soon as it is measured, in completion
+    order, with its measurements or its error; a failing image does not
+    fail the batch. The last line sums up the batch. The batch passes
+    admission control as one request.
+    """
+    if "application/json" in request.headers.get("content-type", ""):
+        try:
+            req_model = MeasureBatchRequest(**await request.json())
+        except Exception as e:
+            raise BatchValidationError(f"invalid JSON request: {str(e)}")
+        items = batch_service.url_items([str(url) for url in req_model.image_urls], logger)
+        height = req_model.target_height_cm
+    else:
+        if target_height_cm is None or not (30.0 <= target_height_cm <= 300.0):
+            raise BatchValidationError("target_height_cm between 30 and 300 is required")
+        height = float(target_height_cm)
+        items = batch_service.upload_items(images or [], logger)
+        if archive is not None:
+            items += await batch_service.archive_items(archive, logger)
+        items += batch_service.url_items(image_urls or [], logger)
+
+    if not items:
+        raise BatchValidationError("no images: send images, an archive or image_urls")
+    if len(items) > settings.MEASURE_BATCH_MAX_ITEMS:
+        raise BatchValidationError(f"{len(items)} images, at most {settings.MEASURE_BATCH_MAX_ITEMS} per batch")
+    logger.info(f"Measuring batch of {len(items)} images")
+
+    async def stream():
+        failed = 0
+        async for result in batch_service.measure(items, height, logger):
+            failed += "error" in result
+            yield BatchItemResult(**result).model_dump_json(exclude_none=True) + "\n"
+        summary = BatchSummary(items=len(items), succeeded=len(items) - failed, failed=failed)
+        yield '{"summary":' + summary.model_dump_json() + "}\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.post("/measure/video", response_model=VideoMeasurementResponse, dependencies=[Depends(admit_request)])
+async def measure_video(
+    video: UploadFile = File(...),
+    target_height_cm: float = Form(..., ge=30, le=300),
+    frame_stride: int = Form(1, ge=1, le=60),
+    logger: Logger = Depends(get_logger),
+    image_service: ImageService = Depends(get_image_service),
+    video_service: VideoService = Depends(get_video_service)
+):
+    """
+    Extract body measurements of the main subject of a video.
+    Every frame_stride-th frame is measured, up to VIDEO_MAX_FRAMES, and
+    each measurement is aggregated over the frames (median, trimmed mean).
+    """
+    path = await image_service.save_uploaded_video(video, logger)
     try:
-        # 1. Input Parsing & Validation
-        content_type = request.headers.get("content-type", "")
-        
-        if "application/json" in content_type:
-            # JSON Request
-            try:
-                data = await request.json()
-                req_model = MeasureRequest(**data)
-                url = str(req_model.image_url)
-                height = req_model.target_height_cm
-                
-                tmp_path = image_service.download_image(url, logger)
-            except Exception as e:
-                raise ImageValidationError(f"Invalid JSON request: {str(e)}")
-        else:
-            # Form Data / File Upload
-            if image:
-                if not target_height_cm:
-                    raise ImageValidationError("target_height_cm is required")
-                height = float(target_height_cm)
-                tmp_path = await image_service.save_uploaded_file(image, logger)
-            elif image_url:
-                if not target_height_cm:
-                    raise ImageValidationError("target_height_cm is required")
-                height = float(target_height_cm)
-                tmp_path = image_service.download_image(image_url, logger)
+        result = await video_service.measure_video(path, target_height_cm, frame_stride, logger)
+    finally:
+        image_service.cleanup_file(path)
+    
+    return VideoMeasurementResponse(**result)
+
+@router.post("/measure/verts", response_model=MeasurementResponse)
+async def measure_verts(
+    request: Request,
+    target_height_cm: float = Query(..., ge=30, le=300),
+    logger: Logger = Depends(get_logger),
+    measurement_service: MeasurementService = Depends(get_measurement_service)
+):
+    """
+    Extract body measurements from SMPL vertices, without running ROMP.
+    The body is either raw little-endian float32 (6890, 3) data
+    (application/octet-stream) or a .npy file.
+    """
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise PayloadTooLargeError(settings.MAX_UPLOAD_SIZE_BYTES)
+        chunks.append(chunk)
+
+    # the one copy of the body, which the vertex array is a view on
+    verts = measurement_service.decode_verts(b"".join(chunks))
+    measurements = await measurement_service.run_in_pool(
+        measurement_service.measure_verts, verts, target_height_cm, logger)
+
+    return MeasurementResponse(measurements=measurements)
+
+@router.post("/measure/shape", response_model=MeasurementResponse)
+async def measure_shape(
+    req: ShapeRequest,
+    logger: Logger = Depends(get_logger),
+    shape_service: ShapeService = Depends(get_shape_service)
+):
+    """
+    Extract body measurements from SMPL shape parameters, without running ROMP.
+    Concurrent requests are measured together in one batch.
+    """
+    measurements = await shape_service.measure(req.gender.upper(), req.betas, req.target_height_cm, logger)
+
+    return MeasurementResponse(measurements=measurements)
+
+@router.post("/measure/stored", response_model=StoredMeasurementResponse)
+async def measure_stored(
+    req: StoredMeasureRequest,
+    logger: Logger = Depends(get_logger),
+    measurement_service: MeasurementService = Depends(get_measurement_service),
+    verts_store: Optional[VertsStore] = Depends(get_verts_store)
+):
+    """
+    Re-measure images from the verts ROMP produced for them earlier, without
+    running ROMP again. Images are identified by the SHA-256 of their bytes;
+    the verts store (VERTS_STORE_DIR) must be enabled.
+    """
+    if verts_store is None:
+        raise VertsStoreDisabledError()
+
+    def measure_batch():
+        keys, verts, missing = [], [], []
+        for key in dict.fromkeys(req.image_hashes):
+            stored = verts_store.get(key)
+            if stored is None:
+                missing.append(key)
             else:
-                raise ImageValidationError("Either 'image' file or 'image_url' is required")
+                keys.append(key)
+                verts.append(stored)
+        if not verts:
+            return {}, missing
 
-        # Validate height range
-        if not (30.0 <= height <= 300.0):
-            raise ImageValidationError("target_height_cm must be between 30 and 300")
+        results = measurement_service.measure_verts_batch(
+            np.stack(verts), [req.target_height_cm] * len(verts), logger)
+        return dict(zip(keys, results)), missing
 
-        # 2. ROMP Inference
-        output_dir = Path(tempfile.mkdtemp())
-        npz_path = romp_service.run_inference(tmp_path, output_dir, logger)
-        
-        # 3. Measurement Extraction
-        measurements = measurement_service.extract_measurements(npz_path, height, logger)
-        
-        return MeasurementResponse(measurements=measurements)
+    measurements, missing = await measurement_service.run_in_pool(measure_batch)
 
-    finally:
-        # 4. Cleanup
-        if tmp_path:
-            image_service.cleanup_file(tmp_path)
-        if output_dir:
-            image_service.cleanup_dir(output_dir)
+    return StoredMeasurementResponse(measurements=measurements, missing=missing)
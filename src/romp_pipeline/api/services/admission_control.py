@@ -0,0 +1,122 @@
+import math
+import time
+from collections import deque
+from typing import Deque, Iterable, Optional, Tuple
+
+from romp_pipeline.api.exceptions import LoadSheddingError
+
+class AdmissionController:
+    """
+    Latency-driven limit on the number of /measure requests in flight.
+
+    Two overload signals shrink the limit, checked once per interval:
+    - the p95 of the end-to-end latencies (reported by RequestMiddleware)
+      of the requests finished in the interval is above the latency
+      target, or
+    - the ROMP queue sojourn time stayed above its target for the whole
+      interval, i.e. a standing queue in the style of CoDel.
+    On overload the limit is cut multiplicatively, otherwise it grows by
+    one per interval (AIMD), between min_limit and max_limit. After a cut
+    only requests admitted under the new limit count towards the latency
+    signal, so requests that were already slow don't cut it again. Requests
+    beyond the limit are shed with 503 right away instead of queueing
+    until they hit ROMP_TIMEOUT.
+    """
+
+    LATENCY_WINDOW = 200
+    BACKOFF = 0.75
+
+    def __init__(self,
+                 min_limit: int,
+                 max_limit: int,
+                 latency_target_s: float,
+                 sojourn_target_s: float,
+                 interval_s: float,
+                 enabled: bool = True) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_s = latency_target_s
+        self.sojourn_target_s = sojourn_target_s
+        self.interval_s = interval_s
+        self.enabled = enabled
+
+        self.limit = max_limit
+        self.in_flight = 0
+        self.shed = 0
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=self.LATENCY_WINDOW)
+        self._interval_start = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._min_sojourn: Optional[float] = None
+
+    def set_limits(self, min_limit: int, max_limit: int) -> None:
+        """Set the bounds of the limit once the number of ROMP workers is known"""
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max_limit
+
+    def acquire(self) -> None:
+        """Admit a request or raise LoadSheddingError"""
+        self._maybe_update()
+        if self.enabled and self.in_flight >= self.limit:
+            self.shed += 1
+            raise LoadSheddingError(self.retry_after())
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def observe_latency(self, latency_s: float) -> None:
+        """End-to-end latency of an admitted request"""
+        self._latencies.append((time.monotonic(), latency_s))
+        self._maybe_update()
+
+    def observe_sojourn(self, sojourn_s: float) -> None:
+        """Time a request waited in the ROMP queue"""
+        if self._min_sojourn is None or sojourn_s < self._min_sojourn:
+            self._min_sojourn = sojourn_s
+
+    def p95_latency(self) -> float:
+        """p95 of the latencies of the last 30 intervals, for Retry-After and /health"""
+        horizon = time.monotonic() - 30 * self.interval_s
+        return self._p95(latency for t, latency in self._latencies if t >= horizon)
+
+    def _interval_p95_latency(self) -> float:
+        """p95 of the latencies finished in this interval, of requests started after the last cut"""
+        return self._p95(latency for t, latency in self._latencies
+                         if t >= self._interval_start and t - latency >= self._last_decrease)
+
+    @staticmethod
+    def _p95(latencies: Iterable[float]) -> float:
+        latencies = sorted(latencies)
+        if not latencies:
+            return 0.0
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.p95_latency() or self.interval_s))
+
+    def _maybe_update(self) -> None:
+        now = time.monotonic()
+        if now - self._interval_start < self.interval_s:
+            return
+
+        standing_queue = self._min_sojourn is not None and self._min_sojourn > self.sojourn_target_s
+        if standing_queue or self._interval_p95_latency() > self.latency_target_s:
+            self.limit = max(self.min_limit, math.floor(self.limit * self.BACKOFF))
+            self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+        self._interval_start = now
+        self._min_sojourn = None
+
+    def stats(self) -> dict:
+        """Current limit and overload signals, for /health"""
+        return {
+            "enabled": self.enabled,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "p95_latency_ms": self.p95_latency() * 1000,
+            "latency_target_ms": self.latency_target_s * 1000,
+            "shed": self.shed,
+        }
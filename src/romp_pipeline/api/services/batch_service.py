@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import zipfile
+from dataclasses import dataclass
+from logging import Logger
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import APIException, BatchValidationError, PayloadTooLargeError
+from romp_pipeline.api.services.image_service import ImageService, ImagePayload
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+
+@dataclass
+class BatchItem:
+    """One image of a /measure/batch request, read only when its turn comes"""
+    source: str  # file name, archive member or URL
+    load: Callable[[], Awaitable[ImagePayload]]
+
+class BatchService:
+    """
+    Service for measuring many images in one request.
+
+    Items are read and measured concurrently, at most `concurrency` at a
+    time, so their inferences reach the scheduler together and share the
+    engine's batches while memory stays bounded. Each item goes through
+    the /measure pipeline (result cache, single-flight, work queue),
+    waiting out a full inference queue for up to `max_wait_s`, and is
+    yielded as soon as it is done, in completion order. An item that fails
+    yields its error instead; the other items are not affected.
+    """
+
+    IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+    def __init__(self,
+                 image_service: ImageService,
+                 pipeline: MeasurePipeline,
+                 concurrency: int,
+                 max_wait_s: float) -> None:
+        self._image_service = image_service
+        self._pipeline = pipeline
+        self.concurrency = concurrency
+        self.max_wait_s = max_wait_s
+
+    def upload_items(self, uploads: List[UploadFile], logger: Logger) -> List[BatchItem]:
+        """
+        Items of uploaded image files. They are read while the response
+        streams, which needs FastAPI >= 0.118 to keep the uploads open
+        until the response ends.
+        """
+        return [BatchItem(upload.filename or f"image_{i}",
+                          lambda upload=upload: self._image_service.read_uploaded_file(upload, logger))
+                for i, upload in enumerate(uploads)]
+
+    def url_items(self, urls: List[str], logger: Logger) -> List[BatchItem]:
+        """Items of image URLs, downloaded with the usual concurrency limit"""
+        return [BatchItem(url, lambda url=url: self._image_service.download_image_bytes(url, logger))
+                for url in urls]
+
+    async def archive_items(self, upload: UploadFile, logger: Logger) -> List[BatchItem]:
+        """
+        Items of the images in an uploaded zip archive.
+
+        Args:
+            upload: Uploaded zip file
+            logger: Logger instance
+
+        Returns:
+            One item per image file in the archive, in archive order
+        """
+        try:
+            archive = await run_in_threadpool(zipfile.ZipFile, upload.file)
+        except zipfile.BadZipFile:
+            raise BatchValidationError("archive is not a zip file")
+
+        members = [info for info in archive.infolist()
+                   if not info.is_dir()
+                   and not info.filename.startswith("__MACOSX/")
+                   and PurePosixPath(info.filename).suffix.lower() in self.IMAGE_SUFFIXES]
+        logger.info(f"Archive {upload.filename} holds {len(members)} images")
+
+        # members share the archive's file handle, read them one at a time
+        lock = asyncio.Lock()
+        async def load(info: zipfile.ZipInfo) -> ImagePayload:
+            async with lock:
+                return await run_in_threadpool(self._read_member, archive, info)
+
+        return [BatchItem(info.filename, lambda info=info: load(info)) for info in members]
+
+    def _read_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> ImagePayload:
+        """Read an archive member, hashing it and stopping past MAX_UPLOAD_SIZE_BYTES"""
+        # the declared size can't be trusted, so the read is bounded too
+        if info.file_size > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise PayloadTooLargeError(settings.MAX_UPLOAD_SIZE_BYTES)
+
+        sha256 = hashlib.sha256()
+        content = bytearray()
+        with archive.open(info) as f:
+            while True:
+                chunk = f.read(ImageService.CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(content) + len(chunk) > settings.MAX_UPLOAD_SIZE_BYTES:
+                    raise PayloadTooLargeError(settings.MAX_UPLOAD_SIZE_BYTES)
+                sha256.update(chunk)
+                content += chunk
+        return ImagePayload(content, sha256.hexdigest())
+
+    async def measure(self,
+                      items: List[BatchItem],
+                      target_height: float,
+                      logger: Logger) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Measure the items of a batch.
+
+        Args:
+            items: Batch items
+            target_height: Target height for normalization
+            logger: Logger instance
+
+        Yields:
+            Per item, as it finishes: index, source and either image_hash and
+            measurements, or error and status_code
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(index: int, item: BatchItem) -> Dict[str, Any]:
+            result: Dict[str, Any] = {"index": index, "source": item.source}
+            async with slots:
+                try:
+                    payload = await item.load()
+                    result["image_hash"] = payload.sha256
+                    result["measurements"] = await self._pipeline.measure_waiting(
+                        payload.content, payload.sha256, target_height, self.max_wait_s, logger)
+                except APIException as e:
+                    result.update(error=e.message, status_code=e.status_code)
+                except Exception:
+                    logger.exception(f"Batch item {index} ({item.source}) failed")
+                    result.update(error="Internal server error", status_code=500)
+            return result
+
+        tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # the client went away: drop the items not started yet
+            for task in tasks:
+                task.cancel()
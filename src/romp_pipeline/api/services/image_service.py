@@ -1,20 +1,34 @@
+import asyncio
+import hashlib
 import os
 import tempfile
-import shutil
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
 from urllib.parse import urlparse
-import requests
-from fastapi import UploadFile
+import cv2
+import httpx
+import numpy as np
+from fastapi import Request, UploadFile
 from logging import Logger
 
 from romp_pipeline.api.config import settings
-from romp_pipeline.api.exceptions import ImageDownloadError, ImageValidationError
+from romp_pipeline.api.exceptions import ImageDownloadError, ImageValidationError, PayloadTooLargeError
+from romp_pipeline.api.models.schemas import MeasureRequest
+
+@dataclass
+class ImagePayload:
+    """Image file content, with the SHA-256 computed while it was read"""
+    content: bytearray
+    sha256: str
 
 class ImageService:
     """Service for handling image operations"""
     
+    CHUNK_SIZE = 64 * 1024
+    
     def __init__(self):
-        pass
+        self._download_slots = asyncio.Semaphore(settings.DOWNLOAD_CONCURRENCY)
 
     def _validate_url(self, url: str) -> None:
         """Validate URL scheme"""
@@ -22,89 +36,208 @@ class ImageService:
         if parsed.scheme not in ("http", "https"):
             raise ImageValidationError("image_url must be http or https")
 
-    def _get_suffix(self, content_type: str) -> str:
-        """Get file extension from content type"""
-        if "png" in content_type: return ".png"
-        if "webp" in content_type: return ".webp"
-        if "jpeg" in content_type or "jpg" in content_type: return ".jpg"
-        return ".jpg"  # Default
+    async def save_uploaded_video(self, upload: UploadFile, logger: Logger) -> Path:
+        """
+        Save uploaded video to temporary path, so it can be decoded frame by frame.
+        
+        Args:
+            upload: Uploaded video
+            logger: Logger instance
+            
+        Returns:
+            Path to saved file
+        """
+        if upload.content_type and not upload.content_type.startswith('video/'):
+            raise ImageValidationError("File must be a video")
+        
+        suffix = Path(upload.filename or "").suffix or ".mp4"
+        return await self._save_upload(upload, suffix, settings.VIDEO_MAX_UPLOAD_SIZE_BYTES, logger)
+
+    async def _save_upload(self, upload: UploadFile, suffix: str, max_bytes: int, logger: Logger) -> Path:
+        """Stream an upload to a temporary file, rejecting it once it passes max_bytes"""
+        fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+        tmp_path = Path(tmp_path)
+        
+        try:
+            total = 0
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = await upload.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise PayloadTooLargeError(max_bytes)
+                    f.write(chunk)
+                
+            logger.info(f"Saved uploaded file to {tmp_path} ({total} bytes)")
+            return tmp_path
+        except Exception as e:
+            if tmp_path.exists():
+                try: os.remove(tmp_path)
+                except Exception: pass
+            if isinstance(e, (ImageValidationError, PayloadTooLargeError)): raise
+            raise ImageValidationError(f"Failed to save upload: {str(e)}")
 
-    def download_image(self, url: str, logger: Logger) -> Path:
+    async def download_image_bytes(self, url: str, logger: Logger) -> ImagePayload:
         """
-        Download image from URL to temporary file.
+        Download image from URL into memory, without blocking the event loop.
+        At most DOWNLOAD_CONCURRENCY downloads run at once. The download is
+        hashed as it arrives and aborted once it passes MAX_UPLOAD_SIZE_BYTES.
         
         Args:
             url: Image URL
             logger: Logger instance
             
         Returns:
-            Path to downloaded file
+            Image file content and its SHA-256
         """
         self._validate_url(url)
         
-        try:
-            with requests.get(url, stream=True, timeout=settings.DOWNLOAD_TIMEOUT) as r:
-                if r.status_code != 200:
-                    raise ImageDownloadError(f"HTTP {r.status_code}")
+        async with self._download_slots:
+            try:
+                async with httpx.AsyncClient(timeout=settings.DOWNLOAD_TIMEOUT, follow_redirects=True) as client:
+                    async with client.stream("GET", url) as r:
+                        if r.status_code != 200:
+                            raise ImageDownloadError(f"HTTP {r.status_code}")
 
-                suffix = self._get_suffix(r.headers.get("content-type", ""))
-                fd, tmp_path = tempfile.mkstemp(suffix=suffix)
-                tmp_path = Path(tmp_path)
+                        payload = await self._read_chunks(r.aiter_bytes(self.CHUNK_SIZE),
+                                                          self._declared_size(r.headers.get("content-length")))
+                            
+                logger.info(f"Downloaded image from {url} ({len(payload.content)} bytes)")
+                return payload
                 
-                total = 0
-                with os.fdopen(fd, "wb") as f:
-                    for chunk in r.iter_content(8192):
-                        if not chunk:
-                            continue
-                        total += len(chunk)
-                        if total > settings.MAX_UPLOAD_SIZE_BYTES:
-                            try: os.remove(tmp_path)
-                            except Exception: pass
-                            raise ImageDownloadError(f"Image too large (>{settings.MAX_UPLOAD_SIZE_BYTES/1024/1024}MB)")
-                        f.write(chunk)
-                        
-            logger.info(f"Downloaded image from {url} to {tmp_path} ({total} bytes)")
-            return tmp_path
-            
-        except requests.RequestException as e:
-            raise ImageDownloadError(str(e))
-        except Exception as e:
-            if isinstance(e, ImageDownloadError): raise
-            raise ImageDownloadError(f"Unexpected error: {str(e)}")
+            except httpx.HTTPError as e:
+                raise ImageDownloadError(str(e))
+            except Exception as e:
+                if isinstance(e, (ImageDownloadError, PayloadTooLargeError)): raise
+                raise ImageDownloadError(f"Unexpected error: {str(e)}")
 
-    async def save_uploaded_file(self, upload: UploadFile, logger: Logger) -> Path:
+    async def read_uploaded_file(self, upload: UploadFile, logger: Logger) -> ImagePayload:
         """
-        Save uploaded file to temporary path.
+        Read uploaded file into memory in chunks, hashing it on the way and
+        rejecting it once it passes MAX_UPLOAD_SIZE_BYTES. Starlette has
+        already spooled the multipart body by then; its size is capped while
+        it is received, by BodySizeLimitMiddleware.
         
         Args:
             upload: Uploaded file
             logger: Logger instance
             
         Returns:
-            Path to saved file
+            Image file content and its SHA-256
         """
         if upload.content_type and not upload.content_type.startswith('image/'):
             raise ImageValidationError("File must be an image")
+        
+        async def chunks() -> AsyncIterator[bytes]:
+            while True:
+                chunk = await upload.read(self.CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        
+        payload = await self._read_chunks(chunks(), upload.size)
             
-        suffix = self._get_suffix(upload.content_type or "")
-        fd, tmp_path = tempfile.mkstemp(suffix=suffix)
-        tmp_path = Path(tmp_path)
+        logger.info(f"Read uploaded file ({len(payload.content)} bytes)")
+        return payload
+
+    async def read_measure_input(self,
+                                 request: Request,
+                                 image: Optional[UploadFile],
+                                 image_url: Optional[str],
+                                 target_height_cm: Optional[float],
+                                 logger: Logger) -> Tuple[ImagePayload, float]:
+        """
+        Read the image and target height of a /measure-style request.
+        Supports both JSON (image_url) and multipart/form-data (file upload).
         
-        try:
-            with os.fdopen(fd, "wb") as f:
-                content = await upload.read()
-                if len(content) > settings.MAX_UPLOAD_SIZE_BYTES:
-                    raise ImageValidationError(f"Image too large (>{settings.MAX_UPLOAD_SIZE_BYTES/1024/1024}MB)")
-                f.write(content)
+        Args:
+            request: The request, for its content type and JSON body
+            image: Uploaded file form field
+            image_url: Image URL form field
+            target_height_cm: Target height form field
+            logger: Logger instance
+            
+        Returns:
+            Image payload and target height in cm
+        """
+        content_type = request.headers.get("content-type", "")
+        
+        if "application/json" in content_type:
+            # JSON Request
+            try:
+                data = await request.json()
+                req_model = MeasureRequest(**data)
+                url = str(req_model.image_url)
+                height = req_model.target_height_cm
                 
-            logger.info(f"Saved uploaded file to {tmp_path} ({len(content)} bytes)")
-            return tmp_path
-        except Exception as e:
-            if tmp_path.exists():
-                try: os.remove(tmp_path)
-                except Exception: pass
-            if isinstance(e, ImageValidationError): raise
-            raise ImageValidationError(f"Failed to save upload: {str(e)}")
+                payload = await self.download_image_bytes(url, logger)
+            except PayloadTooLargeError:
+                raise
+            except Exception as e:
+                raise ImageValidationError(f"Invalid JSON request: {str(e)}")
+        else:
+            # Form Data / File Upload
+            if image:
+                if not target_height_cm:
+                    raise ImageValidationError("target_height_cm is required")
+                height = float(target_height_cm)
+                payload = await self.read_uploaded_file(image, logger)
+            elif image_url:
+                if not target_height_cm:
+                    raise ImageValidationError("target_height_cm is required")
+                height = float(target_height_cm)
+                payload = await self.download_image_bytes(image_url, logger)
+            else:
+                raise ImageValidationError("Either 'image' file or 'image_url' is required")
+
+        # Validate height range
+        if not (30.0 <= height <= 300.0):
+            raise ImageValidationError("target_height_cm must be between 30 and 300")
+        
+        return payload, height
+
+    @staticmethod
+    def _declared_size(content_length: Optional[str]) -> Optional[int]:
+        try:
+            return int(content_length) if content_length else None
+        except ValueError:
+            return None
+
+    async def _read_chunks(self, chunks: AsyncIterator[bytes], size_hint: Optional[int]) -> ImagePayload:
+        """
+        Collect chunks into one buffer and hash them as they arrive.
+        A declared size over the limit is rejected up front, but the buffer
+        only grows with the bytes actually received.
+        """
+        if size_hint is not None and size_hint > settings.MAX_UPLOAD_SIZE_BYTES:
+            raise PayloadTooLargeError(settings.MAX_UPLOAD_SIZE_BYTES)
+        
+        sha256 = hashlib.sha256()
+        content = bytearray()
+        async for chunk in chunks:
+            if len(content) + len(chunk) > settings.MAX_UPLOAD_SIZE_BYTES:
+                raise PayloadTooLargeError(settings.MAX_UPLOAD_SIZE_BYTES)
+            sha256.update(chunk)
+            content += chunk
+        
+        return ImagePayload(content, sha256.hexdigest())
+
+    def decode_image(self, content: bytes) -> np.ndarray:
+        """
+        Decode image file content.
+        
+        Args:
+            content: Image file content (jpg, png, webp, ...)
+            
+        Returns:
+            BGR image of shape (H, W, 3), as read by cv2
+        """
+        image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ImageValidationError("Could not decode image")
+        return image
 
     def cleanup_file(self, path: Path) -> None:
         """Safe file cleanup"""
@@ -113,11 +246,3 @@ class ImageService:
                 os.remove(path)
             except Exception:
                 pass
-
-    def cleanup_dir(self, path: Path) -> None:
-        """Safe directory cleanup"""
-        if path and path.exists():
-            try:
-                shutil.rmtree(path)
-            except Exception:
-                pass
@@ -0,0 +1,142 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, List, Optional
+
+from romp_pipeline.api.exceptions import ServiceOverloadedError
+
+@dataclass
+class _Job:
+    """A ROMP inference waiting for a worker"""
+    func: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class InferenceScheduler:
+    """
+    Fixed pool of inference workers behind a bounded wait queue.
+
+    At most `workers` inferences run at once, so a burst of requests can't
+    start more ROMP processes (or engine threads) than the node can hold.
+    Up to `queue_size` further requests wait for a worker; beyond that new
+    requests are rejected with 429 and a Retry-After estimated from the
+    recent service time.
+    """
+
+    STATS_WINDOW = 256
+
+    def __init__(self, workers: int, queue_size: int,
+                 on_wait: Optional[Callable[[float], None]] = None) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self._on_wait = on_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._busy = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times: Deque[float] = deque(maxlen=self.STATS_WINDOW)
+        self._service_times: Deque[float] = deque(maxlen=self.STATS_WINDOW)
+
+    def start(self, workers: Optional[int] = None) -> None:
+        """
+        Start the workers on the running event loop.
+
+        Args:
+            workers: Number of workers, if not the one given at construction
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        if workers is not None:
+            self.workers = workers
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers and every queued job"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+
+    async def submit(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func on the next free worker.
+
+        Args:
+            func: Coroutine function doing the inference
+
+        Returns:
+            The result of func()
+        """
+        self.start()
+
+        job = _Job(func, self._loop.create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise ServiceOverloadedError(self.retry_after())
+
+        return await job.future
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained"""
+        service_time = self._mean(self._service_times) or 1.0
+        queued = self._queue.qsize() if self._queue is not None else 0
+        return max(1, math.ceil((queued + self._busy) * service_time / self.workers))
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.future.done():
+                # the request went away while waiting
+                continue
+
+            started_at = time.monotonic()
+            self._wait_times.append(started_at - job.enqueued_at)
+            if self._on_wait is not None:
+                self._on_wait(started_at - job.enqueued_at)
+            self._busy += 1
+            try:
+                result = await job.func()
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._busy -= 1
+                self._completed += 1
+                self._service_times.append(time.monotonic() - started_at)
+
+    @staticmethod
+    def _mean(values: Deque[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    def stats(self) -> dict:
+        """Queue depth, wait time and worker utilisation, for /health"""
+        wait_times = sorted(self._wait_times)
+        return {
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilization": self._busy / self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "mean_wait_ms": self._mean(self._wait_times) * 1000,
+            "p95_wait_ms": wait_times[int(0.95 * (len(wait_times) - 1))] * 1000 if wait_times else 0.0,
+            "mean_service_ms": self._mean(self._service_times) * 1000,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
@@ -0,0 +1,175 @@
+import asyncio
+import uuid
+from logging import Logger
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from romp_pipeline.api.exceptions import APIException, JobNotFoundError, ServiceOverloadedError
+from romp_pipeline.api.services.image_service import ImagePayload
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.job_store import DONE, FAILED, JobStore
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+
+class JobService:
+    """
+    Asynchronous measurement jobs.
+
+    A job is persisted in the JobStore and answered with its id right away;
+    it then runs through the same pipeline as /measure, on the inference
+    workers. At most `concurrency` jobs hold a place in the inference queue
+    at once, so a backlog of jobs can't crowd out interactive requests, and
+    a job that finds the queue full waits for the Retry-After and tries
+    again, for up to `max_wait_s`, instead of failing. Jobs left unfinished by a restart are started
+    again by start(). Status changes are published to subscribers of the
+    job, for the SSE stream.
+    """
+
+    def __init__(self,
+                 store: JobStore,
+                 pipeline: MeasurePipeline,
+                 scheduler: InferenceScheduler,
+                 concurrency: int,
+                 max_pending: int,
+                 max_wait_s: float) -> None:
+        self._store = store
+        self._pipeline = pipeline
+        self._scheduler = scheduler
+        self.max_pending = max_pending
+        self.max_wait_s = max_wait_s
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self, logger: Logger) -> None:
+        """Open the store, purge expired jobs and resume the ones a restart left unfinished"""
+        await run_in_threadpool(self._store.open)
+        purged = await run_in_threadpool(self._store.purge)
+        if purged:
+            logger.info(f"Purged {purged} expired jobs")
+        for job_id in await run_in_threadpool(self._store.unfinished):
+            self._spawn(job_id, logger)
+        if self._tasks:
+            logger.info(f"Resumed {len(self._tasks)} unfinished jobs")
+
+    async def stop(self) -> None:
+        """Cancel the running jobs; they stay unfinished in the store and resume on start"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await run_in_threadpool(self._store.close)
+
+    async def submit(self, payload: ImagePayload, target_height: float, logger: Logger) -> Dict[str, Any]:
+        """
+        Persist a job and start it in the background.
+
+        Args:
+            payload: Image file content and its SHA-256
+            target_height: Target height for normalization
+            logger: Logger instance
+
+        Returns:
+            The queued job
+        """
+        if len(self._tasks) >= self.max_pending:
+            raise ServiceOverloadedError(self._scheduler.retry_after())
+
+        job_id = uuid.uuid4().hex
+        job = await run_in_threadpool(self._store.create, job_id, payload.content,
+                                      payload.sha256, target_height)
+        self._spawn(job_id, logger)
+        logger.info(f"Queued job {job_id}")
+        return job
+
+    async def get(self, job_id: str) -> Dict[str, Any]:
+        """
+        Current state of a job.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            The job, see JobStore.get
+        """
+        job = await run_in_threadpool(self._store.get, job_id)
+        if job is None:
+            raise JobNotFoundError(job_id)
+        return job
+
+    async def events(self, job_id: str, keepalive_s: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        The current state of a job, then every change until it finishes.
+
+        Args:
+            job_id: Job id
+            keepalive_s: Yield None after this long without a change
+
+        Yields:
+            The job, see JobStore.get, or None as a keepalive
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # subscribe before reading, so no change falls in between
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            job = await self.get(job_id)
+            while True:
+                if job is not None:
+                    yield job
+                    if job["status"] in (DONE, FAILED):
+                        return
+                try:
+                    job = await asyncio.wait_for(queue.get(), keepalive_s)
+                except asyncio.TimeoutError:
+                    job = None
+                    yield None
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def _spawn(self, job_id: str, logger: Logger) -> None:
+        task = asyncio.ensure_future(self._run(job_id, logger))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str, logger: Logger) -> None:
+        async with self._slots:
+            # the image is read back only now, so waiting jobs don't hold it in memory
+            job = await run_in_threadpool(self._store.get_input, job_id)
+            if job is None:
+                return
+            await self._update(job_id, self._store.set_running)
+            try:
+                measurements = await self._pipeline.measure_waiting(
+                    job["image"], job["image_hash"], job["target_height"], self.max_wait_s, logger)
+            except APIException as e:
+                logger.error(f"Job {job_id} failed: {e.message}")
+                await self._update(job_id, self._store.set_failed, e.message)
+                return
+            except Exception:
+                logger.exception(f"Job {job_id} failed")
+                await self._update(job_id, self._store.set_failed, "Internal server error")
+                return
+
+            await self._update(job_id, self._store.set_done, measurements)
+            logger.info(f"Job {job_id} done")
+
+    async def _update(self, job_id: str, setter: Callable[..., None], *args: Any) -> None:
+        """Apply a status change to the store and publish the new state"""
+        await run_in_threadpool(setter, job_id, *args)
+        if job_id in self._subscribers:
+            job = await run_in_threadpool(self._store.get, job_id)
+            for queue in self._subscribers.get(job_id, ()):
+                queue.put_nowait(job)
+
+    async def stats(self) -> Dict[str, int]:
+        """Stored jobs by status and jobs in flight in this process, for /health"""
+        # the store lock may be held while an image is written
+        return {
+            **await run_in_threadpool(self._store.stats),
+            "pending": len(self._tasks),
+            "max_pending": self.max_pending,
+        }
@@ -0,0 +1,187 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobStore:
+    """
+    SQLite store of asynchronous /jobs: their state, input and result.
+
+    The image is kept with the job until it finishes, so queued and running
+    jobs can be picked up again after a restart; finished jobs keep only
+    their result or error, and are deleted after `retention_s`. The file is
+    only touched once open() is called. Methods are blocking and serialized
+    on one connection; call them from a thread.
+    """
+
+    def __init__(self, path: str, retention_s: float) -> None:
+        self.path = path
+        self.retention_s = retention_s
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the database file, creating it and its directory if needed"""
+        with self._lock:
+            if self._conn is not None:
+                return
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " target_height REAL NOT NULL,"
+                " image_hash TEXT NOT NULL,"
+                " image BLOB,"
+                " result TEXT,"
+                " error TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.commit()
+            self._conn = conn
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise RuntimeError("JobStore is not open")
+        return self._conn
+
+    def create(self, job_id: str, image: bytes, image_hash: str, target_height: float) -> Dict[str, Any]:
+        """
+        Add a queued job.
+
+        Args:
+            job_id: Job id
+            image: Image file content
+            image_hash: SHA-256 of the content
+            target_height: Target height for normalization
+
+        Returns:
+            The job, see get()
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, target_height, image_hash, image)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, target_height, image_hash, bytes(image)))
+            conn.commit()
+        return {"id": job_id, "status": QUEUED, "created_at": now, "updated_at": now,
+                "measurements": None, "error": None}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a job.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            id, status, created_at, updated_at and, once finished, measurements
+            or error; None if there is no such job
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT id, status, created_at, updated_at, result, error FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "measurements": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+    def set_running(self, job_id: str) -> None:
+        self._update(job_id, RUNNING)
+
+    def set_done(self, job_id: str, measurements: Dict[str, float]) -> None:
+        self._update(job_id, DONE, result=json.dumps(measurements))
+
+    def set_failed(self, job_id: str, error: str) -> None:
+        self._update(job_id, FAILED, error=error)
+
+    def _update(self, job_id: str, status: str,
+                result: Optional[str] = None, error: Optional[str] = None) -> None:
+        finished = status in (DONE, FAILED)
+        with self._lock:
+            conn = self._connection()
+            if finished:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, result = ?, error = ?, image = NULL"
+                    " WHERE id = ?",
+                    (status, time.time(), result, error, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                             (status, time.time(), job_id))
+            conn.commit()
+
+    def get_input(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Input of an unfinished job.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            image, image_hash and target_height; None if the job is gone or finished
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT image, image_hash, target_height FROM jobs WHERE id = ? AND image IS NOT NULL",
+                (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def unfinished(self) -> List[str]:
+        """
+        Ids of queued and running jobs, oldest first, e.g. left over by a restart.
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING)).fetchall()
+        return [row["id"] for row in rows]
+
+    def purge(self) -> int:
+        """
+        Delete finished jobs older than the retention period.
+
+        Returns:
+            Number of jobs deleted
+        """
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - self.retention_s)).rowcount
+            conn.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status, for /health"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
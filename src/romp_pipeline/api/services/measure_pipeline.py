@@ -0,0 +1,211 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import status
+from fastapi.concurrency import run_in_threadpool
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import (
+    APIException,
+    LoadSheddingError,
+    ServiceOverloadedError,
+    WorkQueueTimeoutError
+)
+from romp_pipeline.api.services.image_service import ImageService
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.measurement_service import MeasurementService
+from romp_pipeline.api.services.result_cache import ResultCache
+from romp_pipeline.api.services.romp_service import ROMPService
+from romp_pipeline.api.services.single_flight import SingleFlight
+from romp_pipeline.api.services.verts_store import VertsStore
+from romp_pipeline.api.services.work_queue import WorkItem, WorkQueue, WorkResult
+
+class MeasurePipeline:
+    """
+    The image → measurements pipeline behind /measure.
+
+    An image is looked up in the result cache by its SHA-256; on a miss it
+    is queued for ROMP on the inference scheduler and measured at model
+    scale, with concurrent requests for the same image sharing one run.
+    The raw measurements are cached and the verts kept in the verts store.
+
+    With a work queue, the ROMP and measurement stages of a cache miss run
+    on whichever worker claims the image instead of in this process.
+    """
+
+    def __init__(self,
+                 image_service: ImageService,
+                 romp_service: ROMPService,
+                 measurement_service: MeasurementService,
+                 scheduler: InferenceScheduler,
+                 result_cache: ResultCache,
+                 verts_store: Optional[VertsStore],
+                 single_flight: SingleFlight,
+                 work_queue: Optional[WorkQueue] = None) -> None:
+        self._image_service = image_service
+        self._romp_service = romp_service
+        self._measurement_service = measurement_service
+        self._scheduler = scheduler
+        self._result_cache = result_cache
+        self._verts_store = verts_store
+        self._single_flight = single_flight
+        self._work_queue = work_queue
+        # the queue calls block, one thread per request waiting for a worker
+        self._queue_executor = (ThreadPoolExecutor(max_workers=settings.WORK_QUEUE_MAX_WAITING,
+                                                   thread_name_prefix="work-queue-wait")
+                                if work_queue is not None else None)
+
+    def romp_job(self, content: bytes, logger: Logger) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        """ROMP inference of an image, to be queued on the InferenceScheduler"""
+        async def run_romp():
+            if self._romp_service.use_engine:
+                image = await run_in_threadpool(self._image_service.decode_image, content)
+                return await self._romp_service.run_engine_inference(image, logger)
+            return await self._romp_service.run_subprocess_inference(content, logger)
+        return run_romp
+
+    async def infer(self, content: bytes, logger: Logger) -> Dict[str, Any]:
+        """
+        Run ROMP on an image on the next free inference worker.
+
+        Args:
+            content: Image file content
+            logger: Logger instance
+
+        Returns:
+            ROMP outputs
+        """
+        return await self._scheduler.submit(self.romp_job(content, logger))
+
+    async def measure_raw(self, content: bytes, image_hash: str, logger: Logger) -> Dict[str, float]:
+        """
+        Raw (model scale) measurements of the main subject of an image.
+
+        Args:
+            content: Image file content
+            image_hash: SHA-256 of the content
+            logger: Logger instance
+
+        Returns:
+            Raw measurements, see MeasurementService.measure_raw
+        """
+        if self._result_cache.enabled:
+            raw = await self._result_cache.get(image_hash)
+            if raw is not None:
+                logger.info("Result cache hit")
+                return raw
+
+        async def measure_image():
+            if self._work_queue is not None:
+                raw = await self._compute_remote(content, image_hash, logger)
+            else:
+                raw = await self.compute_raw(content, image_hash, logger)
+            if self._result_cache.enabled:
+                await self._result_cache.put(image_hash, raw)
+            return raw
+
+        return await self._single_flight.do(image_hash, measure_image)
+
+    async def compute_raw(self, content: bytes, image_hash: str, logger: Logger) -> Dict[str, float]:
+        """
+        Run the ROMP and measurement stages on an image in this process, and
+        keep its verts. Workers of the work queue call this for every item.
+
+        Args:
+            content: Image file content
+            image_hash: SHA-256 of the content
+            logger: Logger instance
+
+        Returns:
+            Raw measurements, see MeasurementService.measure_raw
+        """
+        results = await self.infer(content, logger)
+        raw = await self._measurement_service.run_in_pool(
+            self._measurement_service.extract_raw_from_results, results, logger)
+        if self._verts_store is not None:
+            await self._measurement_service.run_in_pool(
+                self._verts_store.put, image_hash, self._measurement_service.select_verts(results))
+        return raw
+
+    async def _compute_remote(self, content: bytes, image_hash: str, logger: Logger) -> Dict[str, float]:
+        """Hand an image to the work queue and wait for a worker's result"""
+        item = WorkItem(uuid.uuid4().hex, bytes(content), image_hash)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._queue_executor, self._work_queue.submit, item)
+        result = await loop.run_in_executor(self._queue_executor, self._work_queue.wait,
+                                            item.id, settings.WORK_QUEUE_TIMEOUT_S)
+        if result is None:
+            raise WorkQueueTimeoutError(settings.WORK_QUEUE_TIMEOUT_S)
+        if result.error is not None:
+            raise self._remote_error(result)
+        return result.raw
+
+    @staticmethod
+    def _remote_error(result: WorkResult) -> APIException:
+        """
+        The exception a worker failed with, rebuilt from its WorkResult so
+        that an overloaded worker is retried like a local overload, after
+        its Retry-After.
+        """
+        retry_after = (result.headers or {}).get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            if result.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                return ServiceOverloadedError(int(retry_after))
+            if result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                return LoadSheddingError(int(retry_after))
+        return APIException(result.error, result.status_code, result.headers)
+
+    async def measure(self,
+                      content: bytes,
+                      image_hash: str,
+                      target_height: float,
+                      logger: Logger) -> Dict[str, float]:
+        """
+        Measurements of the main subject of an image, normalized to the target height.
+
+        Args:
+            content: Image file content
+            image_hash: SHA-256 of the content
+            target_height: Target height for normalization
+            logger: Logger instance
+
+        Returns:
+            Dictionary of measurements in cm
+        """
+        raw = await self.measure_raw(content, image_hash, logger)
+        return self._measurement_service.normalize_measurements(raw, target_height)
+
+    async def measure_waiting(self,
+                              content: bytes,
+                              image_hash: str,
+                              target_height: float,
+                              max_wait_s: float,
+                              logger: Logger) -> Dict[str, float]:
+        """
+        Like measure(), for background work: when the inference queue is
+        full, wait for its Retry-After and try again instead of failing,
+        for up to max_wait_s.
+
+        Args:
+            content: Image file content
+            image_hash: SHA-256 of the content
+            target_height: Target height for normalization
+            max_wait_s: Give up with the ServiceOverloadedError past this
+            logger: Logger instance
+
+        Returns:
+            Dictionary of measurements in cm
+        """
+        deadline = time.monotonic() + max_wait_s
+        while True:
+            try:
+                return await self.measure(content, image_hash, target_height, logger)
+            except ServiceOverloadedError as e:
+                retry_after = int(e.headers["Retry-After"])
+                if time.monotonic() + retry_after > deadline:
+                    raise
+                await asyncio.sleep(retry_after)
@@ -1,72 +1,344 @@
+import asyncio
+import io
+import tokenize
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import numpy as np
 import torch
-from pathlib import Path
 from logging import Logger
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, TypeVar
 
 from romp_pipeline.core.measure import MeasureBody
-from romp_pipeline.api.exceptions import MeasurementExtractionError
+from romp_pipeline.core.assets import get_body_model_assets
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import MeasurementExtractionError, VertsValidationError
+
+T = TypeVar("T")
 
 class MeasurementService:
     """Service for extracting measurements from ROMP output"""
     
     EXCLUDED_MEASUREMENTS = {"head circumference", "height", "inside leg height"}
-    
-    def extract_measurements(self, npz_path: Path, target_height: float, logger: Logger) -> Dict[str, float]:
+    NUM_VERTS = 6890
+    NPY_MAGIC = b"\x93NUMPY"
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=settings.MEASUREMENT_WORKERS,
+                                            thread_name_prefix="measure")
+
+    async def run_in_pool(self, func: Callable[..., T], *args: Any) -> T:
         """
-        Extract measurements from NPZ file.
+        Run a measurement call in the measurement worker pool,
+        so the CPU-heavy geometry does not block the event loop.
+        
+        Returns:
+            The result of func(*args)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def load_assets(self, logger: Logger) -> bool:
+        """
+        Load the shared SMPL assets (faces, joint regressor, face segmentation)
+        so the first request does not pay for reading them.
+        
+        Returns:
+            True if the assets were loaded
+        """
+        try:
+            get_body_model_assets("smpl", gender="NEUTRAL")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to preload SMPL assets: {e}")
+            return False
+
+    def decode_verts(self, data: bytes) -> np.ndarray:
+        """
+        Decode SMPL vertices sent as raw little-endian float32 bytes or as a .npy file.
+        The array is a view on data, nothing is copied; it is read-only when
+        data is immutable bytes, as /measure/verts passes it.
+        
+        Args:
+            data: Request body, either 6890*3 float32 values or a .npy file
+        
+        Returns:
+            Array of shape (6890, 3)
+        """
+        if data.startswith(self.NPY_MAGIC):
+            buffer = io.BytesIO(data)
+            try:
+                version = np.lib.format.read_magic(buffer)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+                elif version == (2, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+                else:
+                    raise ValueError(f"unsupported format version {version[0]}.{version[1]}")
+            # the header dict is parsed as a Python literal, which fails with any of these
+            except (ValueError, SyntaxError, tokenize.TokenError) as e:
+                raise VertsValidationError(f"Malformed .npy header: {e}")
+            
+            if dtype.kind != "f":
+                raise VertsValidationError(f"Expected a float array, got dtype {dtype}")
+            if fortran_order:
+                raise VertsValidationError("Fortran-ordered arrays are not supported")
+            if shape not in ((self.NUM_VERTS, 3), (1, self.NUM_VERTS, 3)):
+                raise VertsValidationError(f"Expected shape ({self.NUM_VERTS}, 3), got {shape}")
+            
+            offset = buffer.tell()
+            count = self.NUM_VERTS * 3
+            if len(data) - offset != count * dtype.itemsize:
+                raise VertsValidationError("Array data does not match the .npy header")
+            verts = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        else:
+            expected_size = self.NUM_VERTS * 3 * 4
+            if len(data) != expected_size:
+                raise VertsValidationError(
+                    f"Expected {expected_size} bytes of float32 ({self.NUM_VERTS}, 3) data, got {len(data)}")
+            verts = np.frombuffer(data, dtype="<f4")
+        
+        verts = verts.reshape(self.NUM_VERTS, 3)
+        if not np.isfinite(verts).all():
+            raise VertsValidationError("Vertices contain NaN or infinite values")
+        return verts
+
+    def measure_verts(self, verts, target_height: float, logger: Logger) -> Dict[str, float]:
+        """
+        Measure a single SMPL body given by its vertices.
         
         Args:
-            npz_path: Path to NPZ file
+            verts: Array or tensor of shape (6890, 3)
             target_height: Target height for normalization
             logger: Logger instance
-            
+        
         Returns:
             Dictionary of measurements
         """
+        return self.normalize_measurements(self.measure_raw(verts, logger), target_height)
+
+    def measure_raw(self, verts, logger: Logger) -> Dict[str, float]:
+        """
+        Measure a single SMPL body at the scale of the model, before height normalization.
+        The result only depends on the verts, so it can be cached and normalized per request.
+        
+        Args:
+            verts: Array or tensor of shape (6890, 3)
+            logger: Logger instance
+        
+        Returns:
+            Dictionary of all measurements in cm, height included
+        """
         try:
-            # Load data
-            data = np.load(str(npz_path), allow_pickle=True)
-            results = data['results'][()]
-            
-            if 'verts' not in results:
-                raise MeasurementExtractionError("No 'verts' key found in NPZ file")
-            
-            verts = results['verts']
-            
-            # Handle shapes
-            if len(verts.shape) == 3:  # (frames, vertices, 3)
-                verts = verts[0]
-            elif len(verts.shape) != 2:
-                raise MeasurementExtractionError(f"Unexpected verts shape: {verts.shape}")
-            
-            # Convert to tensor
-            if isinstance(verts, np.ndarray):
-                verts = torch.from_numpy(verts).float()
-            
-            # Measure
             measurer = MeasureBody('smpl')
             measurer.from_verts(verts=verts)
             measurer.measure(measurer.all_possible_measurements)
             
-            # Normalize
-            measurer.height_normalize_measurements(target_height)
-            raw_measurements = measurer.height_normalized_measurements
+            logger.info(f"Extracted {len(measurer.measurements)} measurements")
+            return {k: float(v) for k, v in measurer.measurements.items()}
+        
+        except Exception as e:
+            logger.exception("Measurement extraction failed")
+            raise MeasurementExtractionError(str(e))
+
+    def normalize_measurements(self,
+                               raw_measurements: Dict[str, float],
+                               target_height: Optional[float]) -> Dict[str, float]:
+        """
+        Scale raw measurements to the target height, the way
+        MeasureBody.height_normalize_measurements does, then filter and round them.
+        Every endpoint formats its measurements here, so they all follow one
+        rule: a body without a height is an error, any other measurement that
+        could not be found is left out.
+        
+        Args:
+            raw_measurements: Output of measure_raw, NaN or missing where a measurement failed
+            target_height: Target height for normalization, None keeps the model scale
+        
+        Returns:
+            Dictionary of measurements
+
+        Raises:
+            MeasurementExtractionError: if the height could not be measured
+        """
+        # raw measurements also come back from the result cache, the verts
+        # store and the work queue
+        old_height = raw_measurements.get("height")
+        if old_height is None or not np.isfinite(old_height) or old_height <= 0:
+            raise MeasurementExtractionError("height could not be measured")
+        return {
+            k: round(float((v / old_height) * target_height if target_height is not None else v), 2)
+            for k, v in raw_measurements.items()
+            if k not in self.EXCLUDED_MEASUREMENTS and np.isfinite(v)
+        }
+
+    def format_batch(self,
+                     values: np.ndarray,
+                     names: List[str],
+                     target_heights: List[Optional[float]],
+                     skip_unmeasured: bool = False) -> List[Optional[Dict[str, float]]]:
+        """
+        Turn a (B, M) array from MeasureSMPL.measure_batch into response
+        dictionaries, row by row with normalize_measurements.
+        
+        Args:
+            values: Measurements in cm, NaN where a measurement failed
+            names: Measurement names, the columns of values
+            target_heights: Target height per row, None keeps the model scale
+            skip_unmeasured: Return None for a body without a height instead of
+                raising, for batches of independent requests or frames
+        
+        Returns:
+            List of B dictionaries of measurements
+        """
+        results = []
+        for row, target_height in zip(values, target_heights):
+            try:
+                results.append(self.normalize_measurements(dict(zip(names, row.tolist())), target_height))
+            except MeasurementExtractionError:
+                if not skip_unmeasured:
+                    raise
+                results.append(None)
+        return results
+
+    def select_verts(self, results: Dict[str, Any]) -> np.ndarray:
+        """
+        Vertices of the primary subject in ROMP outputs.
+        
+        Args:
+            results: ROMP outputs, from the NPZ file or the in-process engine
+            
+        Returns:
+            Array of shape (6890, 3)
+        """
+        verts = self._all_verts(results)
+        return verts[self.primary_person(results, len(verts))]
+
+    def _all_verts(self, results: Dict[str, Any]) -> np.ndarray:
+        """Vertices of every detected person, shape (N, 6890, 3)"""
+        if 'verts' not in results:
+            raise MeasurementExtractionError("No 'verts' key found in ROMP results")
+        
+        verts = results['verts']
+        
+        # Handle shapes
+        if len(verts.shape) == 2:
+            verts = verts[None]
+        elif len(verts.shape) != 3:  # (people, vertices, 3)
+            raise MeasurementExtractionError(f"Unexpected verts shape: {verts.shape}")
+        return verts
+
+    def person_boxes(self, results: Dict[str, Any], num_people: int) -> Optional[np.ndarray]:
+        """
+        Image-space bounding boxes of the detected people, from the 2D
+        joint projections ROMP returns (pj2d_org).
+        
+        Returns:
+            Array of shape (N, 4) as x_min, y_min, x_max, y_max, None without projections
+        """
+        pj2d = results.get('pj2d_org')
+        if pj2d is None or len(pj2d) != num_people:
+            return None
+        pj2d = np.asarray(pj2d, dtype=np.float32)
+        return np.concatenate([pj2d.min(axis=1), pj2d.max(axis=1)], axis=1)
+
+    def primary_person(self, results: Dict[str, Any], num_people: int) -> int:
+        """
+        Index of the main subject: the person with the largest projected
+        bounding box, or the largest camera scale (the closest person) when
+        the projections are missing.
+        """
+        if num_people <= 1:
+            return 0
+        
+        boxes = self.person_boxes(results, num_people)
+        if boxes is not None:
+            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            return int(np.argmax(areas))
+        
+        cam = results.get('cam')
+        if cam is not None and len(cam) == num_people:
+            return int(np.argmax(np.asarray(cam)[:, 0]))
+        return 0
+
+    def measure_people(self, results: Dict[str, Any], target_height: float, logger: Logger) -> List[Dict[str, Any]]:
+        """
+        Measure every person detected by ROMP in one batched evaluation.
+        
+        Args:
+            results: ROMP outputs, from the NPZ file or the in-process engine
+            target_height: Target height for normalization, applied to every person
+            logger: Logger instance
             
-            # Filter and format
-            measurements = {
-                k: round(float(v), 2)
-                for k, v in raw_measurements.items()
-                if k not in self.EXCLUDED_MEASUREMENTS
-            }
+        Returns:
+            One dictionary per person with its measurements and ROMP metadata
+            (primary flag, cam_trans, bbox)
+        """
+        try:
+            verts = self._all_verts(results)
+            num_people = len(verts)
+            measurements = self.measure_verts_batch(verts, [target_height] * num_people, logger)
             
-            logger.info(f"Extracted {len(measurements)} measurements")
-            return measurements
+            primary = self.primary_person(results, num_people)
+            boxes = self.person_boxes(results, num_people)
+            cam_trans = results.get('cam_trans')
+            if cam_trans is not None and len(cam_trans) != num_people:
+                cam_trans = None
             
+            return [
+                {
+                    "index": i,
+                    "primary": i == primary,
+                    "cam_trans": np.asarray(cam_trans[i]).tolist() if cam_trans is not None else None,
+                    "bbox": boxes[i].tolist() if boxes is not None else None,
+                    "measurements": measurements[i],
+                }
+                for i in range(num_people)
+            ]
+            
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def measure_verts_batch(self,
+                            verts: np.ndarray,
+                            target_heights: List[Optional[float]],
+                            logger: Logger,
+                            skip_unmeasured: bool = False) -> List[Optional[Dict[str, float]]]:
+        """
+        Measure a batch of SMPL bodies given by their vertices.
+        
+        Args:
+            verts: Array of shape (B, 6890, 3)
+            target_heights: Target height per body, None keeps the model scale
+            logger: Logger instance
+            skip_unmeasured: None for a body without a height instead of raising, see format_batch
+        
+        Returns:
+            List of B dictionaries of measurements
+        """
+        try:
+            values, names = MeasureBody('smpl').measure_batch(verts)
         except Exception as e:
-            if isinstance(e, MeasurementExtractionError): raise
             logger.exception("Measurement extraction failed")
             raise MeasurementExtractionError(str(e))
+        
+        logger.info(f"Measured batch of {len(verts)} bodies")
+        return self.format_batch(values, names, target_heights, skip_unmeasured)
+
+    def extract_raw_from_results(self, results: Dict[str, Any], logger: Logger) -> Dict[str, float]:
+        """
+        Extract raw measurements (see measure_raw) from ROMP outputs.
+        
+        Args:
+            results: ROMP outputs, from the NPZ file or the in-process engine
+            logger: Logger instance
+            
+        Returns:
+            Dictionary of all measurements in cm, height included
+        """
+        try:
+            return self.measure_raw(self.select_verts(results), logger)
+            
         finally:
             # Cleanup GPU memory if needed
             if torch.cuda.is_available():
@@ -0,0 +1,93 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import List, Optional
+
+from romp_pipeline.api.exceptions import APIException
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+from romp_pipeline.api.services.work_queue import WorkItem, WorkQueue, WorkResult
+
+class QueueWorker:
+    """
+    Consumer of a WorkQueue: claims images and runs the ROMP and
+    measurement stages on them with the local MeasurePipeline.
+
+    `concurrency` items are processed at once, enough to keep the local
+    inference workers (and the engine's batches) busy. The queue calls
+    block, so they run on a thread pool of their own. stop() lets the
+    items already claimed finish before it returns.
+    """
+
+    CLAIM_TIMEOUT_S = 1.0
+
+    def __init__(self, queue: WorkQueue, pipeline: MeasurePipeline) -> None:
+        self._queue = queue
+        self._pipeline = pipeline
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running = False
+        self._processed = 0
+        self._failed = 0
+
+    def start(self, concurrency: int, logger: Logger) -> None:
+        """
+        Start consuming on the running event loop.
+
+        Args:
+            concurrency: Items processed at once
+            logger: Logger instance
+        """
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="work-queue")
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._consume(logger)) for _ in range(concurrency)]
+
+    async def stop(self) -> None:
+        """Stop claiming, and wait for the claimed items to finish"""
+        self._running = False
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _consume(self, logger: Logger) -> None:
+        loop = asyncio.get_running_loop()
+        while self._running:
+            try:
+                item = await loop.run_in_executor(self._executor, self._queue.claim, self.CLAIM_TIMEOUT_S)
+            except Exception:
+                logger.exception("Work queue claim failed")
+                await asyncio.sleep(self.CLAIM_TIMEOUT_S)
+                continue
+            if item is None:
+                continue
+
+            result = await self._process(item, logger)
+            try:
+                await loop.run_in_executor(self._executor, self._queue.finish, item.id, result)
+            except Exception:
+                logger.exception(f"Work queue finish failed for {item.id}")
+
+    async def _process(self, item: WorkItem, logger: Logger) -> WorkResult:
+        try:
+            raw = await self._pipeline.compute_raw(item.image, item.image_hash, logger)
+        except APIException as e:
+            self._failed += 1
+            return WorkResult(error=e.message, status_code=e.status_code, headers=e.headers)
+        except Exception:
+            logger.exception(f"Work item {item.id} failed")
+            self._failed += 1
+            return WorkResult(error="Internal server error", status_code=500)
+        self._processed += 1
+        return WorkResult(raw=raw)
+
+    def stats(self) -> dict:
+        """Items processed by this worker, for /health"""
+        return {
+            "consumers": len(self._tasks),
+            "processed": self._processed,
+            "failed": self._failed,
+        }
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+class ResultCache:
+    """
+    Content-addressed cache of raw (not height-normalized) measurements.
+
+    Entries are keyed by the SHA-256 of the image bytes. Raw measurements
+    only depend on the image, so a repeated image skips ROMP and the mesh
+    measurement and only the height scaling is applied per request.
+    A bounded in-memory LRU is backed by an optional on-disk tier of small
+    JSON files that expire after `ttl_s`. Entries are tagged with `version`,
+    a fingerprint of the measurement definitions; entries written under
+    other definitions are ignored.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[str], ttl_s: float, version: str) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.version = version
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self._disk_dir is not None
+
+    async def get(self, key: str) -> Optional[Dict[str, float]]:
+        """
+        Look up the raw measurements of an image.
+
+        Args:
+            key: SHA-256 of the image content
+
+        Returns:
+            Raw measurements, or None on a miss
+        """
+        raw = self._entries.get(key)
+        if raw is not None:
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return raw
+
+        if self._disk_dir is not None:
+            loop = asyncio.get_running_loop()
+            raw = await loop.run_in_executor(None, self._read, key)
+            if raw is not None:
+                self._disk_hits += 1
+                self._remember(key, raw)
+                return raw
+
+        self._misses += 1
+        return None
+
+    async def put(self, key: str, raw: Dict[str, float]) -> None:
+        """
+        Store the raw measurements of an image.
+
+        Args:
+            key: SHA-256 of the image content
+            raw: Raw measurements, height included
+        """
+        self._remember(key, raw)
+        if self._disk_dir is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, key, raw)
+
+    def _remember(self, key: str, raw: Dict[str, float]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = raw
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self._disk_dir / key[:2] / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[Dict[str, float]]:
+        path = self._path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl_s:
+                path.unlink()
+                return None
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != self.version:
+            return None
+        return entry.get("measurements")
+
+    def _write(self, key: str, raw: Dict[str, float]) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write and rename, so a concurrent reader never sees half a file
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": self.version, "measurements": raw}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the disk tier is best effort, the memory tier still has the entry
+            pass
+
+    def stats(self) -> dict:
+        """Hit and miss counters, for /health"""
+        lookups = self._hits + self._disk_hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk": self._disk_dir is not None,
+            "hits": self._hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+        }
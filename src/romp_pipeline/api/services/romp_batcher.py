@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import numpy as np
+
+from romp_pipeline.api.exceptions import ROMPProcessingError
+from romp_pipeline.api.services.romp_engine import ROMPEngine
+
+@dataclass
+class _PendingImage:
+    """An image waiting for the next ROMP batch"""
+    image: np.ndarray
+    future: asyncio.Future
+
+class ROMPBatcher:
+    """
+    Dynamic micro-batching in front of the ROMP engine.
+
+    Images that arrive within `window_ms` of the first one are collected,
+    up to `max_size`, and run through the engine as one batched forward
+    pass; each request then gets its own outputs back. Under load this
+    amortises the backbone over the batch, while a lone request waits at
+    most one window.
+    """
+
+    STATS_WINDOW = 256
+
+    def __init__(self, engine: ROMPEngine, executor: Executor, window_ms: float, max_size: int) -> None:
+        self._engine = engine
+        self._executor = executor
+        self.window_ms = window_ms
+        self.max_size = max_size
+        self._pending: List[_PendingImage] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._images = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=self.STATS_WINDOW)
+        self._batch_times: Deque[float] = deque(maxlen=self.STATS_WINDOW)
+
+    async def infer(self, image: np.ndarray, logger: Logger) -> Dict[str, Any]:
+        """
+        Run ROMP on image as part of the next batch.
+
+        Args:
+            image: BGR image of shape (H, W, 3), as read by cv2
+            logger: Logger instance
+
+        Returns:
+            ROMP outputs (verts, joints, cam, smpl_betas, ...) as numpy arrays
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingImage(image, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush(logger)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush, logger)
+
+        outputs = await future
+        if outputs is None:
+            raise ROMPProcessingError("No person detected in image")
+        return outputs
+
+    def _flush(self, logger: Logger) -> None:
+        """Hand the pending images to the engine as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch, logger))
+            self._tasks.add(task)
+            task.add_done_callback(lambda task: self._batch_done(task, batch, logger))
+
+    def _batch_done(self, task: asyncio.Task, batch: List[_PendingImage], logger: Logger) -> None:
+        """Forget a finished batch; if it died, fail the requests still waiting on it"""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"ROMP batch failed: {task.exception()!r}")
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(ROMPProcessingError("batch did not complete"))
+
+    async def stop(self) -> None:
+        """Drop the images not handed to the engine yet and wait for the running batches"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for item in self._pending:
+            item.future.cancel()
+        self._pending = []
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run_batch(self, batch: List[_PendingImage], logger: Logger) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = time.monotonic()
+        try:
+            results = await loop.run_in_executor(self._executor, self._engine.infer_batch,
+                                                 [item.image for item in batch], logger)
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            self._batches += 1
+            self._images += len(batch)
+            self._batch_sizes.append(len(batch))
+            self._batch_times.append(time.monotonic() - started_at)
+
+        logger.info(f"ROMP batch of {len(batch)} images")
+        for item, outputs in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(outputs)
+
+    @staticmethod
+    def _mean(values: Deque[float]) -> float:
+        return sum(values) / len(values) if values else 0.0
+
+    def stats(self) -> dict:
+        """Batch size and batch latency, for /health"""
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_size,
+            "batches": self._batches,
+            "images": self._images,
+            "mean_batch_size": self._mean(self._batch_sizes),
+            "mean_batch_ms": self._mean(self._batch_times) * 1000,
+        }
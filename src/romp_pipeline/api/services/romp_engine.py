@@ -0,0 +1,173 @@
+import threading
+from logging import Logger
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+
+from romp_pipeline.api.exceptions import ROMPNotAvailableError, ROMPProcessingError
+
+class _BatchedForward:
+    """
+    ROMP's forward pass over a list of images.
+
+    simple_romp's public API is its single image __call__, so this is the
+    one place that uses its internals: the images are letterboxed to the
+    same 512x512 input and stacked for one backbone pass, then center map
+    parsing, SMPL and the projection back to the original image run per
+    image, as ROMP's own forward does.
+    """
+
+    def __init__(self, model: Any) -> None:
+        from romp.post_parser import body_mesh_projection2image, parsing_outputs
+        from romp.utils import convert_cam_to_3d_trans, convert_tensor2numpy, img_preprocess
+
+        self._model = model
+        self._img_preprocess = img_preprocess
+        self._parsing_outputs = parsing_outputs
+        self._convert_cam_to_3d_trans = convert_cam_to_3d_trans
+        self._body_mesh_projection2image = body_mesh_projection2image
+        self._convert_tensor2numpy = convert_tensor2numpy
+
+    @classmethod
+    def create(cls, model: Any, logger: Logger) -> Optional["_BatchedForward"]:
+        """
+        The batched forward of model, None if images have to run one by one.
+
+        ONNX, temporal smoothing and rendering only exist in ROMP's single
+        image forward; a ROMP whose internals moved is run one image at a
+        time through its public API rather than failing to load.
+        """
+        settings = model.settings
+        if settings.onnx or settings.temporal_optimize or settings.render_mesh:
+            return None
+        try:
+            return cls(model)
+        except ImportError as e:
+            logger.warning(f"ROMP batching unavailable, running images one by one: {e}")
+            return None
+
+    def __call__(self, images: List[np.ndarray]) -> List[Optional[Dict[str, Any]]]:
+        model = self._model
+        inputs, pad_infos = zip(*(self._img_preprocess(image) for image in images))
+
+        center_maps, params_maps = model.model(torch.cat(inputs).to(model.tdevice))
+        params_maps[:, 0] = torch.pow(1.1, params_maps[:, 0])
+
+        results = []
+        for i, pad_info in enumerate(pad_infos):
+            outputs = self._parsing_outputs(center_maps[i:i + 1], params_maps[i:i + 1],
+                                            model.centermap_parser)
+            if outputs is None:
+                results.append(None)
+                continue
+
+            outputs['cam_trans'] = self._convert_cam_to_3d_trans(outputs['cam'])
+            if model.settings.calc_smpl:
+                outputs = model.smpl_parser(outputs, root_align=model.settings.root_align)
+                outputs.update(self._body_mesh_projection2image(outputs['joints'], outputs['cam'],
+                                                                vertices=outputs['verts'],
+                                                                input2org_offsets=pad_info))
+            results.append(self._convert_tensor2numpy(outputs))
+        return results
+
+class ROMPEngine:
+    """
+    In-process simple_romp model.
+
+    The ROMP checkpoint and SMPL parser are loaded once and kept in memory,
+    so a request only pays for the forward pass instead of interpreter
+    start-up, torch import and model initialisation of a `romp` subprocess.
+    """
+
+    def __init__(self, romp_args: List[str]) -> None:
+        self._romp_args = romp_args
+        self._model = None
+        self._batch_forward: Optional[_BatchedForward] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self, logger: Logger) -> bool:
+        """
+        Load the ROMP model.
+
+        Returns:
+            True if the model is ready for inference
+        """
+        if self._model is not None:
+            return True
+
+        try:
+            import romp
+
+            args = romp.romp_settings(input_args=self._romp_args)
+            self._model = romp.ROMP(args)
+            self._batch_forward = _BatchedForward.create(self._model, logger)
+            logger.info(f"ROMP engine loaded on {self._model.tdevice}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load ROMP engine: {e}")
+            self._model = None
+            self._batch_forward = None
+            return False
+
+    def infer(self, image: np.ndarray, logger: Logger) -> Dict[str, Any]:
+        """
+        Run ROMP on a single image.
+
+        Args:
+            image: BGR image of shape (H, W, 3), as read by cv2
+            logger: Logger instance
+
+        Returns:
+            ROMP outputs (verts, joints, cam, smpl_betas, ...) as numpy arrays
+        """
+        outputs = self._forward(image, logger)
+        if outputs is None:
+            raise ROMPProcessingError("No person detected in image")
+        return outputs
+
+    def infer_batch(self, images: List[np.ndarray], logger: Logger) -> List[Optional[Dict[str, Any]]]:
+        """
+        Run ROMP on several images, with one batched backbone forward pass
+        when the loaded ROMP supports it and one forward per image otherwise.
+
+        Args:
+            images: BGR images of shape (H, W, 3), as read by cv2
+            logger: Logger instance
+
+        Returns:
+            ROMP outputs for each image, None where no person was detected
+        """
+        if self._model is None:
+            raise ROMPNotAvailableError()
+
+        if self._batch_forward is None:
+            return [self._forward(image, logger) for image in images]
+
+        with self._lock, torch.no_grad():
+            try:
+                return self._batch_forward(images)
+            except RuntimeError as e:
+                logger.error(f"ROMP batch of {len(images)} failed: {e}")
+                if "out of memory" in str(e).lower():
+                    raise ROMPProcessingError("GPU out of memory")
+                raise ROMPProcessingError(str(e))
+
+    def _forward(self, image: np.ndarray, logger: Logger) -> Optional[Dict[str, Any]]:
+        """ROMP's own single image forward, None if no person was detected"""
+        if self._model is None:
+            raise ROMPNotAvailableError()
+
+        # the model is not thread-safe, requests take turns
+        with self._lock, torch.no_grad():
+            try:
+                return self._model(image)
+            except RuntimeError as e:
+                logger.error(f"ROMP failed: {e}")
+                if "out of memory" in str(e).lower():
+                    raise ROMPProcessingError("GPU out of memory")
+                raise ROMPProcessingError(str(e))
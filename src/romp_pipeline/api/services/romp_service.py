@@ -1,14 +1,20 @@
+import asyncio
 import os
-import subprocess
 import sys
 import sysconfig
 from pathlib import Path
 from logging import Logger
+from concurrent.futures import ThreadPoolExecutor
 from shutil import which
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 from romp_pipeline.api.config import settings
 from romp_pipeline.api.exceptions import ROMPProcessingError, ROMPNotAvailableError
+from romp_pipeline.api.services.romp_engine import ROMPEngine
+from romp_pipeline.api.services.romp_batcher import ROMPBatcher
+from romp_pipeline.api.services.scratch_pool import ScratchDirPool
 
 class ROMPService:
     """Service for running ROMP inference"""
@@ -16,6 +22,22 @@ class ROMPService:
     def __init__(self) -> None:
         self._available: Optional[bool] = None
         self._romp_command: Optional[List[str]] = None
+        self._engine: Optional[ROMPEngine] = None
+        self._batcher: Optional[ROMPBatcher] = None
+        self._scratch = ScratchDirPool(settings.SCRATCH_DIR, settings.SCRATCH_POOL_SIZE)
+        # each thread runs one batch at a time
+        self._engine_executor = ThreadPoolExecutor(max_workers=settings.ROMP_CONCURRENCY,
+                                                   thread_name_prefix="romp")
+
+    def _romp_args(self) -> List[str]:
+        """ROMP settings shared by the CLI and the in-process engine"""
+        args = ["--mode=image"]
+        # ROMP computes the SMPL verts by default (--calc_smpl is a
+        # store_false flag that turns them off), rendering is only
+        # needed for a visual overlay
+        if settings.ROMP_RENDER_MESH:
+            args.append("--render_mesh")
+        return args
 
     def _resolve_command_path(self) -> Optional[List[str]]:
         """
@@ -66,8 +88,41 @@ class ROMPService:
         self._romp_command = None
         return None
 
+    def load_engine(self, logger: Logger) -> bool:
+        """
+        Load the in-process ROMP engine (ROMP_BACKEND=engine).
+        If loading fails, requests fall back to the `romp` subprocess.
+        
+        Returns:
+            True if the engine is loaded
+        """
+        if self._engine is None:
+            self._engine = ROMPEngine(self._romp_args())
+            self._batcher = ROMPBatcher(self._engine, self._engine_executor,
+                                        settings.ROMP_BATCH_WINDOW_MS, settings.ROMP_BATCH_MAX_SIZE)
+        return self._engine.load(logger)
+
+    @property
+    def use_engine(self) -> bool:
+        """Whether requests run on the in-process engine"""
+        return self._engine is not None and self._engine.is_loaded
+
+    async def stop(self) -> None:
+        """Wait for the engine batches in flight"""
+        if self._batcher is not None:
+            await self._batcher.stop()
+
+    def batch_stats(self) -> Optional[dict]:
+        """Micro-batching statistics of the engine, None without engine"""
+        if not self.use_engine:
+            return None
+        return self._batcher.stats()
+
     def check_availability(self) -> bool:
         """Check if ROMP command is available (cached)"""
+        if self.use_engine:
+            return True
+
         if self._available is not None:
             return self._available
 
@@ -83,9 +138,10 @@ class ROMPService:
         self._available = True
         return True
 
-    def run_inference(self, image_path: Path, output_dir: Path, logger: Logger) -> Path:
+    async def run_inference(self, image_path: Path, output_dir: Path, logger: Logger) -> Path:
         """
         Run ROMP on image and return path to NPZ output.
+        The romp process runs without blocking the event loop.
         
         Args:
             image_path: Input image path
@@ -102,41 +158,40 @@ class ROMPService:
         if not command:
             raise ROMPNotAvailableError()
 
-        romp_cmd = command + [
-            "--mode=image",
-            "--calc_smpl",
-            "--render_mesh",  # Required for verts generation
+        romp_cmd = command + self._romp_args() + [
             f"-i={image_path}",
             f"-o={output_dir}"
         ]
         
         logger.info(f"Running ROMP: {' '.join(romp_cmd)}")
         
+        process = await asyncio.create_subprocess_exec(
+            *romp_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
         try:
-            result = subprocess.run(
-                romp_cmd, 
-                check=True, 
-                capture_output=True, 
-                timeout=settings.ROMP_TIMEOUT
-            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=settings.ROMP_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.error("ROMP timed out")
+            raise ROMPProcessingError("Processing timed out")
             
-            if result.stdout:
-                logger.debug(f"ROMP stdout: {result.stdout.decode()}")
-            if result.stderr:
-                logger.debug(f"ROMP stderr: {result.stderr.decode()}")
-                
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode() if e.stderr else "Unknown error"
+        if stdout:
+            logger.debug(f"ROMP stdout: {stdout.decode()}")
+        if stderr:
+            logger.debug(f"ROMP stderr: {stderr.decode()}")
+            
+        if process.returncode != 0:
+            error_msg = stderr.decode() if stderr else "Unknown error"
             logger.error(f"ROMP failed: {error_msg}")
             
             if "out of memory" in error_msg.lower():
                 raise ROMPProcessingError("GPU out of memory")
             raise ROMPProcessingError(error_msg)
             
-        except subprocess.TimeoutExpired:
-            logger.error("ROMP timed out")
-            raise ROMPProcessingError("Processing timed out")
-            
         # Verify output
         basename = os.path.splitext(os.path.basename(image_path))[0]
         npz_path = output_dir / f"{basename}.npz"
@@ -146,7 +201,8 @@ class ROMPService:
             logger.error(f"ROMP output missing. Found files: {files}")
             raise ROMPProcessingError("Output file not generated")
             
-        # Cleanup PNG
+        # Cleanup PNG (the rendered overlay, or a copy of the input image
+        # which the CLI always writes)
         png_path = output_dir / f"{basename}.png"
         if png_path.exists():
             try:
@@ -155,3 +211,62 @@ class ROMPService:
                 pass
                 
         return npz_path
+
+    async def run_engine_inference(self, image: np.ndarray, logger: Logger) -> Dict[str, Any]:
+        """
+        Run ROMP on image with the in-process engine, batched with
+        concurrent requests (ROMP_BATCH_WINDOW_MS, ROMP_BATCH_MAX_SIZE).
+        
+        Args:
+            image: Decoded BGR image
+            logger: Logger instance
+            
+        Returns:
+            ROMP outputs, same content as the 'results' of the CLI NPZ
+        """
+        if not self.use_engine:
+            raise ROMPNotAvailableError()
+
+        logger.info("Running ROMP engine")
+        return await self._batcher.infer(image, logger)
+
+    async def run_engine_batch(self, images: List[np.ndarray], logger: Logger) -> List[Optional[Dict[str, Any]]]:
+        """
+        Run ROMP on a batch of images that is already formed, e.g. video frames,
+        without going through the micro-batching window.
+        
+        Args:
+            images: Decoded BGR images
+            logger: Logger instance
+            
+        Returns:
+            ROMP outputs per image, None where no person was detected
+        """
+        if not self.use_engine:
+            raise ROMPNotAvailableError()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._engine_executor, self._engine.infer_batch, images, logger)
+
+    async def run_subprocess_inference(self, content: bytes, logger: Logger) -> Dict[str, Any]:
+        """
+        Run ROMP on image content with the CLI, in a pooled RAM-backed scratch directory.
+        
+        Args:
+            content: Image file content
+            logger: Logger instance
+            
+        Returns:
+            ROMP outputs loaded from the NPZ
+        """
+        with self._scratch.acquire() as scratch_dir:
+            image_path = scratch_dir / "input.jpg"  # cv2 detects the format from the content
+            image_path.write_bytes(content)
+            
+            npz_path = await self.run_inference(image_path, scratch_dir, logger)
+            
+            try:
+                with np.load(str(npz_path), allow_pickle=True) as data:
+                    return data['results'][()]
+            except Exception as e:
+                raise ROMPProcessingError(f"Failed to read ROMP output: {e}")
@@ -0,0 +1,83 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+class ScratchDirPool:
+    """
+    Pool of reusable scratch directories for the ROMP subprocess.
+
+    The directories live under a RAM-backed root (/dev/shm by default), are
+    created once and emptied when released, so a request does not pay for
+    creating and removing a temporary directory on disk. When every pooled
+    directory is in use, a one-off directory is created and removed instead.
+    """
+
+    def __init__(self, root: str, size: int) -> None:
+        self._root_setting = root
+        self._size = size
+        self._root: Optional[Path] = None
+        self._free: "queue.SimpleQueue[Path]" = queue.SimpleQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _get_root(self) -> Path:
+        if self._root is None:
+            root = Path(self._root_setting)
+            if not root.parent.is_dir():
+                # no /dev/shm (e.g. macOS), use the regular temp dir
+                root = Path(tempfile.gettempdir()) / root.name
+            root.mkdir(parents=True, exist_ok=True)
+            self._root = root
+        return self._root
+
+    def _take(self) -> Optional[Path]:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created >= self._size:
+                return None
+            self._created += 1
+            return Path(tempfile.mkdtemp(prefix="pool_", dir=self._get_root()))
+
+    @staticmethod
+    def _empty(path: Path) -> None:
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def acquire(self) -> Iterator[Path]:
+        """Yield an empty scratch directory, emptied again on exit"""
+        path = self._take()
+        if path is None:
+            path = Path(tempfile.mkdtemp(prefix="overflow_", dir=self._get_root()))
+            try:
+                yield path
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+            return
+
+        try:
+            yield path
+        finally:
+            try:
+                self._empty(path)
+                self._free.put(path)
+            except OSError:
+                # drop a directory that can't be emptied, a new one replaces it
+                shutil.rmtree(path, ignore_errors=True)
+                with self._lock:
+                    self._created -= 1
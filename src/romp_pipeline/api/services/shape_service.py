@@ -0,0 +1,139 @@
+import asyncio
+from dataclasses import dataclass
+from logging import Logger
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from romp_pipeline.core.measure import MeasureSMPL
+from romp_pipeline.core.assets import get_body_model_assets
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import MeasurementExtractionError
+from romp_pipeline.api.services.measurement_service import MeasurementService
+
+@dataclass
+class _PendingShape:
+    """A queued /measure/shape request waiting for its batch"""
+    betas: List[float]
+    target_height: Optional[float]
+    future: asyncio.Future
+
+class ShapeService:
+    """
+    Service for measuring SMPL bodies given by shape parameters.
+
+    Requests that arrive within SHAPE_BATCH_WINDOW_MS of each other are
+    coalesced per gender, so a burst of calls costs one batched measurement
+    in the shape space of the gender instead of one SMPL forward pass and
+    one measurement per call.
+    """
+
+    def __init__(self, measurement_service: MeasurementService) -> None:
+        self._measurement_service = measurement_service
+        self._pending: Dict[str, List[_PendingShape]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def measure(self,
+                      gender: str,
+                      betas: List[float],
+                      target_height: Optional[float],
+                      logger: Logger) -> Dict[str, float]:
+        """
+        Measure one body, batched with concurrent requests of the same gender.
+
+        Args:
+            gender: MALE, FEMALE or NEUTRAL
+            betas: SMPL shape parameters
+            target_height: Target height for normalization, None keeps the model scale
+            logger: Logger instance
+
+        Returns:
+            Dictionary of measurements
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(gender, [])
+        pending.append(_PendingShape(betas, target_height, future))
+
+        if len(pending) >= settings.SHAPE_BATCH_MAX_SIZE:
+            self._flush(gender, logger)
+        elif gender not in self._timers:
+            self._timers[gender] = loop.call_later(settings.SHAPE_BATCH_WINDOW_MS / 1000,
+                                                   self._flush, gender, logger)
+
+        return await future
+
+    def _flush(self, gender: str, logger: Logger) -> None:
+        """Hand the pending requests of a gender to the measurement pool as one batch"""
+        timer = self._timers.pop(gender, None)
+        if timer is not None:
+            timer.cancel()
+
+        batch = self._pending.pop(gender, [])
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(gender, batch, logger))
+            self._tasks.add(task)
+            task.add_done_callback(lambda task: self._batch_done(task, batch, logger))
+
+    def _batch_done(self, task: asyncio.Task, batch: List[_PendingShape], logger: Logger) -> None:
+        """Forget a finished batch; if it died, fail the requests still waiting on it"""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Shape batch failed: {task.exception()!r}")
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(MeasurementExtractionError("batch did not complete"))
+
+    async def stop(self) -> None:
+        """Drop the requests still waiting for their window and wait for the running batches"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for batch in self._pending.values():
+            for item in batch:
+                item.future.cancel()
+        self._pending.clear()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run_batch(self, gender: str, batch: List[_PendingShape], logger: Logger) -> None:
+        try:
+            results = await self._measurement_service.run_in_pool(self._measure_batch, gender, batch, logger)
+        except Exception as e:
+            logger.exception("Shape measurement failed")
+            error = e if isinstance(e, MeasurementExtractionError) else MeasurementExtractionError(str(e))
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(error)
+            return
+
+        for item, measurements in zip(batch, results):
+            if item.future.done():
+                continue
+            if measurements is None:
+                # only this request fails, not the rest of its batch
+                item.future.set_exception(MeasurementExtractionError("height could not be measured"))
+            else:
+                item.future.set_result(measurements)
+
+    def _measure_batch(self, gender: str, batch: List[_PendingShape], logger: Logger) -> List[Optional[Dict[str, float]]]:
+        """
+        Measure a batch of shapes of one gender.
+
+        Returns:
+            List of measurement dictionaries, in the order of the batch,
+            None for a shape whose height could not be measured
+        """
+        betas = np.array([item.betas for item in batch], dtype=np.float32)
+
+        # lengths and joints come from the shape basis of the gender, the
+        # mesh is only built for the circumferences, without the LBS forward
+        measurer = MeasureSMPL(assets=get_body_model_assets("smpl", gender=gender))
+        values, names = measurer.measure_betas(betas, gender=gender)
+
+        logger.info(f"Measured batch of {len(batch)} {gender.lower()} shapes")
+        return self._measurement_service.format_batch(values, names,
+                                                      [item.target_height for item in batch],
+                                                      skip_unmeasured=True)
@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """
+    De-duplication of concurrent identical work.
+
+    The first caller for a key starts the work as a task; callers with the
+    same key that arrive while it runs await the same task instead of
+    starting their own. The task is shielded, so a caller that goes away
+    does not cancel the work the others are waiting for.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._leaders = 0
+        self._shared = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func once for all concurrent callers with the same key.
+
+        Args:
+            key: Identity of the work, e.g. the image hash
+            func: Coroutine function doing the work
+
+        Returns:
+            The result of func()
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self._leaders += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._shared += 1
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """In-flight keys and de-duplicated callers, for /health"""
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self._leaders,
+            "shared": self._shared,
+        }
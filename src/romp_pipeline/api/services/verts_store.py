@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+class VertsStore:
+    """
+    On-disk store of ROMP output vertices, keyed by the SHA-256 of the image.
+
+    Each entry is a (6890, 3) .npy file in float32 (about 83 KB) or float16,
+    loaded memory-mapped, so re-measuring an archive after a landmark or
+    measurement change reads the verts instead of running ROMP again.
+    The store is capped at `max_bytes`; the least recently used entries
+    are evicted first, using the file mtime so the order survives restarts.
+    """
+
+    def __init__(self, root: str, max_bytes: int, dtype: str = "float32") -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.dtype = np.dtype(dtype)
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.npy"
+
+    def _get_index(self) -> "OrderedDict[str, int]":
+        """Entries and their sizes, least recently used first, read from disk once"""
+        if self._index is None:
+            entries = []
+            for path in self.root.glob("*/*.npy"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._size = sum(self._index.values())
+        return self._index
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._get_index()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._get_index())
+
+    def keys(self) -> Iterator[str]:
+        """Stored keys, least recently used first"""
+        with self._lock:
+            return iter(list(self._get_index()))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Read stored verts.
+
+        Args:
+            key: SHA-256 of the image
+
+        Returns:
+            Read-only memory-mapped array of shape (6890, 3), None if not stored
+        """
+        path = self._path(key)
+        with self._lock:
+            index = self._get_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+
+        try:
+            verts = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError, EOFError):
+            with self._lock:
+                self._size -= self._get_index().pop(key, 0)
+            return None
+        return verts
+
+    def put(self, key: str, verts: np.ndarray) -> None:
+        """
+        Store verts, evicting the least recently used entries beyond max_bytes.
+
+        Args:
+            key: SHA-256 of the image
+            verts: Array of shape (6890, 3)
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write and rename, so a concurrent reader never maps half a file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(verts, dtype=self.dtype))
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            index = self._get_index()
+            self._size += size - index.pop(key, 0)
+            index[key] = size
+            while self._size > self.max_bytes and len(index) > 1:
+                old_key, old_size = index.popitem(last=False)
+                self._size -= old_size
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        """Entry count and size, for /health"""
+        with self._lock:
+            index = self._get_index()
+            return {
+                "entries": len(index),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
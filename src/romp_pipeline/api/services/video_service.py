@@ -0,0 +1,143 @@
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.exceptions import ImageValidationError, VideoNotSupportedError
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.measurement_service import MeasurementService
+from romp_pipeline.api.services.romp_service import ROMPService
+
+class _FrameReader:
+    """Incremental decoding of a video file, a few frames at a time"""
+
+    def __init__(self, path: Path, stride: int, max_frames: int) -> None:
+        self._capture = cv2.VideoCapture(str(path))
+        if not self._capture.isOpened():
+            raise ImageValidationError("Could not open video")
+        self._stride = stride
+        self._max_frames = max_frames
+        self.decoded = 0
+        self.sampled = 0
+
+    def read(self, count: int) -> List[np.ndarray]:
+        """The next `count` sampled frames, fewer at the end of the video"""
+        frames = []
+        while len(frames) < count and self.sampled < self._max_frames:
+            # grab() skips frames without decoding them
+            if not self._capture.grab():
+                break
+            self.decoded += 1
+            if (self.decoded - 1) % self._stride:
+                continue
+            ok, frame = self._capture.retrieve()
+            if not ok:
+                break
+            frames.append(frame)
+            self.sampled += 1
+        return frames
+
+    def close(self) -> None:
+        self._capture.release()
+
+class VideoService:
+    """
+    Service for measuring a body over the frames of a video.
+
+    Frames are decoded incrementally in chunks of ROMP_BATCH_MAX_SIZE. Each
+    chunk runs through the ROMP engine as one batch and the primary subject
+    of every frame is measured in one batched evaluation, so memory stays
+    bounded by one chunk whatever the length of the clip. Per-frame
+    measurements are normalized to the target height and aggregated with
+    the median and a trimmed mean, which shrug off frames with a bad pose.
+    """
+
+    TRIM_PROPORTION = 0.1
+
+    def __init__(self,
+                 romp_service: ROMPService,
+                 measurement_service: MeasurementService,
+                 scheduler: InferenceScheduler) -> None:
+        self._romp_service = romp_service
+        self._measurement_service = measurement_service
+        self._scheduler = scheduler
+
+    async def measure_video(self,
+                            path: Path,
+                            target_height: float,
+                            frame_stride: int,
+                            logger: Logger) -> Dict[str, Any]:
+        """
+        Measure the main subject of a video.
+
+        Args:
+            path: Video file
+            target_height: Target height for normalization
+            frame_stride: Measure every n-th frame
+            logger: Logger instance
+
+        Returns:
+            Frame counts and, per measurement, its median and trimmed mean
+        """
+        if not self._romp_service.use_engine:
+            # the romp CLI extracts every frame to disk before it starts
+            raise VideoNotSupportedError()
+
+        reader = await run_in_threadpool(_FrameReader, path, frame_stride, settings.VIDEO_MAX_FRAMES)
+        per_frame: List[Dict[str, float]] = []
+        without_person = 0
+        try:
+            while True:
+                frames = await run_in_threadpool(reader.read, settings.ROMP_BATCH_MAX_SIZE)
+                if not frames:
+                    break
+
+                # each chunk queues on its own, so videos take turns with images
+                async def run_romp(frames=frames):
+                    return await self._romp_service.run_engine_batch(frames, logger)
+                results = await self._scheduler.submit(run_romp)
+
+                found = [r for r in results if r is not None]
+                without_person += len(results) - len(found)
+                if found:
+                    per_frame += await self._measurement_service.run_in_pool(
+                        self._measure_chunk, found, target_height, logger)
+        finally:
+            reader.close()
+
+        logger.info(f"Measured {len(per_frame)} of {reader.sampled} sampled frames")
+        return {
+            "frames_decoded": reader.decoded,
+            "frames_sampled": reader.sampled,
+            "frames_measured": len(per_frame),
+            "frames_without_person": without_person,
+            "measurements": self._aggregate(per_frame),
+        }
+
+    def _measure_chunk(self,
+                       results: List[Dict[str, Any]],
+                       target_height: float,
+                       logger: Logger) -> List[Dict[str, float]]:
+        verts = np.stack([self._measurement_service.select_verts(r) for r in results])
+        # a frame whose height can't be measured is left out, not the whole video
+        measurements = self._measurement_service.measure_verts_batch(verts, [target_height] * len(verts),
+                                                                     logger, skip_unmeasured=True)
+        return [frame for frame in measurements if frame is not None]
+
+    def _aggregate(self, per_frame: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        names = sorted({name for frame in per_frame for name in frame})
+        aggregates = {}
+        for name in names:
+            values = np.sort([frame[name] for frame in per_frame if name in frame])
+            trim = int(len(values) * self.TRIM_PROPORTION)
+            trimmed = values[trim:len(values) - trim]
+            aggregates[name] = {
+                "median": round(float(np.median(values)), 2),
+                "trimmed_mean": round(float(trimmed.mean()), 2),
+                "frames": len(values),
+            }
+        return aggregates
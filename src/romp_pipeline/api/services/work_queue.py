@@ -0,0 +1,340 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Optional, Set
+
+@dataclass
+class WorkItem:
+    """An image waiting for the ROMP and measurement stages"""
+    id: str
+    image: bytes
+    image_hash: str
+    enqueued_at: float = field(default_factory=time.time)
+
+    def to_bytes(self) -> bytes:
+        """JSON header line followed by the image bytes"""
+        header = json.dumps({"id": self.id, "image_hash": self.image_hash, "enqueued_at": self.enqueued_at})
+        return header.encode() + b"\n" + bytes(self.image)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "WorkItem":
+        header, image = data.split(b"\n", 1)
+        return cls(image=image, **json.loads(header))
+
+@dataclass
+class WorkResult:
+    """Raw measurements of a WorkItem, or the error the worker raised"""
+    raw: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    status_code: int = 200
+    headers: Optional[Dict[str, str]] = None
+
+    def to_json(self) -> str:
+        return json.dumps({"raw": self.raw, "error": self.error, "status_code": self.status_code,
+                           "headers": self.headers})
+
+    @classmethod
+    def from_json(cls, data: str) -> "WorkResult":
+        return cls(**json.loads(data))
+
+class WorkQueue:
+    """
+    Queue between /measure and the ROMP and measurement stages.
+
+    The API submits a WorkItem per image and waits for its WorkResult;
+    workers, in the API process or in `romp-worker` processes on other
+    nodes, claim items and finish them. Items older than `ttl_s` are no
+    longer waited for and are dropped instead of claimed.
+
+    Delivery is at most once: a claimed item is never handed to another
+    worker, so if its worker dies before finishing it, the waiter gives up
+    after its timeout (504 for /measure) and the client retries.
+
+    Every method blocks and may be called from several threads at once.
+    A backend implements submit, claim, finish, wait and depth with these
+    semantics; `shared` tells whether other processes can reach it.
+    """
+
+    backend = "base"
+    shared = True
+
+    def __init__(self, ttl_s: float) -> None:
+        self.ttl_s = ttl_s
+
+    def submit(self, item: WorkItem) -> None:
+        """Add an item at the tail of the queue"""
+        raise NotImplementedError
+
+    def claim(self, timeout: float) -> Optional[WorkItem]:
+        """Take the item at the head of the queue, None if none arrives within timeout seconds"""
+        raise NotImplementedError
+
+    def finish(self, item_id: str, result: WorkResult) -> None:
+        """Hand the result of a claimed item to its waiter"""
+        raise NotImplementedError
+
+    def wait(self, item_id: str, timeout: float) -> Optional[WorkResult]:
+        """Result of a submitted item, None if it isn't finished within timeout seconds"""
+        raise NotImplementedError
+
+    def depth(self) -> int:
+        """Items waiting to be claimed"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def _expired(self, item: WorkItem) -> bool:
+        return time.time() - item.enqueued_at > self.ttl_s
+
+    def stats(self) -> dict:
+        """Backend and depth, for /health"""
+        return {
+            "backend": self.backend,
+            "depth": self.depth(),
+        }
+
+class InMemoryWorkQueue(WorkQueue):
+    """Work queue within one process, consumed by the API's own worker"""
+
+    backend = "memory"
+    shared = False
+
+    def __init__(self, ttl_s: float) -> None:
+        super().__init__(ttl_s)
+        self._items: Deque[WorkItem] = deque()
+        self._results: Dict[str, WorkResult] = {}
+        # claimed and not finished yet, and those of them nobody waits for
+        self._claimed: Set[str] = set()
+        self._abandoned: Set[str] = set()
+        self._cond = threading.Condition()
+
+    def submit(self, item: WorkItem) -> None:
+        with self._cond:
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def claim(self, timeout: float) -> Optional[WorkItem]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._items:
+                    item = self._items.popleft()
+                    if not self._expired(item):
+                        self._claimed.add(item.id)
+                        return item
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def finish(self, item_id: str, result: WorkResult) -> None:
+        with self._cond:
+            self._claimed.discard(item_id)
+            if item_id in self._abandoned:
+                self._abandoned.discard(item_id)
+                return
+            self._results[item_id] = result
+            self._cond.notify_all()
+
+    def wait(self, item_id: str, timeout: float) -> Optional[WorkResult]:
+        with self._cond:
+            if not self._cond.wait_for(lambda: item_id in self._results, timeout):
+                if item_id in self._claimed:
+                    # drop the result when the worker finishes it
+                    self._abandoned.add(item_id)
+                else:
+                    # still queued, or already dropped as expired
+                    self._items = deque(item for item in self._items if item.id != item_id)
+                return None
+            return self._results.pop(item_id)
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue in a SQLite file, shared by the processes of one node (or a
+    shared volume). SQLite can't block on a change, so claim and wait poll.
+    """
+
+    backend = "sqlite"
+    POLL_INTERVAL_S = 0.05
+
+    def __init__(self, path: str, ttl_s: float) -> None:
+        super().__init__(ttl_s)
+        self.path = path
+        self._local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS work_items ("
+            " id TEXT PRIMARY KEY,"
+            " image BLOB,"
+            " image_hash TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " claimed_at REAL,"
+            " result TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS work_items_pending ON work_items (claimed_at, enqueued_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, item: WorkItem) -> None:
+        self._connect().execute(
+            "INSERT INTO work_items (id, image, image_hash, enqueued_at) VALUES (?, ?, ?, ?)",
+            (item.id, bytes(item.image), item.image_hash, item.enqueued_at))
+
+    def claim(self, timeout: float) -> Optional[WorkItem]:
+        conn = self._connect()
+        deadline = time.monotonic() + timeout
+        while True:
+            # only take the write lock when there is something to claim
+            if conn.execute("SELECT 1 FROM work_items WHERE claimed_at IS NULL LIMIT 1").fetchone() is None:
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.POLL_INTERVAL_S)
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # items and results nobody waits for any more
+                conn.execute("DELETE FROM work_items WHERE enqueued_at < ?", (time.time() - self.ttl_s,))
+                row = conn.execute(
+                    "SELECT id, image, image_hash, enqueued_at FROM work_items"
+                    " WHERE claimed_at IS NULL ORDER BY enqueued_at LIMIT 1").fetchone()
+                if row is not None:
+                    conn.execute("UPDATE work_items SET claimed_at = ? WHERE id = ?", (time.time(), row[0]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+            if row is not None:
+                return WorkItem(id=row[0], image=row[1], image_hash=row[2], enqueued_at=row[3])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL_S)
+
+    def finish(self, item_id: str, result: WorkResult) -> None:
+        self._connect().execute("UPDATE work_items SET result = ?, image = NULL WHERE id = ?",
+                                (result.to_json(), item_id))
+
+    def wait(self, item_id: str, timeout: float) -> Optional[WorkResult]:
+        conn = self._connect()
+        deadline = time.monotonic() + timeout
+        while True:
+            row = conn.execute("SELECT result FROM work_items WHERE id = ?", (item_id,)).fetchone()
+            if row is not None and row[0] is not None:
+                conn.execute("DELETE FROM work_items WHERE id = ?", (item_id,))
+                return WorkResult.from_json(row[0])
+            if time.monotonic() >= deadline:
+                conn.execute("DELETE FROM work_items WHERE id = ?", (item_id,))
+                return None
+            time.sleep(self.POLL_INTERVAL_S)
+
+    def depth(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM work_items WHERE claimed_at IS NULL").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class RedisWorkQueue(WorkQueue):
+    """
+    Work queue on a Redis-protocol broker (Redis, Valkey, KeyDB, ...), for
+    workers on other nodes. Items are pushed on one list and popped with
+    BRPOP; each result goes to a list of its own that the waiter pops with
+    BLPOP, and expires after `ttl_s` if nobody does. Needs the optional
+    `redis` package.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, name: str, ttl_s: float) -> None:
+        super().__init__(ttl_s)
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("The redis work queue needs the redis package: pip install romp-pipeline[redis]")
+        self._client = redis.Redis.from_url(url)
+        self._queue_key = f"{name}:queue"
+        self._result_prefix = f"{name}:result:"
+
+    @staticmethod
+    def _timeout(timeout: float) -> int:
+        # blocking commands take whole seconds on older servers; 0 would block forever
+        return max(1, math.ceil(timeout))
+
+    def submit(self, item: WorkItem) -> None:
+        self._client.lpush(self._queue_key, item.to_bytes())
+
+    def claim(self, timeout: float) -> Optional[WorkItem]:
+        deadline = time.monotonic() + timeout
+        while True:
+            popped = self._client.brpop([self._queue_key], timeout=self._timeout(deadline - time.monotonic()))
+            if popped is None:
+                return None
+            item = WorkItem.from_bytes(popped[1])
+            if not self._expired(item):
+                return item
+            if time.monotonic() >= deadline:
+                return None
+
+    def finish(self, item_id: str, result: WorkResult) -> None:
+        key = self._result_prefix + item_id
+        pipe = self._client.pipeline()
+        pipe.rpush(key, result.to_json())
+        pipe.expire(key, self._timeout(self.ttl_s))
+        pipe.execute()
+
+    def wait(self, item_id: str, timeout: float) -> Optional[WorkResult]:
+        popped = self._client.blpop([self._result_prefix + item_id], timeout=self._timeout(timeout))
+        if popped is None:
+            return None
+        return WorkResult.from_json(popped[1].decode())
+
+    def depth(self) -> int:
+        return self._client.llen(self._queue_key)
+
+    def close(self) -> None:
+        self._client.close()
+
+def create_work_queue(url: Optional[str], name: str, ttl_s: float) -> Optional[WorkQueue]:
+    """
+    Work queue for a WORK_QUEUE_URL.
+
+    Args:
+        url: memory://, sqlite:///path/to/queue.db, redis://host:6379/0
+            (or rediss://, unix://); None runs the stages in the API process
+        name: Key prefix on the Redis backend
+        ttl_s: How long an item is waited for
+
+    Returns:
+        The work queue, None without a url
+    """
+    if not url:
+        return None
+    scheme = url.split("://", 1)[0]
+    if scheme == "memory":
+        return InMemoryWorkQueue(ttl_s)
+    if scheme == "sqlite":
+        return SQLiteWorkQueue(url[len("sqlite://"):], ttl_s)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisWorkQueue(url, name, ttl_s)
+    raise ValueError(f"Unsupported WORK_QUEUE_URL scheme: {scheme}")
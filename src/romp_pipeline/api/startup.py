@@ -0,0 +1,52 @@
+from logging import Logger
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.dependencies import (
+    get_romp_service,
+    get_measurement_service,
+    get_inference_scheduler
+)
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+
+def start_inference(logger: Logger, load_engine: bool = True) -> InferenceScheduler:
+    """
+    Load ROMP and the SMPL measurement assets, and start the inference
+    workers. Shared by the API and `romp-worker` processes.
+
+    Args:
+        logger: Logger instance
+        load_engine: Load the in-process ROMP engine when ROMP_BACKEND=engine;
+            the API leaves it to the workers of a shared work queue
+
+    Returns:
+        The started inference scheduler
+    """
+    romp_service = get_romp_service()
+    if settings.ROMP_BACKEND == "engine" and not load_engine:
+        logger.info("ROMP engine not loaded, the work queue workers run it")
+    elif settings.ROMP_BACKEND == "engine":
+        if romp_service.load_engine(logger):
+            logger.info("ROMP engine loaded")
+        else:
+            logger.warning("ROMP engine unavailable, falling back to the romp subprocess")
+    if romp_service.check_availability():
+        logger.info("ROMP is available")
+    else:
+        logger.warning("ROMP command not found! API will be degraded.")
+
+    if get_measurement_service().load_assets(logger):
+        logger.info("SMPL measurement assets loaded")
+
+    scheduler = get_inference_scheduler()
+    workers = settings.ROMP_CONCURRENCY
+    if romp_service.use_engine:
+        # enough images in flight to fill the engine's batches
+        workers *= settings.ROMP_BATCH_MAX_SIZE
+    scheduler.start(workers)
+    logger.info(f"Inference scheduler started ({scheduler.workers} workers, queue {scheduler.queue_size})")
+    return scheduler
+
+async def stop_inference() -> None:
+    """Stop the inference workers and wait for the ROMP batches in flight"""
+    await get_inference_scheduler().stop()
+    await get_romp_service().stop()
@@ -0,0 +1,47 @@
+"""
+Standalone worker for the ROMP and measurement stages of /measure.
+
+Runs on any node that can reach the work queue (WORK_QUEUE_URL): it loads
+ROMP and the SMPL assets like the API does, then claims images from the
+queue until it receives SIGINT or SIGTERM.
+"""
+import asyncio
+import signal
+import sys
+from logging import Logger
+
+from romp_pipeline.api.config import settings
+from romp_pipeline.api.logging_config import setup_logging
+from romp_pipeline.api.dependencies import get_work_queue, get_queue_worker
+from romp_pipeline.api.startup import start_inference, stop_inference
+
+async def serve(logger: Logger) -> None:
+    """Consume the work queue until the process is told to stop"""
+    scheduler = start_inference(logger)
+    queue_worker = get_queue_worker()
+    concurrency = settings.WORK_QUEUE_WORKER_CONCURRENCY or scheduler.workers
+    queue_worker.start(concurrency, logger)
+    logger.info(f"Worker consuming {get_work_queue().backend} work queue ({concurrency} at once)")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("Shutting down worker...")
+    await queue_worker.stop()
+    await stop_inference()
+    get_work_queue().close()
+
+def run_worker():
+    """Run a worker"""
+    logger = setup_logging()
+    work_queue = get_work_queue()
+    if work_queue is None or not work_queue.shared:
+        logger.error("romp-worker needs a shared work queue: set WORK_QUEUE_URL to sqlite:// or redis://")
+        sys.exit(2)
+    asyncio.run(serve(logger))
+
+if __name__ == "__main__":
+    run_worker()
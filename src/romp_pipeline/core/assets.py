@@ -0,0 +1,215 @@
+'''
+Load-once body model assets shared by every measurer.
+
+Reading the SMPL pickle and the face segmentation json is by far the most
+expensive part of creating a measurer. The assets below are loaded once per
+(model type, gender, model root) and handed out as an immutable bundle, so the
+per-request cost of MeasureSMPL is only the geometry work.
+'''
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from romp_pipeline.config.settings import SMPL_MODELS_DIR, BODY_MEASUREMENTS_DIR
+from .utils import load_face_segmentation, face_segmentation_to_labels
+from .landmark_definitions import SMPL_LANDMARK_INDICES
+from .measurement_definitions import SMPLMeasurementDefinitions, SMPL_BODY_PARTS, MEASUREMENT_TYPES
+from .joint_definitions import SMPL_JOINT2IND, SMPL_NUM_JOINTS
+from .measurement_plan import MeasurementPlan, compile_measurement_plan
+from .shape_space import ShapeSpace
+from .model_pool import get_body_model_pool
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    '''Return the array with the writeable flag cleared.'''
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True)
+class BodyModelAssets:
+    '''
+    Immutable bundle of everything a measurer needs from the body model files.
+
+    :param model_type: str, smpl
+    :param gender: str, MALE or FEMALE or NEUTRAL
+    :param faces: np.ndarray (F,3) of mesh faces
+    :param J_regressor: np.ndarray (J,N) joint regressor
+    :param face_segmentation: mapping body part -> np.ndarray of face indices
+    :param face_labels: np.ndarray (F,) body part label of every face, -1 if unlabeled
+    :param body_parts: tuple of body part names indexed by face_labels
+    :param landmarks: mapping landmark name -> vertex index (or tuple of indices)
+    :param length_definitions: mapping of LENGTHS measurement definitions
+    :param circumf_definitions: mapping of CIRCUMFERENCES measurement definitions
+    :param circumf_2_bodypart: mapping circumference -> body part(s)
+    :param possible_measurements: tuple of all defined measurement names
+    :param joint2ind: mapping joint name -> joint index
+    :param num_joints: int, number of body model joints
+    :param num_points: int, number of body model vertices
+    :param plan: MeasurementPlan compiled from the measurement definitions
+    :param shape_space: ShapeSpace of the rest pose model for closed-form
+                        measurement of shape parameters
+    '''
+
+    model_type: str
+    gender: str
+    faces: np.ndarray
+    J_regressor: np.ndarray
+    face_segmentation: Mapping[str, np.ndarray]
+    face_labels: np.ndarray
+    body_parts: Tuple[str, ...]
+    landmarks: Mapping[str, object]
+    length_definitions: Mapping[str, tuple]
+    circumf_definitions: Mapping[str, dict]
+    circumf_2_bodypart: Mapping[str, object]
+    possible_measurements: Tuple[str, ...]
+    joint2ind: Mapping[str, int]
+    num_joints: int
+    num_points: int
+    plan: MeasurementPlan
+    shape_space: ShapeSpace
+
+
+_ASSETS_CACHE: Dict[Tuple[str, str, str], BodyModelAssets] = {}
+_ASSETS_LOCK = threading.Lock()
+
+
+def _load_smpl_assets(gender: str, body_model_root: str) -> BodyModelAssets:
+    '''
+    Read the SMPL model and face segmentation from disk.
+    A single pooled smplx model provides faces, J_regressor and shape basis.
+    '''
+    model = get_body_model_pool().get(model_type="smpl",
+                                      gender=gender,
+                                      num_betas=10,
+                                      model_root=body_model_root)
+
+    faces = np.asarray(model.faces, dtype=np.int64)
+    J_regressor = model.J_regressor.detach().cpu().numpy().astype(np.float32)
+
+    # prefer the compact per-face label array next to the json
+    segmentation_dir = os.path.join(BODY_MEASUREMENTS_DIR, "smpl")
+    face_labels_path = os.path.join(segmentation_dir, "smpl_body_parts_2_faces.npy")
+    if os.path.exists(face_labels_path):
+        face_labels = np.load(face_labels_path).astype(np.int8)
+        if face_labels.shape != (faces.shape[0],):
+            raise ValueError(f"Face labels {face_labels_path} do not match the "
+                             f"{faces.shape[0]} faces of the SMPL model")
+    else:
+        face_segmentation = load_face_segmentation(
+            os.path.join(segmentation_dir, "smpl_body_parts_2_faces.json"))
+        face_labels = face_segmentation_to_labels(face_segmentation,
+                                                  SMPL_BODY_PARTS,
+                                                  num_faces=faces.shape[0])
+    face_segmentation = {body_part: _readonly(np.flatnonzero(face_labels == label))
+                         for label, body_part in enumerate(SMPL_BODY_PARTS)}
+
+    definitions = SMPLMeasurementDefinitions()
+    plan = compile_measurement_plan(definitions,
+                                    landmarks=SMPL_LANDMARK_INDICES,
+                                    joint2ind=SMPL_JOINT2IND,
+                                    faces=faces,
+                                    face_labels=face_labels,
+                                    body_parts=SMPL_BODY_PARTS)
+    shape_space = ShapeSpace(v_template=model.v_template.detach().cpu().numpy(),
+                             shapedirs=model.shapedirs.detach().cpu().numpy(),
+                             J_regressor=J_regressor,
+                             plan=plan)
+
+    return BodyModelAssets(
+        model_type="smpl",
+        gender=gender,
+        faces=_readonly(faces),
+        J_regressor=_readonly(J_regressor),
+        face_segmentation=MappingProxyType(face_segmentation),
+        face_labels=_readonly(face_labels),
+        body_parts=SMPL_BODY_PARTS,
+        landmarks=MappingProxyType(dict(SMPL_LANDMARK_INDICES)),
+        length_definitions=MappingProxyType(dict(definitions.LENGTHS)),
+        circumf_definitions=MappingProxyType(dict(definitions.CIRCUMFERENCES)),
+        circumf_2_bodypart=MappingProxyType(dict(definitions.CIRCUMFERENCE_TO_BODYPARTS)),
+        possible_measurements=tuple(definitions.possible_measurements),
+        joint2ind=MappingProxyType(dict(SMPL_JOINT2IND)),
+        num_joints=SMPL_NUM_JOINTS,
+        num_points=6890,
+        plan=plan,
+        shape_space=shape_space,
+    )
+
+
+def get_body_model_assets(model_type: str = "smpl",
+                          gender: str = "NEUTRAL",
+                          body_model_root: Optional[str] = None) -> BodyModelAssets:
+    '''
+    Get the shared assets for the given body model, loading them on first use.
+    Thread-safe: concurrent first calls load the files only once.
+    :param model_type: str of model type, only smpl is supported
+    :param gender: str of gender: MALE or FEMALE or NEUTRAL
+    :param body_model_root: str of location of the smpl folder with .pkl models,
+                            defaults to data/smpl_models
+
+    Return
+    BodyModelAssets
+    '''
+    model_type = model_type.lower()
+    gender = gender.upper()
+    if body_model_root is None:
+        body_model_root = str(SMPL_MODELS_DIR)
+
+    key = (model_type, gender, os.path.abspath(body_model_root))
+
+    assets = _ASSETS_CACHE.get(key)
+    if assets is not None:
+        return assets
+
+    with _ASSETS_LOCK:
+        assets = _ASSETS_CACHE.get(key)
+        if assets is None:
+            if model_type != "smpl":
+                raise NotImplementedError("Model type not defined. Only 'smpl' is supported for ROMP.")
+            assets = _load_smpl_assets(gender, body_model_root)
+            _ASSETS_CACHE[key] = assets
+
+    return assets
+
+
+def measurement_definitions_version(model_type: str = "smpl") -> str:
+    '''
+    Fingerprint of the definitions the measurements of a body model are
+    computed from: landmarks, joints, lengths, circumferences and their body
+    parts. It changes whenever one of them does, so stored measurements can
+    be told apart from ones computed with other definitions.
+    :param model_type: str of model type, only smpl is supported
+
+    Return
+    str of model type and a digest of its definitions
+    '''
+    model_type = model_type.lower()
+    if model_type != "smpl":
+        raise NotImplementedError("Model type not defined. Only 'smpl' is supported for ROMP.")
+
+    definitions = SMPLMeasurementDefinitions()
+    spec = {
+        "landmarks": SMPL_LANDMARK_INDICES,
+        "joints": SMPL_JOINT2IND,
+        "body_parts": SMPL_BODY_PARTS,
+        "types": MEASUREMENT_TYPES,
+        "lengths": definitions.LENGTHS,
+        "circumferences": definitions.CIRCUMFERENCES,
+        "circumference_body_parts": definitions.CIRCUMFERENCE_TO_BODYPARTS,
+    }
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{model_type}-{digest[:16]}"
+
+
+def clear_body_model_assets() -> None:
+    '''Drop all cached assets, e.g. after the model files changed on disk.'''
+    with _ASSETS_LOCK:
+        _ASSETS_CACHE.clear()
@@ -20,7 +20,6 @@ try:
 except AttributeError:
     pass
 
-import trimesh
 import torch
 import smplx
 import os
@@ -29,22 +28,13 @@ from .measurement_definitions import *
 from .utils import *
 from .landmark_definitions import *
 from .joint_definitions import *
+from .assets import BodyModelAssets, get_body_model_assets
+from .slicing import slice_faces_with_plane, slice_faces_with_planes
+from .model_pool import get_body_model_pool
 
 logger = logging.getLogger(__name__)
 
 
-def set_shape(model, shape_coefs):
-    '''
-    Set shape of body model.
-    :param model: smplx body model
-    :param shape_coefs: torch.tensor dim (10,)
-
-    Return
-    shaped smplx body model
-    '''
-    shape_coefs = shape_coefs.to(torch.float32)
-    return model(betas=shape_coefs, return_verts=True)
-
 def create_model(model_type, model_root, gender, num_betas=10, num_thetas=24):
     '''
     Create SMPL/SMPLX/etc. body model
@@ -81,6 +71,7 @@ class Measurer():
         self.faces = None
         self.joints = None
         self.gender = None
+        self.plan = None
 
         self.measurements = {}
         self.height_normalized_measurements = {}
@@ -103,6 +94,8 @@ class Measurer():
                                     to measure from MeasurementDefinitions class
         '''
 
+        lengths_to_measure = []
+
         for m_name in measurement_names:
             if m_name not in self.all_possible_measurements:
                 logger.warning(f"Measurement {m_name} not defined.")
@@ -113,8 +106,8 @@ class Measurer():
 
             try:
                 if self.measurement_types[m_name] == MeasurementType().LENGTH:
-                    value = self.measure_length(m_name)
-                    self.measurements[m_name] = value
+                    # all lengths are evaluated together below
+                    lengths_to_measure.append(m_name)
 
                 elif self.measurement_types[m_name] == MeasurementType().CIRCUMFERENCE:
                     value = self.measure_circumference(m_name)
@@ -125,44 +118,13 @@ class Measurer():
             except Exception as e:
                 logger.warning(f"Failed to measure {m_name}: {e}")
 
-    def measure_length(self, measurement_name: str):
-        '''
-        Measure distance between 2+ landmarks.
-        For 2 landmarks: straight-line distance
-        For 3+ landmarks: path distance (sum of consecutive segments)
-        :param measurement_name: str - defined in MeasurementDefinitions
-
-        Returns
-        :float of measurement in cm
-        '''
-
-        measurement_landmarks_inds = self.length_definitions[measurement_name]
-        num_landmarks = len(measurement_landmarks_inds)
-
-        landmark_points = []
-        for i in range(num_landmarks):
-            if isinstance(measurement_landmarks_inds[i], tuple):
-                # if tuple of indices for landmark, take their average
-                lm = (self.verts[measurement_landmarks_inds[i][0]] + 
-                          self.verts[measurement_landmarks_inds[i][1]]) / 2
-            else:
-                lm = self.verts[measurement_landmarks_inds[i]]
-            
-            landmark_points.append(lm)
-
-        if num_landmarks == 2:
-            # Standard 2-point distance
-            landmark_points = np.vstack(landmark_points)[None, ...]
-            return self._get_dist(landmark_points)
-        elif num_landmarks >= 3:
-            # Multi-point path distance: sum of consecutive segments
-            total_distance = 0
-            for i in range(num_landmarks - 1):
-                segment = np.array([[landmark_points[i], landmark_points[i + 1]]])
-                total_distance += self._get_dist(segment)
-            return total_distance
-        else:
-            raise ValueError(f"Measurement {measurement_name} has {num_landmarks} landmarks. At least 2 are required.")
+        if lengths_to_measure:
+            try:
+                lengths = self.plan.measure_lengths(self.verts)
+                for m_name in lengths_to_measure:
+                    self.measurements[m_name] = float(lengths[self.plan.length2ind[m_name]])
+            except Exception as e:
+                logger.warning(f"Failed to measure lengths {lengths_to_measure}: {e}")
 
     @staticmethod
     def _get_dist(verts: np.ndarray) -> float:
@@ -196,33 +158,57 @@ class Measurer():
         float of measurement value in cm
         '''
 
-        measurement_definition = self.circumf_definitions[measurement_name]
-        circumf_landmarks = measurement_definition["LANDMARKS"]
-        circumf_landmark_indices = [self.landmarks[l_name] for l_name in circumf_landmarks]
-        circumf_n1, circumf_n2 = self.circumf_definitions[measurement_name]["JOINTS"]
-        circumf_n1, circumf_n2 = self.joint2ind[circumf_n1], self.joint2ind[circumf_n2]
-        
-        plane_origin = np.mean(self.verts[circumf_landmark_indices,:],axis=0)
-        plane_normal = self.joints[circumf_n1,:] - self.joints[circumf_n2,:]
-
-        mesh = trimesh.Trimesh(vertices=self.verts, faces=self.faces)
+        plane_origin, plane_normal = self.plan.plane_of(measurement_name, self.verts, self.joints)
+        circumference = self.plan.circumferences[measurement_name]
 
-        # new version            
-        slice_segments, sliced_faces = trimesh.intersections.mesh_plane(mesh, 
-                                plane_normal=plane_normal, 
-                                plane_origin=plane_origin, 
-                                return_faces=True) # (N, 2, 3), (N,)
-        
-        slice_segments = filter_body_part_slices(slice_segments,
-                                                 sliced_faces,
-                                                 measurement_name,
-                                                 self.circumf_2_bodypart,
-                                                 self.face_segmentation)
+        # only the faces of the measured body part are sliced,
+        # so no slices of other body parts need to be filtered out
+        slice_segments, _ = slice_faces_with_plane(self.verts,
+                                                   circumference.faces,
+                                                   plane_origin=plane_origin,
+                                                   plane_normal=plane_normal,
+                                                   face_inds=circumference.face_inds) # (N, 2, 3), (N,)
         
         slice_segments_hull = convex_hull_from_3D_points(slice_segments)
 
         return self._get_dist(slice_segments_hull)
 
+    def measure_circumferences_batch(self,
+                                     verts: np.ndarray,
+                                     joints: np.ndarray,
+                                     measurement_name: str) -> np.ndarray:
+        '''
+        Measure one circumference on a batch of bodies.
+        The cutting planes and the body-part slices of the whole batch are
+        found at once, only the convex hull is computed per body.
+        :param verts: np.ndarray (B,N,3) - body model vertices
+        :param joints: np.ndarray (B,J,3) - body model joints
+        :param measurement_name: str - circumference name
+
+        Return
+        np.ndarray (B,) of measurement values in cm, NaN where the
+        circumference could not be found
+        '''
+
+        plane_origins, plane_normals = self.plan.plane_of(measurement_name, verts, joints)
+        circumference = self.plan.circumferences[measurement_name]
+
+        slice_segments, _, body_inds = slice_faces_with_planes(verts,
+                                                               circumference.faces,
+                                                               plane_origins=plane_origins,
+                                                               plane_normals=plane_normals)
+
+        values = np.full(verts.shape[0], np.nan)
+        body_splits = np.searchsorted(body_inds, np.arange(1, verts.shape[0]))
+        for body_ind, body_segments in enumerate(np.split(slice_segments, body_splits)):
+            try:
+                slice_segments_hull = convex_hull_from_3D_points(body_segments)
+                values[body_ind] = self._get_dist(slice_segments_hull)
+            except Exception as e:
+                logger.warning(f"Failed to measure {measurement_name} of body {body_ind}: {e}")
+
+        return values
+
     def height_normalize_measurements(self, new_height: float):
         ''' 
         Scale all measurements so that the height measurement gets
@@ -293,16 +279,6 @@ class Measurer():
             self.labels2names[set_label] = set_name
 
 
-def get_joint_regressor(model_type, model_root, gender, num_thetas):
-    '''Get joint regressor matrix for computing joints from vertices'''
-    model = create_model(model_type=model_type,
-                        model_root=model_root,
-                        gender=gender,
-                        num_betas=10,
-                        num_thetas=num_thetas)
-    return model.J_regressor
-
-
 class MeasureSMPL(Measurer):
     '''
     Measure the SMPL model defined either by the shape parameters or
@@ -311,7 +287,7 @@ class MeasureSMPL(Measurer):
     All the measurements are expressed in cm.
     '''
 
-    def __init__(self, body_model_root=None):
+    def __init__(self, body_model_root=None, assets: BodyModelAssets = None):
         
         super().__init__()
 
@@ -328,48 +304,168 @@ class MeasureSMPL(Measurer):
         # SMPL files are in the smpl subdirectory
         self.body_model_path = os.path.join(self.body_model_root, "smpl")
 
-        self.faces = smplx.SMPL(self.body_model_path, ext="pkl").faces
-        
-        # Path to body segmentation file
-        face_segmentation_path = os.path.join(
-            self.project_root,
-            "data",
-            "body_measurements",
-            "smpl",
-            "smpl_body_parts_2_faces.json"
-        )
-        self.face_segmentation = load_face_segmentation(face_segmentation_path)
-
-        self.landmarks = SMPL_LANDMARK_INDICES
+        # faces, joint regressor and face segmentation are loaded once
+        # per process and shared by all measurers
+        if assets is None:
+            assets = get_body_model_assets(self.model_type, 
+                                           gender="NEUTRAL",
+                                           body_model_root=self.body_model_root)
+        self.assets = assets
+
+        self.faces = assets.faces
+        self.face_segmentation = assets.face_segmentation
+
+        self.landmarks = assets.landmarks
         self.measurement_types = MEASUREMENT_TYPES
-        self.length_definitions = SMPLMeasurementDefinitions().LENGTHS
-        self.circumf_definitions = SMPLMeasurementDefinitions().CIRCUMFERENCES
-        self.circumf_2_bodypart = SMPLMeasurementDefinitions().CIRCUMFERENCE_TO_BODYPARTS
-        self.all_possible_measurements = SMPLMeasurementDefinitions().possible_measurements
+        self.length_definitions = assets.length_definitions
+        self.circumf_definitions = assets.circumf_definitions
+        self.circumf_2_bodypart = assets.circumf_2_bodypart
+        self.all_possible_measurements = list(assets.possible_measurements)
 
-        self.joint2ind = SMPL_JOINT2IND
-        self.num_joints = SMPL_NUM_JOINTS
+        self.joint2ind = assets.joint2ind
+        self.num_joints = assets.num_joints
 
-        self.num_points = 6890
+        self.num_points = assets.num_points
+        self.plan = assets.plan
 
     def from_verts(self,
-                   verts: torch.tensor):
+                   verts):
         '''
         Construct body model from only vertices.
-        :param verts: torch.tensor (6890,3) of SMPL vertices
+        :param verts: torch.tensor or np.ndarray (6890,3) of SMPL vertices,
+                      a numpy array is used as is (no copy), it can be read-only
         '''        
 
+        if isinstance(verts, torch.Tensor):
+            verts = verts.detach().cpu().numpy()
         verts = verts.squeeze()
         error_msg = f"verts need to be of dimension ({self.num_points},3)"
-        assert verts.shape == torch.Size([self.num_points,3]), error_msg
+        assert verts.shape == (self.num_points,3), error_msg
+
+        self.verts = verts
+        self.joints = self.assets.J_regressor @ self.verts
+
+    def measure_batch(self,
+                      verts,
+                      measurement_names: List[str] = None):
+        '''
+        Measure a batch of bodies given by their vertices.
+        Joints are regressed with one batched matmul, all lengths come
+        from one batched gather and every circumference is sliced for the
+        whole batch at once. The measurer state (verts, measurements) is
+        left untouched.
+        :param verts: np.ndarray or torch.tensor (B,6890,3) of SMPL vertices
+        :param measurement_names: list of defined measurement names,
+                                  defaults to all_possible_measurements
+
+        Returns
+        :values np.ndarray (B,M) float32 of measurements in cm, NaN where
+                a measurement could not be found
+        :measurement_names list of the M measurement names, the columns of values
+        '''
+
+        if isinstance(verts, torch.Tensor):
+            verts = verts.detach().cpu().numpy()
+        verts = np.asarray(verts, dtype=np.float32)
+        if verts.ndim == 2:
+            verts = verts[None]
+
+        error_msg = f"verts need to be of dimension (B,{self.num_points},3)"
+        assert verts.ndim == 3 and verts.shape[1:] == (self.num_points, 3), error_msg
+
+        measurement_names = self._check_measurement_names(measurement_names)
+
+        joints = np.matmul(self.assets.J_regressor, verts) # (B,J,3)
+
+        values = self._measure_batch_columns(measurement_names,
+                                             lengths_fn=lambda: self.plan.measure_lengths(verts),
+                                             mesh_fn=lambda: (verts, joints),
+                                             batch_size=verts.shape[0])
+        return values, measurement_names
+
+    def measure_betas(self,
+                      betas,
+                      gender: str = "NEUTRAL",
+                      measurement_names: List[str] = None):
+        '''
+        Measure a batch of rest pose bodies given by their shape parameters.
+        Lengths and joints come in closed form from the precomputed shape
+        basis of the gender (see ShapeSpace), the full mesh is only built
+        if a circumference is requested. Equivalent to from_body_model
+        followed by measure, for many shapes at once.
+        :param betas: np.ndarray or torch.tensor (B,10) of SMPL shape parameters
+        :param gender: str, MALE or FEMALE or NEUTRAL
+        :param measurement_names: list of defined measurement names,
+                                  defaults to all_possible_measurements
+
+        Returns
+        :values np.ndarray (B,M) float32 of measurements in cm, NaN where
+                a measurement could not be found
+        :measurement_names list of the M measurement names, the columns of values
+        '''
+
+        if isinstance(betas, torch.Tensor):
+            betas = betas.detach().cpu().numpy()
+        betas = np.asarray(betas, dtype=np.float32)
+        if betas.ndim == 1:
+            betas = betas[None]
+
+        measurement_names = self._check_measurement_names(measurement_names)
+
+        shape_space = get_body_model_assets(self.model_type,
+                                            gender=gender,
+                                            body_model_root=self.body_model_root).shape_space
+
+        values = self._measure_batch_columns(measurement_names,
+                                             lengths_fn=lambda: shape_space.measure_lengths(betas),
+                                             mesh_fn=lambda: (shape_space.verts(betas), 
+                                                              shape_space.joints(betas)),
+                                             batch_size=betas.shape[0])
+        return values, measurement_names
+
+    def _check_measurement_names(self, measurement_names: List[str] = None) -> List[str]:
+        '''All possible measurements if None, else the names checked to be defined.'''
+        if measurement_names is None:
+            return list(self.all_possible_measurements)
+        undefined = [m_name for m_name in measurement_names 
+                     if m_name not in self.all_possible_measurements]
+        if undefined:
+            raise ValueError(f"Measurements {undefined} not defined.")
+        return list(measurement_names)
+
+    def _measure_batch_columns(self,
+                               measurement_names: List[str],
+                               lengths_fn,
+                               mesh_fn,
+                               batch_size: int) -> np.ndarray:
+        '''
+        Fill the (B,M) measurement array of a batch.
+        :param measurement_names: list of defined measurement names
+        :param lengths_fn: callable returning the (B,L) lengths of the plan
+        :param mesh_fn: callable returning (B,N,3) verts and (B,J,3) joints,
+                        only called if a circumference is requested
+
+        Return
+        np.ndarray (B,M) float32
+        '''
+
+        values = np.full((batch_size, len(measurement_names)), np.nan, dtype=np.float32)
+
+        length_columns = [i for i, m_name in enumerate(measurement_names)
+                          if self.measurement_types[m_name] == MeasurementType().LENGTH]
+        if length_columns:
+            lengths = lengths_fn() # (B,L)
+            length_inds = [self.plan.length2ind[measurement_names[i]] for i in length_columns]
+            values[:, length_columns] = lengths[:, length_inds]
+
+        circumf_columns = [i for i, m_name in enumerate(measurement_names)
+                           if self.measurement_types[m_name] == MeasurementType().CIRCUMFERENCE]
+        if circumf_columns:
+            verts, joints = mesh_fn()
+            for i in circumf_columns:
+                values[:, i] = self.measure_circumferences_batch(verts, joints, measurement_names[i])
 
-        joint_regressor = get_joint_regressor(self.model_type, 
-                                              self.body_model_root,
-                                              gender="NEUTRAL", 
-                                              num_thetas=self.num_joints)
-        joints = torch.matmul(joint_regressor, verts)
-        self.joints = joints.numpy()
-        self.verts = verts.numpy()
+        return values
 
     def from_body_model(self,
                         gender: str,
@@ -382,15 +478,14 @@ class MeasureSMPL(Measurer):
                                     for SMPL model
         '''  
 
-        model = create_model(model_type=self.model_type, 
-                             model_root=self.body_model_root, 
-                             gender=gender,
-                             num_betas=10,
-                             num_thetas=self.num_joints)    
-        model_output = set_shape(model, shape)
+        # pooled model, created once per gender
+        verts, joints = get_body_model_pool().forward(shape,
+                                                      model_type=self.model_type,
+                                                      gender=gender,
+                                                      model_root=self.body_model_root)
         
-        self.verts = model_output.vertices.detach().cpu().numpy().squeeze()
-        self.joints = model_output.joints.squeeze().detach().cpu().numpy()
+        self.verts = verts.squeeze()
+        self.joints = joints.squeeze()
         self.gender = gender
 
 class MeasureBody():
@@ -22,6 +22,15 @@ STANDARD_LABELS = {
     }
 
 
+# body parts of the SMPL face segmentation, the position of a body part
+# is its label in the compact (.npy) face label array
+SMPL_BODY_PARTS = ('rightHand', 'rightUpLeg', 'leftArm', 'leftLeg', 'leftToeBase',
+                   'leftFoot', 'spine1', 'spine2', 'leftShoulder', 'rightShoulder',
+                   'rightFoot', 'head', 'rightArm', 'leftHandIndex1', 'rightLeg',
+                   'rightHandIndex1', 'leftForeArm', 'rightForeArm', 'neck',
+                   'rightToeBase', 'spine', 'leftUpLeg', 'leftHand', 'hips')
+
+
 class MeasurementType():
     CIRCUMFERENCE = "circumference"
     LENGTH = "length"
@@ -0,0 +1,228 @@
+'''
+Measurement definitions compiled into index arrays.
+
+The LENGTHS tables in measurement_definitions.py are compiled once into
+gather indices and averaging weights, so that every length measurement,
+including multi-point paths, is evaluated with a single fancy-indexed
+gather and a single np.linalg.norm.
+
+The CIRCUMFERENCES tables are compiled into plane origin landmarks, normal
+joints and the subset of faces of the measured body part, so that slicing
+only ever looks at the faces that can contribute to the measurement.
+'''
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from .utils import body_part_face_mask
+
+
+def _landmark_to_point(landmark) -> Tuple[Tuple[int, int], Tuple[float, float]]:
+    '''
+    Convert a landmark definition into two vertex indices and their weights.
+    A tuple of two indices is the average of both vertices,
+    a single index is the vertex itself.
+    '''
+    if isinstance(landmark, tuple):
+        if len(landmark) != 2:
+            raise ValueError(f"Averaged landmarks need exactly 2 indices, got {landmark}")
+        return (int(landmark[0]), int(landmark[1])), (0.5, 0.5)
+    return (int(landmark), int(landmark)), (1.0, 0.0)
+
+
+@dataclass(frozen=True)
+class CircumferencePlan:
+    '''
+    Compiled circumference measurement.
+
+    :param name: str - measurement name
+    :param origin_inds: np.ndarray (K,) - vertex indices of the plane origin landmarks
+    :param origin_weights: np.ndarray (K,) - weights so that the plane origin
+                           is sum(origin_weights * verts[origin_inds])
+    :param joint_inds: tuple of two joint indices, the plane normal is
+                       joints[joint_inds[0]] - joints[joint_inds[1]]
+    :param face_mask: np.ndarray (M,) bool - mask of the mesh faces of the
+                      measured body part(s), all True if no body part is defined
+    :param face_inds: np.ndarray (F,) - mesh faces of the measured body part(s)
+    :param faces: np.ndarray (F,3) - vertex indices of those faces
+    '''
+
+    name: str
+    origin_inds: np.ndarray
+    origin_weights: np.ndarray
+    joint_inds: Tuple[int, int]
+    face_mask: np.ndarray
+    face_inds: np.ndarray
+    faces: np.ndarray
+
+
+def _compile_circumference(name: str,
+                           definition: Mapping[str, Sequence[str]],
+                           landmarks: Mapping[str, object],
+                           joint2ind: Mapping[str, int],
+                           body_parts,
+                           faces: np.ndarray,
+                           face_labels: np.ndarray,
+                           all_body_parts: Sequence[str]) -> CircumferencePlan:
+    '''Compile one entry of the CIRCUMFERENCES dict.'''
+
+    landmark_names = definition["LANDMARKS"]
+    origin_inds, origin_weights = [], []
+    for landmark_name in landmark_names:
+        point_inds, point_weights = _landmark_to_point(landmarks[landmark_name])
+        for ind, weight in zip(point_inds, point_weights):
+            if weight > 0:
+                origin_inds.append(ind)
+                origin_weights.append(weight / len(landmark_names))
+
+    joint_1, joint_2 = definition["JOINTS"]
+
+    if body_parts is None:
+        face_mask = np.ones(faces.shape[0], dtype=bool)
+    else:
+        face_mask = body_part_face_mask(face_labels, body_parts, all_body_parts)
+    face_inds = np.flatnonzero(face_mask)
+
+    compiled = CircumferencePlan(name=name,
+                                 origin_inds=np.array(origin_inds, dtype=np.int64),
+                                 origin_weights=np.array(origin_weights, dtype=np.float64),
+                                 joint_inds=(joint2ind[joint_1], joint2ind[joint_2]),
+                                 face_mask=face_mask,
+                                 face_inds=face_inds,
+                                 faces=np.ascontiguousarray(faces[face_inds]))
+    for array in (compiled.origin_inds, compiled.origin_weights,
+                  compiled.face_mask, compiled.face_inds, compiled.faces):
+        array.setflags(write=False)
+    return compiled
+
+
+class MeasurementPlan():
+    '''
+    Compiled measurement plan of a body model.
+
+    Every length measurement is a path over 2+ landmarks. Each path is
+    split into segments and each segment endpoint is stored as two vertex
+    indices with averaging weights:
+
+    segment_inds: np.ndarray (S,2,2) - vertex indices for (segment, endpoint, vertex)
+    segment_weights: np.ndarray (S,2,2) - averaging weights of those vertices
+    segment_owner: np.ndarray (S,L) - 1 where segment s belongs to length l
+
+    Every circumference is compiled into a CircumferencePlan.
+
+    All the measurements are expressed in cm.
+    '''
+
+    def __init__(self,
+                 length_definitions: Mapping[str, Sequence],
+                 circumf_definitions: Mapping[str, Mapping[str, Sequence[str]]],
+                 circumf_2_bodypart: Mapping[str, object],
+                 landmarks: Mapping[str, object],
+                 joint2ind: Mapping[str, int],
+                 faces: np.ndarray,
+                 face_labels: np.ndarray,
+                 body_parts: Sequence[str]):
+
+        self.length_names: Tuple[str, ...] = tuple(length_definitions.keys())
+        self.length2ind: Dict[str, int] = {name: i for i, name in enumerate(self.length_names)}
+
+        segment_inds: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+        segment_weights: List[Tuple[Tuple[float, float], Tuple[float, float]]] = []
+        segment_owner: List[int] = []
+
+        for length_ind, (name, path) in enumerate(length_definitions.items()):
+            if len(path) < 2:
+                raise ValueError(f"Measurement {name} has {len(path)} landmarks. At least 2 are required.")
+
+            points = [_landmark_to_point(lm) for lm in path]
+            for (start_inds, start_w), (end_inds, end_w) in zip(points[:-1], points[1:]):
+                segment_inds.append((start_inds, end_inds))
+                segment_weights.append((start_w, end_w))
+                segment_owner.append(length_ind)
+
+        self.segment_inds = np.array(segment_inds, dtype=np.int64).reshape(-1, 2, 2)
+        self.segment_weights = np.array(segment_weights, dtype=np.float64).reshape(-1, 2, 2)
+
+        self.segment_owner = np.zeros((len(segment_owner), len(self.length_names)), dtype=np.float64)
+        self.segment_owner[np.arange(len(segment_owner)), segment_owner] = 1.0
+
+        for array in (self.segment_inds, self.segment_weights, self.segment_owner):
+            array.setflags(write=False)
+
+        self.circumferences: Dict[str, CircumferencePlan] = {
+            name: _compile_circumference(name,
+                                         definition,
+                                         landmarks,
+                                         joint2ind,
+                                         circumf_2_bodypart.get(name),
+                                         faces,
+                                         face_labels,
+                                         body_parts)
+            for name, definition in circumf_definitions.items()
+        }
+
+    @property
+    def num_lengths(self) -> int:
+        return len(self.length_names)
+
+    def measure_lengths(self, verts: np.ndarray) -> np.ndarray:
+        '''
+        Measure all length measurements at once.
+        :param verts: np.ndarray (N,3) or (B,N,3) of body model vertices
+
+        Returns
+        :np.ndarray (L,) or (B,L) of lengths in cm, ordered as length_names
+        '''
+        # (..., S, 2, 2, 3) -> weighted average -> (..., S, 2, 3)
+        endpoints = np.sum(verts[..., self.segment_inds, :] * self.segment_weights[..., None], axis=-2)
+        segment_lengths = np.linalg.norm(endpoints[..., 1, :] - endpoints[..., 0, :], axis=-1)
+        return (segment_lengths @ self.segment_owner) * 100  # convert to cm
+
+    def plane_of(self, measurement_name: str, verts: np.ndarray, joints: np.ndarray
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Cutting plane of a circumference measurement.
+        :param measurement_name: str - circumference name
+        :param verts: np.ndarray (N,3) or (B,N,3) of body model vertices
+        :param joints: np.ndarray (J,3) or (B,J,3) of body model joints
+
+        Returns
+        :plane_origin np.ndarray (3,) or (B,3)
+        :plane_normal np.ndarray (3,) or (B,3)
+        '''
+        circumference = self.circumferences[measurement_name]
+        plane_origin = np.sum(verts[..., circumference.origin_inds, :] *
+                              circumference.origin_weights[:, None], axis=-2)
+        joint_1, joint_2 = circumference.joint_inds
+        plane_normal = joints[..., joint_1, :] - joints[..., joint_2, :]
+        return plane_origin, plane_normal
+
+
+def compile_measurement_plan(definitions,
+                             landmarks: Mapping[str, object],
+                             joint2ind: Mapping[str, int],
+                             faces: np.ndarray,
+                             face_labels: np.ndarray,
+                             body_parts: Sequence[str]) -> MeasurementPlan:
+    '''
+    Compile measurement definitions into a MeasurementPlan.
+    :param definitions: SMPLMeasurementDefinitions or SMPLXMeasurementDefinitions
+    :param landmarks: dict of landmark name -> vertex index (or tuple of indices)
+    :param joint2ind: dict of joint name -> joint index
+    :param faces: np.ndarray (F,3) of body model faces
+    :param face_labels: np.ndarray (F,) of the body part label of every face
+    :param body_parts: sequence of body part names indexed by face_labels
+
+    Return
+    MeasurementPlan
+    '''
+    return MeasurementPlan(length_definitions=definitions.LENGTHS,
+                           circumf_definitions=definitions.CIRCUMFERENCES,
+                           circumf_2_bodypart=definitions.CIRCUMFERENCE_TO_BODYPARTS,
+                           landmarks=landmarks,
+                           joint2ind=joint2ind,
+                           faces=faces,
+                           face_labels=face_labels,
+                           body_parts=body_parts)
@@ -0,0 +1,118 @@
+'''
+Process-wide pool of ready-to-use smplx body models.
+
+Creating a body model unpickles the model file (through chumpy) and
+allocates new torch buffers. The pool creates every model lazily, once
+per (model type, gender, num betas, model root), and shares it between
+threads. Forward passes only read the model buffers, so a pooled model
+can serve concurrent callers.
+'''
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+from romp_pipeline.config.settings import SMPL_MODELS_DIR
+
+
+class BodyModelPool():
+    '''
+    Thread-safe lazy cache of smplx body models.
+    '''
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, int, str], torch.nn.Module] = {}
+        self._lock = threading.Lock()
+
+    def get(self,
+            model_type: str = "smpl",
+            gender: str = "NEUTRAL",
+            num_betas: int = 10,
+            model_root: Optional[str] = None) -> torch.nn.Module:
+        '''
+        Get the pooled body model, creating it on first use.
+        :param model_type: str of model type: smpl, smplx, etc.
+        :param gender: str of gender: MALE or FEMALE or NEUTRAL
+        :param num_betas: int of number of shape coefficients
+        :param model_root: str of location where there are smpl/smplx/etc. folders
+                           with .pkl models, defaults to data/smpl_models
+
+        Return:
+        smplx body model (SMPL, SMPLX, etc.) in eval mode
+        '''
+        if model_root is None:
+            model_root = str(SMPL_MODELS_DIR)
+        key = (model_type.lower(), gender.upper(), num_betas, os.path.abspath(model_root))
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                # imported here to avoid a circular import with measure.py,
+                # which also applies the chumpy/numpy compatibility patches
+                from .measure import create_model
+
+                model = create_model(model_type=key[0],
+                                     model_root=model_root,
+                                     gender=key[1],
+                                     num_betas=num_betas).eval()
+                for param in model.parameters():
+                    param.requires_grad_(False)
+                self._models[key] = model
+
+        return model
+
+    def forward(self,
+                betas,
+                model_type: str = "smpl",
+                gender: str = "NEUTRAL",
+                model_root: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Run the rest pose forward pass of a batch of shapes.
+        :param betas: torch.tensor or np.ndarray (B,num_betas) of shape parameters
+        :param model_type: str of model type: smpl, smplx, etc.
+        :param gender: str of gender: MALE or FEMALE or NEUTRAL
+        :param model_root: str of location of the body model folders
+
+        Return:
+        :verts np.ndarray (B,N,3)
+        :joints np.ndarray (B,J,3)
+        '''
+        betas = torch.as_tensor(betas, dtype=torch.float32)
+        if betas.dim() == 1:
+            betas = betas[None]
+
+        model = self.get(model_type, gender, betas.shape[1], model_root)
+        batch_size = betas.shape[0]
+
+        with torch.inference_mode():
+            device = model.shapedirs.device
+            # rest pose, the pose parameters must match the batch size
+            model_output = model(betas=betas.to(device),
+                                 global_orient=torch.zeros((batch_size, 3), device=device),
+                                 body_pose=torch.zeros((batch_size, model.NUM_BODY_JOINTS * 3), device=device),
+                                 transl=torch.zeros((batch_size, 3), device=device),
+                                 return_verts=True)
+            verts = model_output.vertices.cpu().numpy()
+            joints = model_output.joints.cpu().numpy()
+
+        return verts, joints
+
+    def clear(self) -> None:
+        '''Drop all pooled models.'''
+        with self._lock:
+            self._models.clear()
+
+
+_BODY_MODEL_POOL = BodyModelPool()
+
+
+def get_body_model_pool() -> BodyModelPool:
+    '''Process-wide BodyModelPool.'''
+    return _BODY_MODEL_POOL
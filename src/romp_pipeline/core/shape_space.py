@@ -0,0 +1,96 @@
+'''
+Closed-form measurement of SMPL shape parameters.
+
+In the rest pose the SMPL vertices are affine in the shape parameters:
+verts = v_template + shapedirs @ betas, and so are the regressed joints.
+The landmark rows and the joint-regressor-projected shape basis are
+precomputed once per gender, so lengths and joints of many beta vectors
+come from one small matmul. The full mesh is only built when a
+circumference needs slicing.
+'''
+
+import numpy as np
+
+from .measurement_plan import MeasurementPlan
+
+
+class ShapeSpace():
+    '''
+    Affine shape basis of the rest pose body model restricted to what the
+    measurement plan needs.
+
+    :param v_template: np.ndarray (N,3) - template vertices
+    :param shapedirs: np.ndarray (N,3,K) - shape blend shapes
+    :param J_regressor: np.ndarray (J,N) - joint regressor
+    :param plan: MeasurementPlan - compiled measurement plan
+    '''
+
+    def __init__(self,
+                 v_template: np.ndarray,
+                 shapedirs: np.ndarray,
+                 J_regressor: np.ndarray,
+                 plan: MeasurementPlan):
+
+        self.plan = plan
+        self.num_betas = shapedirs.shape[-1]
+
+        self.v_template = np.asarray(v_template, dtype=np.float32)
+        self.shapedirs = np.asarray(shapedirs, dtype=np.float32)
+
+        # length segment endpoints: (S,2,3) and (S,2,3,K)
+        weights = plan.segment_weights[..., None]
+        self.segment_template = np.sum(self.v_template[plan.segment_inds] * weights, axis=-2)
+        self.segment_dirs = np.sum(self.shapedirs[plan.segment_inds] * weights[..., None], axis=-3)
+
+        # joints: (J,3) and (J,3,K)
+        self.joint_template = J_regressor @ self.v_template
+        self.joint_dirs = np.einsum('jn,nck->jck', J_regressor, self.shapedirs)
+
+        for array in (self.v_template, self.shapedirs, self.segment_template,
+                      self.segment_dirs, self.joint_template, self.joint_dirs):
+            array.setflags(write=False)
+
+    def _check_betas(self, betas: np.ndarray) -> np.ndarray:
+        betas = np.asarray(betas, dtype=np.float32)
+        if betas.ndim == 1:
+            betas = betas[None]
+        if betas.ndim != 2 or betas.shape[1] > self.num_betas:
+            raise ValueError(f"betas need to be of dimension (B,{self.num_betas}), got {betas.shape}")
+        if betas.shape[1] < self.num_betas:
+            betas = np.pad(betas, ((0, 0), (0, self.num_betas - betas.shape[1])))
+        return betas
+
+    def verts(self, betas: np.ndarray) -> np.ndarray:
+        '''
+        Rest pose vertices.
+        :param betas: np.ndarray (B,K) of shape parameters
+
+        Returns
+        :np.ndarray (B,N,3)
+        '''
+        betas = self._check_betas(betas)
+        return self.v_template + np.einsum('nck,bk->bnc', self.shapedirs, betas)
+
+    def joints(self, betas: np.ndarray) -> np.ndarray:
+        '''
+        Rest pose joints.
+        :param betas: np.ndarray (B,K) of shape parameters
+
+        Returns
+        :np.ndarray (B,J,3)
+        '''
+        betas = self._check_betas(betas)
+        return self.joint_template + np.einsum('jck,bk->bjc', self.joint_dirs, betas)
+
+    def measure_lengths(self, betas: np.ndarray) -> np.ndarray:
+        '''
+        Measure all length measurements of the plan without building the mesh.
+        :param betas: np.ndarray (B,K) of shape parameters
+
+        Returns
+        :np.ndarray (B,L) of lengths in cm, ordered as plan.length_names
+        '''
+        betas = self._check_betas(betas)
+        endpoints = self.segment_template + np.einsum('seck,bk->bsec', self.segment_dirs, betas)
+        segment_lengths = np.linalg.norm(endpoints[..., 1, :] - endpoints[..., 0, :], axis=-1)
+        return (segment_lengths @ self.plan.segment_owner) * 100  # convert to cm
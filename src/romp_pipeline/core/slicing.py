@@ -0,0 +1,96 @@
+'''
+Vectorized plane slicing of a triangle mesh.
+
+Replacement for trimesh.intersections.mesh_plane that works directly on a
+shared vertex array and a (usually small) subset of faces, so no Trimesh
+object has to be built for every circumference.
+'''
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def slice_faces_with_planes(verts: np.ndarray,
+                            faces: np.ndarray,
+                            plane_origins: np.ndarray,
+                            plane_normals: np.ndarray,
+                            face_inds: Optional[np.ndarray] = None
+                            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Intersect the given faces of a batch of meshes with one plane per mesh.
+    Each face with vertices on both sides of the plane gives one segment
+    connecting the crossing points of its two crossing edges.
+    Vertices lying exactly on the plane are counted as being in front of it.
+    :param verts: np.ndarray (B,N,3) - vertices of B meshes sharing the same faces
+    :param faces: np.ndarray (F,3) - faces to slice (indices into verts)
+    :param plane_origins: np.ndarray (B,3) - point on the plane of every mesh
+    :param plane_normals: np.ndarray (B,3) - plane normal of every mesh,
+                          does not need to be unit length
+    :param face_inds: np.ndarray (F,) - optional mesh face index of every row
+                      in faces, used for the returned sliced faces
+
+    Returns:
+    :param slice_segments: np.ndarray (K,2,3) - K segments represented as two 3D points
+    :param sliced_faces: np.ndarray (K,) - index of the face of every segment
+    :param mesh_inds: np.ndarray (K,) - index of the mesh of every segment, sorted
+    '''
+
+    face_verts = verts[:, faces]                                             # (B,F,3,3)
+    dists = np.einsum('bfkc,bc->bfk', face_verts - plane_origins[:, None, None],
+                      plane_normals)                                         # (B,F,3)
+
+    in_front = dists >= 0
+    # edge k connects face vertex k and k+1
+    crossing = in_front != np.roll(in_front, -1, axis=2)                     # (B,F,3)
+    is_sliced = crossing.any(axis=2)
+
+    mesh_inds, sliced_faces = np.nonzero(is_sliced)
+    if face_inds is not None:
+        sliced_faces = face_inds[sliced_faces]
+
+    # a sliced triangle always has exactly two crossing edges,
+    # np.nonzero walks them row by row so they come in pairs
+    rows, edges = np.nonzero(crossing[is_sliced])
+    face_verts = face_verts[is_sliced]
+    dists = dists[is_sliced]
+
+    next_edges = (edges + 1) % 3
+    start, end = face_verts[rows, edges], face_verts[rows, next_edges]
+    d_start, d_end = dists[rows, edges], dists[rows, next_edges]
+
+    t = d_start / (d_start - d_end)
+    crossing_points = start + t[:, None] * (end - start)
+
+    slice_segments = crossing_points.reshape(-1, 2, 3)
+
+    return slice_segments, sliced_faces, mesh_inds
+
+
+def slice_faces_with_plane(verts: np.ndarray,
+                           faces: np.ndarray,
+                           plane_origin: np.ndarray,
+                           plane_normal: np.ndarray,
+                           face_inds: Optional[np.ndarray] = None
+                           ) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Intersect the given faces of a single mesh with a plane.
+    See slice_faces_with_planes.
+    :param verts: np.ndarray (N,3) - mesh vertices
+    :param faces: np.ndarray (F,3) - faces to slice (indices into verts)
+    :param plane_origin: np.ndarray (3,) - point on the plane
+    :param plane_normal: np.ndarray (3,) - plane normal, does not need to be unit length
+    :param face_inds: np.ndarray (F,) - optional mesh face index of every row
+                      in faces, used for the returned sliced faces
+
+    Returns:
+    :param slice_segments: np.ndarray (K,2,3) - K segments represented as two 3D points
+    :param sliced_faces: np.ndarray (K,) - index of the face of every segment
+    '''
+
+    slice_segments, sliced_faces, _ = slice_faces_with_planes(verts[None],
+                                                              faces,
+                                                              np.asarray(plane_origin)[None],
+                                                              np.asarray(plane_normal)[None],
+                                                              face_inds=face_inds)
+    return slice_segments, sliced_faces
@@ -1,19 +1,30 @@
 
 
 import json
+import os
 import sys
+from typing import Sequence
 import numpy as np
 from scipy.spatial import ConvexHull
 import argparse
 
-def load_face_segmentation(path: str):
+from .measurement_definitions import SMPL_BODY_PARTS
+
+def load_face_segmentation(path: str, body_parts: Sequence[str] = SMPL_BODY_PARTS):
         '''
         Load face segmentation which defines for each body model part
         the faces that belong to it.
-        :param path: str - path to json file with defined face segmentation
+        The segmentation is either the json file or its compact .npy form
+        with one body part label per face (see face_segmentation_to_labels).
+        :param path: str - path to json or npy file with defined face segmentation
+        :param body_parts: sequence of body part names indexed by the npy labels
         '''
 
         try:
+            if path.endswith(".npy"):
+                face_labels = np.load(path)
+                return face_labels_to_segmentation(face_labels, body_parts)
+
             with open(path, 'r') as f:
                 face_segmentation = json.load(f)
         except FileNotFoundError:
@@ -22,6 +33,77 @@ def load_face_segmentation(path: str):
         return face_segmentation
 
 
+def face_segmentation_to_labels(face_segmentation: dict,
+                                body_parts: Sequence[str] = SMPL_BODY_PARTS,
+                                num_faces: int = None):
+        '''
+        Convert face segmentation to a per-face label array.
+        :param face_segmentation: dict - dict mapping body part to all faces belonging
+                                        to it, every face belongs to at most one body part
+        :param body_parts: sequence of body part names, the label of a body part
+                           is its position in the sequence
+        :param num_faces: int - number of faces of the body model, defaults to
+                                the largest segmented face index + 1
+
+        Return:
+        :param face_labels: np.ndarray (F,) int8 - body part label of every face,
+                            -1 for faces outside the segmentation
+        '''
+
+        unknown_body_parts = set(face_segmentation.keys()) - set(body_parts)
+        if unknown_body_parts:
+            raise ValueError(f"Unknown body parts in face segmentation: {sorted(unknown_body_parts)}")
+
+        face_inds = {body_part: np.asarray(face_segmentation.get(body_part, []), dtype=np.int64)
+                     for body_part in body_parts}
+
+        if num_faces is None:
+            num_faces = max((int(inds.max()) + 1 for inds in face_inds.values() if inds.size), default=0)
+
+        face_labels = np.full(num_faces, -1, dtype=np.int8)
+        for label, body_part in enumerate(body_parts):
+            if np.any(face_labels[face_inds[body_part]] != -1):
+                raise ValueError(f"Faces of body part {body_part} are assigned to more than one body part")
+            face_labels[face_inds[body_part]] = label
+
+        return face_labels
+
+
+def face_labels_to_segmentation(face_labels: np.ndarray,
+                                body_parts: Sequence[str] = SMPL_BODY_PARTS):
+        '''
+        Convert a per-face label array back to a face segmentation.
+        :param face_labels: np.ndarray (F,) - body part label of every face
+        :param body_parts: sequence of body part names indexed by the labels
+
+        Return:
+        :param face_segmentation: dict - dict mapping body part to np.ndarray
+                                        of all faces belonging to it
+        '''
+
+        return {body_part: np.flatnonzero(face_labels == label)
+                for label, body_part in enumerate(body_parts)}
+
+
+def body_part_face_mask(face_labels: np.ndarray,
+                        body_parts,
+                        all_body_parts: Sequence[str] = SMPL_BODY_PARTS):
+        '''
+        Boolean mask of the faces that belong to the given body part(s).
+        :param face_labels: np.ndarray (F,) - body part label of every face
+        :param body_parts: str or list of str - body part(s) to select
+        :param all_body_parts: sequence of body part names indexed by the labels
+
+        Return:
+        :param face_mask: np.ndarray (F,) bool
+        '''
+
+        if not isinstance(body_parts, list):
+            body_parts = [body_parts]
+        labels = [all_body_parts.index(body_part) for body_part in body_parts]
+        return np.isin(face_labels, labels)
+
+
 def convex_hull_from_3D_points(slice_segments: np.ndarray):
         '''
         Cretes convex hull from 3D points
@@ -80,20 +162,18 @@ def filter_body_part_slices(slice_segments:np.ndarray,
 
             body_parts = circumf_2_bodypart[measurement_name]
 
-            if isinstance(body_parts,list):
-                body_part_faces = [face_index for body_part in body_parts 
-                                    for face_index in face_segmentation[body_part]]
-            else:
-                body_part_faces = face_segmentation[body_parts]
+            if not isinstance(body_parts, list):
+                body_parts = [body_parts]
+            body_part_faces = np.concatenate([np.asarray(face_segmentation[body_part], dtype=np.int64)
+                                              for body_part in body_parts])
 
-            N_sliced_faces = sliced_faces.shape[0]
+            if sliced_faces.shape[0] == 0:
+                return slice_segments
 
-            keep_segments = []
-            for i in range(N_sliced_faces):
-                if sliced_faces[i] in body_part_faces:
-                    keep_segments.append(i)
+            face_mask = np.zeros(max(body_part_faces.max(initial=0), sliced_faces.max()) + 1, dtype=bool)
+            face_mask[body_part_faces] = True
 
-            return slice_segments[keep_segments]
+            return slice_segments[face_mask[sliced_faces]]
 
         else:
             return slice_segments
@@ -157,7 +237,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Create face segmentation from \
                                      point segmentation of smpl/smplx models.')
     parser.add_argument('--create_face_segmentation', action='store_true')
+    parser.add_argument('--export_face_labels', type=str, default=None,
+                        help='Path to a face segmentation json to store as a compact .npy next to it')
     args = parser.parse_args()
+
+    if args.export_face_labels:
+
+        face_segmentation = load_face_segmentation(args.export_face_labels)
+        face_labels = face_segmentation_to_labels(face_segmentation)
+
+        save_as = os.path.splitext(args.export_face_labels)[0] + ".npy"
+        np.save(save_as, face_labels)
     
     if args.create_face_segmentation:
 
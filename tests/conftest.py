@@ -0,0 +1,107 @@
+'''
+Shared fixtures.
+
+The SMPL model files are not part of the repository, so the measurement
+tests run on synthetic assets with the SMPL layout: a closed tube of
+6890 vertices, faces labeled with random SMPL body parts and a joint
+regressor averaging one ring of vertices per joint. The measurement
+definitions, landmarks and joints are the real ones.
+'''
+
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from romp_pipeline.core.assets import BodyModelAssets
+from romp_pipeline.core.joint_definitions import SMPL_JOINT2IND, SMPL_NUM_JOINTS
+from romp_pipeline.core.landmark_definitions import SMPL_LANDMARK_INDICES
+from romp_pipeline.core.measurement_definitions import SMPL_BODY_PARTS, SMPLMeasurementDefinitions
+from romp_pipeline.core.measurement_plan import compile_measurement_plan
+from romp_pipeline.core.shape_space import ShapeSpace
+from romp_pipeline.core.utils import face_labels_to_segmentation
+
+ROWS, COLS = 106, 65  # 6890 vertices, as SMPL
+NUM_BETAS = 10
+
+
+def tube_faces() -> np.ndarray:
+    '''Faces of a tube of ROWS rings of COLS vertices, two triangles per quad.'''
+    rows, cols = np.meshgrid(np.arange(ROWS - 1), np.arange(COLS), indexing="ij")
+    a = rows * COLS + cols
+    b = rows * COLS + (cols + 1) % COLS
+    lower = np.stack([a, b, a + COLS], axis=-1)
+    upper = np.stack([b, b + COLS, a + COLS], axis=-1)
+    return np.stack([lower, upper], axis=2).reshape(-1, 3).astype(np.int64)
+
+
+def body_verts(rng: np.random.Generator, batch_size: int = None) -> np.ndarray:
+    '''
+    Vertices of a randomly bulging, slightly noisy tube 1.7 m tall.
+    :param rng: random generator
+    :param batch_size: int, a (B,N,3) batch if given, else (N,3)
+    '''
+    if batch_size is not None:
+        return np.stack([body_verts(rng) for _ in range(batch_size)])
+
+    heights = np.linspace(0, 1.7, ROWS)
+    radii = 0.12 + 0.05 * np.sin(7 * heights + rng.uniform()) + rng.uniform(0, 0.02)
+    angles = np.linspace(0, 2 * np.pi, COLS, endpoint=False)
+    x = radii[:, None] * np.cos(angles) * (1 + 0.3 * rng.uniform())
+    z = radii[:, None] * np.sin(angles)
+    y = np.broadcast_to(heights[:, None], x.shape)
+    verts = np.stack([x, y, z], axis=-1).reshape(-1, 3)
+    verts += rng.normal(0, 0.002, verts.shape)
+    return verts.astype(np.float32)
+
+
+def make_assets(gender: str = "NEUTRAL", seed: int = 0) -> BodyModelAssets:
+    '''Synthetic BodyModelAssets, see the module docstring.'''
+    rng = np.random.default_rng(seed)
+
+    faces = tube_faces()
+    face_labels = rng.integers(0, len(SMPL_BODY_PARTS), faces.shape[0]).astype(np.int8)
+    body_parts = tuple(SMPL_BODY_PARTS)
+
+    J_regressor = np.zeros((SMPL_NUM_JOINTS, ROWS * COLS), dtype=np.float32)
+    for joint in range(SMPL_NUM_JOINTS):
+        ring = joint * (ROWS - 1) // (SMPL_NUM_JOINTS - 1)
+        J_regressor[joint, ring * COLS:(ring + 1) * COLS] = 1.0 / COLS
+
+    definitions = SMPLMeasurementDefinitions()
+    plan = compile_measurement_plan(definitions, SMPL_LANDMARK_INDICES, SMPL_JOINT2IND,
+                                    faces, face_labels, body_parts)
+    shape_space = ShapeSpace(body_verts(rng),
+                             rng.normal(0, 0.01, (ROWS * COLS, 3, NUM_BETAS)).astype(np.float32),
+                             J_regressor,
+                             plan)
+
+    return BodyModelAssets(
+        model_type="smpl",
+        gender=gender,
+        faces=faces,
+        J_regressor=J_regressor,
+        face_segmentation=MappingProxyType(face_labels_to_segmentation(face_labels, body_parts)),
+        face_labels=face_labels,
+        body_parts=body_parts,
+        landmarks=MappingProxyType(dict(SMPL_LANDMARK_INDICES)),
+        length_definitions=MappingProxyType(dict(definitions.LENGTHS)),
+        circumf_definitions=MappingProxyType(dict(definitions.CIRCUMFERENCES)),
+        circumf_2_bodypart=MappingProxyType(dict(definitions.CIRCUMFERENCE_TO_BODYPARTS)),
+        possible_measurements=tuple(definitions.possible_measurements),
+        joint2ind=MappingProxyType(dict(SMPL_JOINT2IND)),
+        num_joints=SMPL_NUM_JOINTS,
+        num_points=ROWS * COLS,
+        plan=plan,
+        shape_space=shape_space,
+    )
+
+
+@pytest.fixture(scope="session")
+def smpl_assets() -> BodyModelAssets:
+    return make_assets()
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
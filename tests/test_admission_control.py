@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from romp_pipeline.api.exceptions import LoadSheddingError
+from romp_pipeline.api.middleware import RequestMiddleware
+from romp_pipeline.api.services import admission_control
+from romp_pipeline.api.services.admission_control import AdmissionController
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(admission_control, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def controller(clock):
+    return AdmissionController(min_limit=2, max_limit=20, latency_target_s=1.0,
+                               sojourn_target_s=0.5, interval_s=1.0)
+
+
+def next_interval(controller, clock):
+    '''Let an interval pass and run the update with one admitted request.'''
+    clock.now += controller.interval_s
+    controller.acquire()
+    controller.release()
+
+
+def test_sheds_beyond_the_limit(controller):
+    controller.set_limits(1, 2)
+    controller.acquire()
+    controller.acquire()
+
+    with pytest.raises(LoadSheddingError) as shed:
+        controller.acquire()
+
+    assert shed.value.status_code == 503
+    assert shed.value.headers["Retry-After"] == "1"
+    assert controller.stats()["shed"] == 1
+    controller.release()
+    controller.acquire()
+    assert controller.in_flight == 2
+
+
+def test_disabled_never_sheds(clock):
+    controller = AdmissionController(min_limit=1, max_limit=1, latency_target_s=1.0,
+                                     sojourn_target_s=0.5, interval_s=1.0, enabled=False)
+    for _ in range(5):
+        controller.acquire()
+    assert controller.shed == 0
+
+
+def test_slow_interval_cuts_the_limit_once(controller, clock):
+    clock.now += 0.5
+    for _ in range(10):
+        controller.observe_latency(5.0)
+
+    next_interval(controller, clock)
+    assert controller.limit == 15
+
+    # the requests admitted before the cut finish just as slowly
+    clock.now += 0.5
+    for _ in range(10):
+        controller.observe_latency(5.0)
+    next_interval(controller, clock)
+    assert controller.limit == 16
+
+
+def test_slow_requests_admitted_after_the_cut_cut_again(controller, clock):
+    clock.now += 0.5
+    controller.observe_latency(5.0)
+    next_interval(controller, clock)
+    assert controller.limit == 15
+
+    next_interval(controller, clock)
+    assert controller.limit == 16
+
+    # started 0.1s after the cut
+    clock.now += 0.5
+    controller.observe_latency(1.4)
+    next_interval(controller, clock)
+    assert controller.limit == 12
+
+
+def test_recovers_one_per_interval(controller, clock):
+    clock.now += 0.5
+    controller.observe_latency(5.0)
+    next_interval(controller, clock)
+    assert controller.limit == 15
+
+    limits = []
+    for _ in range(7):
+        clock.now += 0.5
+        controller.observe_latency(0.2)
+        next_interval(controller, clock)
+        limits.append(controller.limit)
+
+    assert limits == [16, 17, 18, 19, 20, 20, 20]
+
+
+def test_standing_queue_cuts_the_limit(controller, clock):
+    controller.observe_sojourn(2.0)
+    controller.observe_sojourn(0.8)
+
+    next_interval(controller, clock)
+    assert controller.limit == 15
+
+    # a single short wait in the interval means no standing queue
+    controller.observe_sojourn(2.0)
+    controller.observe_sojourn(0.1)
+    next_interval(controller, clock)
+    assert controller.limit == 16
+
+
+def test_limit_stays_above_min_limit(controller, clock):
+    for _ in range(20):
+        controller.observe_sojourn(2.0)
+        next_interval(controller, clock)
+    assert controller.limit == controller.min_limit
+
+
+def test_middleware_observes_latency_of_non_streamed_responses():
+    latencies = []
+    recorder = SimpleNamespace(observe_latency=latencies.append)
+
+    def admit(request: Request):
+        request.state.admission_controller = recorder
+
+    app = FastAPI()
+    app.add_middleware(RequestMiddleware)
+
+    @app.post("/measure", dependencies=[Depends(admit)])
+    def measure():
+        return {"height": 170.0}
+
+    @app.post("/measure/batch", dependencies=[Depends(admit)])
+    def measure_batch():
+        return StreamingResponse(iter([b"{}\n", b"{}\n"]), media_type="application/x-ndjson")
+
+    client = TestClient(app)
+    assert client.post("/measure").status_code == 200
+    assert len(latencies) == 1
+    assert client.post("/measure/batch").text == "{}\n{}\n"
+    assert len(latencies) == 1
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from romp_pipeline.api import middleware
+from romp_pipeline.api.middleware import BodySizeLimitMiddleware
+
+LIMIT = 1000
+CAP = LIMIT + BodySizeLimitMiddleware.MULTIPART_OVERHEAD
+
+
+async def echo_length(scope, receive, send):
+    body = await Request(scope, receive).body()
+    await JSONResponse({"received": len(body)})(scope, receive, send)
+
+
+@pytest.fixture(autouse=True)
+def limit(monkeypatch):
+    monkeypatch.setattr(middleware.settings, "MAX_UPLOAD_SIZE_BYTES", LIMIT)
+
+
+def post(chunks, headers=()):
+    '''Send the body in `chunks` through the middleware, return the status and the JSON body.'''
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/measure", "query_string": b"",
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    asyncio.run(BodySizeLimitMiddleware(echo_length)(scope, receive, send))
+
+    start, body = sent[0], b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], json.loads(body), len(messages)
+
+
+def test_small_body_passes():
+    assert post([b"x" * 100, b"x" * 100]) == (200, {"received": 200}, 0)
+
+
+def test_declared_length_over_the_cap_is_rejected_unread():
+    status, body, unread = post([b"x" * 10], headers=[("content-length", str(CAP + 1))])
+
+    assert status == 413
+    assert "Payload too large" in body["detail"]
+    assert unread == 1
+
+
+def test_chunked_body_over_the_cap_is_cut_off():
+    chunk = b"x" * (CAP // 4)
+    status, body, unread = post([chunk] * 10)
+
+    assert status == 413
+    assert "Payload too large" in body["detail"]
+    # nothing is read after the fifth chunk, which passes the cap
+    assert unread == 5
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from romp_pipeline.api.exceptions import ServiceOverloadedError, api_exception_handler
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+
+
+async def until(condition):
+    while not condition():
+        await asyncio.sleep(0)
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        scheduler = InferenceScheduler(workers=1, queue_size=1)
+        release = asyncio.Event()
+
+        async def inference():
+            await release.wait()
+            return "verts"
+
+        running = asyncio.ensure_future(scheduler.submit(inference))
+        await until(lambda: scheduler.stats()["busy_workers"] == 1)
+        queued = asyncio.ensure_future(scheduler.submit(inference))
+        await until(lambda: scheduler.stats()["queue_depth"] == 1)
+
+        with pytest.raises(ServiceOverloadedError) as rejected:
+            await scheduler.submit(inference)
+        response = await api_exception_handler(None, rejected.value)
+        stats = scheduler.stats()
+
+        release.set()
+        results = await asyncio.gather(running, queued)
+        await scheduler.stop()
+        return response, stats, results
+
+    response, stats, results = asyncio.run(scenario())
+
+    assert response.status_code == 429
+    # one running and one queued job at the default service time of 1s
+    assert response.headers["Retry-After"] == "2"
+    assert stats["rejected"] == 1
+    assert stats["busy_workers"] == 1
+    assert stats["queue_depth"] == 1
+    assert results == ["verts", "verts"]
+
+
+def test_workers_bound_concurrency():
+    async def scenario():
+        scheduler = InferenceScheduler(workers=2, queue_size=10)
+        running, peak = 0, 0
+
+        async def inference():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.submit(inference) for _ in range(8)))
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return peak, stats
+
+    peak, stats = asyncio.run(scenario())
+
+    assert peak == 2
+    assert stats["completed"] == 8
+    assert stats["rejected"] == 0
+
+
+def test_errors_reach_the_caller():
+    async def scenario():
+        scheduler = InferenceScheduler(workers=1, queue_size=1)
+
+        async def inference():
+            raise RuntimeError("no person detected")
+
+        try:
+            await scheduler.submit(inference)
+        finally:
+            await scheduler.stop()
+
+    with pytest.raises(RuntimeError, match="no person detected"):
+        asyncio.run(scenario())
+
+
+def test_stop_cancels_queued_jobs():
+    async def scenario():
+        scheduler = InferenceScheduler(workers=1, queue_size=1)
+        release = asyncio.Event()
+
+        running = asyncio.ensure_future(scheduler.submit(release.wait))
+        await until(lambda: scheduler.stats()["busy_workers"] == 1)
+        queued = asyncio.ensure_future(scheduler.submit(release.wait))
+        await until(lambda: scheduler.stats()["queue_depth"] == 1)
+
+        await scheduler.stop()
+        return await asyncio.gather(running, queued, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import time
+
+import pytest
+
+from romp_pipeline.api.exceptions import APIException
+from romp_pipeline.api.services.job_service import JobService
+from romp_pipeline.api.services.job_store import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs" / "jobs.db")
+
+
+def open_store(db_path, retention_s=60):
+    store = JobStore(db_path, retention_s)
+    store.open()
+    return store
+
+
+class FakePipeline:
+    '''Measures every image as its length, fails images starting with "bad".'''
+
+    def __init__(self):
+        self.images = []
+
+    async def measure_waiting(self, content, image_hash, target_height, max_wait_s, logger):
+        self.images.append(content)
+        if content.startswith(b"bad"):
+            raise APIException("No person detected", 422)
+        return {"height": target_height, "size": float(len(content))}
+
+
+def test_store_is_not_created_before_open(db_path):
+    store = JobStore(db_path, retention_s=60)
+
+    with pytest.raises(RuntimeError, match="not open"):
+        store.get("a")
+    assert not os.path.exists(os.path.dirname(db_path))
+
+    store.open()
+    assert os.path.exists(db_path)
+    store.close()
+
+
+def test_job_lifecycle(db_path):
+    store = open_store(db_path)
+
+    job = store.create("a", b"image", "hash", 170.0)
+    assert job["status"] == QUEUED
+    assert store.get_input("a") == {"image": b"image", "image_hash": "hash", "target_height": 170.0}
+
+    store.set_running("a")
+    assert store.get("a")["status"] == RUNNING
+
+    store.set_done("a", {"height": 170.0})
+    job = store.get("a")
+    assert job["status"] == DONE
+    assert job["measurements"] == {"height": 170.0}
+    assert store.get_input("a") is None
+    assert store.get("missing") is None
+    store.close()
+
+
+def test_unfinished_jobs_survive_restart(db_path):
+    store = open_store(db_path)
+    for job_id in ("queued", "running", "done", "failed"):
+        store.create(job_id, job_id.encode(), "hash", 170.0)
+    store.set_running("running")
+    store.set_done("done", {"height": 170.0})
+    store.set_failed("failed", "No person detected")
+    store.close()
+
+    restarted = open_store(db_path)
+
+    assert restarted.unfinished() == ["queued", "running"]
+    assert restarted.get_input("running")["image"] == b"running"
+    assert restarted.get("failed")["error"] == "No person detected"
+    assert restarted.stats() == {QUEUED: 1, RUNNING: 1, DONE: 1, FAILED: 1}
+    restarted.close()
+
+
+def test_purge_deletes_only_old_finished_jobs(db_path):
+    store = open_store(db_path, retention_s=0.01)
+    store.create("queued", b"image", "hash", 170.0)
+    store.create("done", b"image", "hash", 170.0)
+    store.set_done("done", {"height": 170.0})
+    time.sleep(0.02)
+
+    assert store.purge() == 1
+    assert store.get("done") is None
+    assert store.get("queued") is not None
+    store.close()
+
+
+def test_service_resumes_unfinished_jobs(db_path):
+    store = open_store(db_path)
+    store.create("queued", b"queued", "hash", 170.0)
+    store.create("running", b"running", "hash", 180.0)
+    store.create("bad", b"bad image", "hash", 170.0)
+    store.create("done", b"done", "hash", 170.0)
+    store.set_running("running")
+    store.set_done("done", {"height": 170.0})
+    store.close()
+
+    pipeline = FakePipeline()
+
+    async def scenario():
+        restarted = JobStore(db_path, retention_s=60)
+        service = JobService(restarted, pipeline, scheduler=None,
+                             concurrency=2, max_pending=10, max_wait_s=1.0)
+        await service.start(logger)
+        while (await service.stats())["pending"]:
+            await asyncio.sleep(0.01)
+        jobs = {job_id: await service.get(job_id) for job_id in ("queued", "running", "bad")}
+        await service.stop()
+        return jobs
+
+    jobs = asyncio.run(scenario())
+
+    assert sorted(pipeline.images) == [b"bad image", b"queued", b"running"]
+    assert jobs["queued"]["status"] == DONE
+    assert jobs["running"]["measurements"] == {"height": 180.0, "size": 7.0}
+    assert jobs["bad"]["status"] == FAILED
+    assert jobs["bad"]["error"] == "No person detected"
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import torch
+
+from romp_pipeline.core.measure import MeasureSMPL
+from conftest import body_verts
+
+
+def measure_each(assets, verts, measurement_names):
+    '''(B,M) measurements of every body through from_verts and measure.'''
+    values = []
+    for body in verts:
+        measurer = MeasureSMPL(assets=assets)
+        measurer.from_verts(body)
+        measurer.measure(measurement_names)
+        values.append([measurer.measurements.get(name, np.nan) for name in measurement_names])
+    return np.array(values)
+
+
+def test_batch_matches_measure(smpl_assets, rng):
+    verts = body_verts(rng, batch_size=5)
+    measurer = MeasureSMPL(assets=smpl_assets)
+
+    values, names = measurer.measure_batch(verts)
+
+    assert names == list(smpl_assets.possible_measurements)
+    assert values.shape == (5, len(names))
+    assert values.dtype == np.float32
+    assert not np.isnan(values).any()
+    np.testing.assert_allclose(values, measure_each(smpl_assets, verts, names), rtol=1e-4)
+
+
+def test_batch_keeps_measurer_state(smpl_assets, rng):
+    measurer = MeasureSMPL(assets=smpl_assets)
+
+    measurer.measure_batch(body_verts(rng, batch_size=2))
+
+    assert measurer.verts is None
+    assert measurer.measurements == {}
+
+
+def test_batch_of_selected_measurements(smpl_assets, rng):
+    verts = body_verts(rng, batch_size=3)
+    names = ["neck", "height"]
+
+    values, columns = MeasureSMPL(assets=smpl_assets).measure_batch(torch.from_numpy(verts), names)
+
+    assert columns == names
+    np.testing.assert_allclose(values, measure_each(smpl_assets, verts, names), rtol=1e-4)
+
+
+def test_single_body(smpl_assets, rng):
+    verts = body_verts(rng)
+
+    values, names = MeasureSMPL(assets=smpl_assets).measure_batch(verts)
+
+    assert values.shape == (1, len(names))
+
+
+def test_undefined_measurement(smpl_assets, rng):
+    with pytest.raises(ValueError, match="not defined"):
+        MeasureSMPL(assets=smpl_assets).measure_batch(body_verts(rng, batch_size=1), ["wingspan"])
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from romp_pipeline.api.dependencies import get_batch_service, get_image_service
+from romp_pipeline.api.exceptions import APIException, ServiceOverloadedError
+from romp_pipeline.api.main import create_app
+from romp_pipeline.api.services.batch_service import BatchService
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+
+
+class FakePipeline:
+    '''Measures every image as its size, fails images starting with "bad" or "boom".'''
+
+    async def measure_waiting(self, content, image_hash, target_height, max_wait_s, logger):
+        await asyncio.sleep(0.001 * (len(content) % 3))
+        if content.startswith(b"bad"):
+            raise APIException("No person detected", 422)
+        if content.startswith(b"boom"):
+            raise RuntimeError("engine crashed")
+        return {"height": target_height, "size": float(len(content))}
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    batch_service = BatchService(get_image_service(), FakePipeline(), concurrency=2, max_wait_s=1.0)
+    app.dependency_overrides[get_batch_service] = lambda: batch_service
+    return TestClient(app)
+
+
+def png(name, content):
+    return ("images", (name, content, "image/png"))
+
+
+def ndjson(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.split("\n")[:-1]]
+
+
+def test_one_line_per_image_then_summary(client):
+    images = [b"first image", b"bad image", b"boom", b"fourth"]
+    response = client.post("/measure/batch",
+                           files=[png(f"{i}.png", content) for i, content in enumerate(images)],
+                           data={"target_height_cm": "170"})
+
+    *items, summary = ndjson(response)
+
+    assert summary == {"summary": {"items": 4, "succeeded": 2, "failed": 2}}
+    assert sorted(item["index"] for item in items) == [0, 1, 2, 3]
+    by_index = {item["index"]: item for item in items}
+    assert by_index[0] == {"index": 0, "source": "0.png",
+                           "image_hash": hashlib.sha256(images[0]).hexdigest(),
+                           "measurements": {"height": 170.0, "size": 11.0}}
+    assert by_index[1]["error"] == "No person detected"
+    assert by_index[1]["status_code"] == 422
+    assert "measurements" not in by_index[1]
+    assert by_index[2]["error"] == "Internal server error"
+    assert by_index[2]["status_code"] == 500
+
+
+def test_archive_members_and_rejected_uploads(client):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("photos/a.jpg", b"member a")
+        zf.writestr("photos/readme.txt", b"not an image")
+        zf.writestr("__MACOSX/photos/._a.jpg", b"resource fork")
+
+    response = client.post("/measure/batch",
+                           files=[("archive", ("photos.zip", archive.getvalue(), "application/zip")),
+                                  ("images", ("notes.txt", b"text", "text/plain"))],
+                           data={"target_height_cm": "180"})
+
+    *items, summary = ndjson(response)
+
+    assert summary == {"summary": {"items": 2, "succeeded": 1, "failed": 1}}
+    by_source = {item["source"]: item for item in items}
+    assert by_source["photos/a.jpg"]["measurements"] == {"height": 180.0, "size": 8.0}
+    assert by_source["notes.txt"]["status_code"] == 400
+
+
+@pytest.mark.parametrize("data, files, detail", [
+    ({}, [png("a.png", b"a")], "target_height_cm"),
+    ({"target_height_cm": "170"}, None, "no images"),
+])
+def test_invalid_batch_is_rejected_as_a_whole(client, data, files, detail):
+    response = client.post("/measure/batch", data=data, files=files)
+
+    assert response.status_code == 400
+    assert detail in response.json()["detail"]
+
+
+def test_overload_retries_are_bounded(monkeypatch):
+    pipeline = MeasurePipeline(None, None, None, None, None, None, None)
+    calls = []
+
+    async def measure(content, image_hash, target_height, logger):
+        calls.append(content)
+        raise ServiceOverloadedError(1)
+
+    monkeypatch.setattr(pipeline, "measure", measure)
+
+    with pytest.raises(ServiceOverloadedError):
+        asyncio.run(pipeline.measure_waiting(b"image", "hash", 170.0, 1.5, logging.getLogger(__name__)))
+    assert len(calls) == 2
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from romp_pipeline.core.measure import MeasureSMPL
+from romp_pipeline.core.measurement_definitions import SMPLMeasurementDefinitions
+from romp_pipeline.core.measurement_plan import MeasurementPlan
+from conftest import body_verts
+
+
+def landmark_point(verts, landmark):
+    if isinstance(landmark, tuple):
+        return (verts[landmark[0]] + verts[landmark[1]]) / 2
+    return verts[landmark]
+
+
+def baseline_length(verts, path):
+    '''Length of a landmark path, computed as Measurer.measure_length did before the plan.'''
+    points = [landmark_point(verts, landmark) for landmark in path]
+    return sum(np.linalg.norm(end - start) for start, end in zip(points[:-1], points[1:])) * 100
+
+
+def test_lengths_match_baseline(smpl_assets, rng):
+    plan = smpl_assets.plan
+    verts = body_verts(rng).astype(np.float64)
+
+    lengths = plan.measure_lengths(verts)
+
+    assert lengths.shape == (plan.num_lengths,)
+    for name, path in smpl_assets.length_definitions.items():
+        assert lengths[plan.length2ind[name]] == pytest.approx(baseline_length(verts, path), rel=1e-9)
+
+
+def test_batched_lengths_match_single(smpl_assets, rng):
+    plan = smpl_assets.plan
+    verts = body_verts(rng, batch_size=4)
+
+    lengths = plan.measure_lengths(verts)
+
+    assert lengths.shape == (4, plan.num_lengths)
+    for i in range(4):
+        np.testing.assert_allclose(lengths[i], plan.measure_lengths(verts[i]), rtol=1e-6)
+
+
+def test_measurer_lengths_use_plan(smpl_assets, rng):
+    verts = body_verts(rng)
+    measurer = MeasureSMPL(assets=smpl_assets)
+    measurer.from_verts(verts)
+
+    measurer.measure(list(smpl_assets.length_definitions))
+
+    for name, path in smpl_assets.length_definitions.items():
+        assert measurer.measurements[name] == pytest.approx(baseline_length(verts, path), rel=1e-5)
+
+
+def test_plane_of(smpl_assets, rng):
+    plan = smpl_assets.plan
+    verts = body_verts(rng)
+    joints = smpl_assets.J_regressor @ verts
+
+    for name, definition in smpl_assets.circumf_definitions.items():
+        origin, normal = plan.plane_of(name, verts, joints)
+
+        landmark_points = [landmark_point(verts, smpl_assets.landmarks[lm])
+                           for lm in definition["LANDMARKS"]]
+        joint_1, joint_2 = (smpl_assets.joint2ind[j] for j in definition["JOINTS"])
+        np.testing.assert_allclose(origin, np.mean(landmark_points, axis=0), rtol=1e-5, atol=1e-7)
+        np.testing.assert_allclose(normal, joints[joint_1] - joints[joint_2])
+
+
+def test_circumference_face_subsets(smpl_assets):
+    definitions = SMPLMeasurementDefinitions()
+    for name, circumference in smpl_assets.plan.circumferences.items():
+        body_parts = definitions.CIRCUMFERENCE_TO_BODYPARTS.get(name)
+        if body_parts is None:
+            assert circumference.face_mask.all()
+            continue
+        if not isinstance(body_parts, list):
+            body_parts = [body_parts]
+        expected = np.concatenate([smpl_assets.face_segmentation[part] for part in body_parts])
+        np.testing.assert_array_equal(circumference.face_inds, np.sort(expected))
+        np.testing.assert_array_equal(circumference.faces, smpl_assets.faces[circumference.face_inds])
+
+
+def test_plan_is_read_only(smpl_assets):
+    plan = smpl_assets.plan
+    with pytest.raises(ValueError):
+        plan.segment_inds[0, 0, 0] = 0
+    circumference = next(iter(plan.circumferences.values()))
+    with pytest.raises(ValueError):
+        circumference.faces[0, 0] = 0
+
+
+def test_short_path_is_rejected(smpl_assets):
+    with pytest.raises(ValueError, match="At least 2 are required"):
+        MeasurementPlan(length_definitions={"broken": (0,)},
+                        circumf_definitions={},
+                        circumf_2_bodypart={},
+                        landmarks=smpl_assets.landmarks,
+                        joint2ind=smpl_assets.joint2ind,
+                        faces=smpl_assets.faces,
+                        face_labels=smpl_assets.face_labels,
+                        body_parts=smpl_assets.body_parts)
@@ -0,0 +1,126 @@
+import io
+
+import numpy as np
+import pytest
+
+from romp_pipeline.api.exceptions import MeasurementExtractionError, VertsValidationError
+from romp_pipeline.api.services.measurement_service import MeasurementService
+from conftest import body_verts
+
+
+@pytest.fixture(scope="module")
+def service():
+    return MeasurementService()
+
+
+def npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("dtype", ["<f4", ">f4", "<f8", "<f2"])
+def test_decode_npy(service, rng, dtype):
+    verts = body_verts(rng).astype(dtype)
+
+    decoded = service.decode_verts(npy(verts))
+
+    assert decoded.shape == (6890, 3)
+    assert decoded.dtype == np.dtype(dtype)
+    np.testing.assert_array_equal(decoded, verts)
+    assert not decoded.flags.writeable
+
+
+def test_decode_npy_with_batch_axis(service, rng):
+    verts = body_verts(rng)
+
+    np.testing.assert_array_equal(service.decode_verts(npy(verts[None])), verts)
+
+
+def test_decode_raw_float32(service, rng):
+    verts = body_verts(rng)
+
+    decoded = service.decode_verts(verts.astype("<f4").tobytes())
+
+    np.testing.assert_array_equal(decoded, verts)
+    assert not decoded.flags.writeable
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"\x00" * (6890 * 3 * 4 - 4), "Expected 82680 bytes"),
+    (npy(np.zeros((6890, 2), dtype=np.float32)), "Expected shape"),
+    (npy(np.zeros((6890, 3), dtype=np.int32)), "Expected a float array"),
+    (npy(np.zeros((6890, 3), dtype=np.float32))[:-4], "does not match the .npy header"),
+    (npy(np.asfortranarray(np.zeros((6890, 3), dtype=np.float32))), "Fortran-ordered"),
+    (npy(np.full((6890, 3), np.nan, dtype=np.float32)), "NaN or infinite"),
+    (b"\x93NUMPY\x01\x00\x10\x00{'descr': '<f4',}" + b"\x00" * 100, "Malformed .npy header"),
+    (b"\x93NUMPY\x01\x00\x10\x00{'descr': ((     \n" + b"\x00" * 100, "Malformed .npy header"),
+    (b"\x93NUMPY\x09\x00" + npy(np.zeros((6890, 3), dtype=np.float32))[8:], "unsupported format version 9.0"),
+])
+def test_decode_rejects(service, data, message):
+    with pytest.raises(VertsValidationError, match=message):
+        service.decode_verts(data)
+
+
+def two_people(rng, small=0, **results):
+    '''ROMP outputs of two people, person `small` the farther one, with a smaller box.'''
+    joints = rng.uniform(0, 1, (2, 54, 2)).astype(np.float32)
+    joints[small] = joints[small] * 50 + 300
+    joints[1 - small] = joints[1 - small] * 200 + 100
+    return {"verts": body_verts(rng, batch_size=2), "pj2d_org": joints, **results}
+
+
+@pytest.mark.parametrize("small", [0, 1])
+def test_primary_person_by_box_area(service, rng, small):
+    results = two_people(rng, small=small, cam=np.array([[2.0, 0, 0], [0.5, 0, 0]]))
+
+    boxes = service.person_boxes(results, 2)
+
+    assert boxes.shape == (2, 4)
+    sizes = boxes[:, 2:] - boxes[:, :2]
+    assert np.all(sizes[small] <= 50) and np.all(sizes[1 - small] > 150)
+    assert service.primary_person(results, 2) == 1 - small
+    np.testing.assert_array_equal(service.select_verts(results), results["verts"][1 - small])
+
+
+@pytest.mark.parametrize("pj2d_org", [None, np.zeros((3, 54, 2))])
+def test_primary_person_by_cam_scale(service, rng, pj2d_org):
+    results = {"verts": body_verts(rng, batch_size=2), "cam": np.array([[0.5, 0, 0], [0.9, 0, 0]])}
+    if pj2d_org is not None:
+        results["pj2d_org"] = pj2d_org
+
+    assert service.person_boxes(results, 2) is None
+    assert service.primary_person(results, 2) == 1
+
+
+def test_single_person(service, rng):
+    results = {"verts": body_verts(rng)}
+
+    assert service.primary_person(results, 1) == 0
+    np.testing.assert_array_equal(service.select_verts(results), results["verts"])
+
+
+NAMES = ["height", "neck", "waist_width"]
+
+
+def test_format_batch_follows_normalize_measurements(service):
+    values = np.array([[100.0, 20.0, np.nan], [200.0, 50.0, 80.0]], dtype=np.float32)
+
+    rows = service.format_batch(values, NAMES, [170.0, None])
+
+    assert rows == [{"neck": 34.0}, {"neck": 50.0, "waist_width": 80.0}]
+    assert rows[0] == service.normalize_measurements({"height": 100.0, "neck": 20.0, "waist_width": np.nan}, 170.0)
+
+
+@pytest.mark.parametrize("height", [np.nan, 0.0])
+def test_body_without_height(service, height):
+    values = np.array([[height, 20.0, 30.0], [100.0, 20.0, 30.0]], dtype=np.float32)
+
+    with pytest.raises(MeasurementExtractionError, match="height could not be measured"):
+        service.format_batch(values, NAMES, [170.0, 170.0])
+    with pytest.raises(MeasurementExtractionError, match="height could not be measured"):
+        service.normalize_measurements(dict(zip(NAMES, values[0])), 170.0)
+    with pytest.raises(MeasurementExtractionError, match="height could not be measured"):
+        service.normalize_measurements({"neck": 20.0}, 170.0)
+    assert service.format_batch(values, NAMES, [170.0, 170.0], skip_unmeasured=True) == [
+        None, {"neck": 34.0, "waist_width": 51.0}]
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+
+from romp_pipeline.api.services.result_cache import ResultCache
+
+RAW = {"height": 1.7, "waist_circumference": 0.8}
+
+
+def key(i):
+    return f"{i:02x}" * 32
+
+
+def test_lru_evicts_the_least_recently_used():
+    async def scenario():
+        cache = ResultCache(max_entries=2, disk_dir=None, ttl_s=60, version="v1")
+        await cache.put(key(1), RAW)
+        await cache.put(key(2), RAW)
+        assert await cache.get(key(1)) == RAW
+        await cache.put(key(3), RAW)
+        return [await cache.get(key(i)) for i in (1, 2, 3)], cache.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == [RAW, None, RAW]
+    assert stats["entries"] == 2
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_disabled_without_entries_or_disk():
+    cache = ResultCache(max_entries=0, disk_dir=None, ttl_s=60, version="v1")
+    assert not cache.enabled
+
+
+def test_disk_tier_outlives_the_process(tmp_path):
+    async def scenario():
+        await ResultCache(max_entries=2, disk_dir=str(tmp_path), ttl_s=60, version="v1").put(key(1), RAW)
+        restarted = ResultCache(max_entries=2, disk_dir=str(tmp_path), ttl_s=60, version="v1")
+        raw = await restarted.get(key(1))
+        return raw, restarted.stats()
+
+    raw, stats = asyncio.run(scenario())
+
+    assert raw == RAW
+    assert stats["disk_hits"] == 1
+    assert stats["entries"] == 1
+
+
+def test_disk_entries_expire_after_ttl(tmp_path):
+    async def scenario():
+        cache = ResultCache(max_entries=0, disk_dir=str(tmp_path), ttl_s=60, version="v1")
+        await cache.put(key(1), RAW)
+        await cache.put(key(2), RAW)
+
+        expired = time.time() - 120
+        os.utime(cache._path(key(1)), (expired, expired))
+        return await cache.get(key(1)), await cache.get(key(2)), cache._path(key(1)).exists()
+
+    expired, fresh, expired_kept = asyncio.run(scenario())
+
+    assert expired is None
+    assert fresh == RAW
+    assert not expired_kept
+
+
+def test_entries_of_other_definitions_are_ignored(tmp_path):
+    async def scenario():
+        await ResultCache(max_entries=0, disk_dir=str(tmp_path), ttl_s=60, version="v1").put(key(1), RAW)
+        return await ResultCache(max_entries=0, disk_dir=str(tmp_path), ttl_s=60, version="v2").get(key(1))
+
+    assert asyncio.run(scenario()) is None
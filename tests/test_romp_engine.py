@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from romp_pipeline.api.exceptions import ROMPProcessingError
+from romp_pipeline.api.services.romp_batcher import ROMPBatcher
+from romp_pipeline.api.services.romp_engine import ROMPEngine, _BatchedForward
+
+logger = logging.getLogger(__name__)
+
+
+def image(value):
+    '''A tiny image whose gray level identifies it; levels under 100 have no person.'''
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def fake_romp(monkeypatch):
+    '''simple_romp internals, enough for the batched forward: an image becomes its gray level.'''
+    utils = types.ModuleType("romp.utils")
+    utils.img_preprocess = lambda image: (torch.tensor([[float(image.mean())]]), f"pad-{image.mean():.0f}")
+    utils.convert_cam_to_3d_trans = lambda cam: cam * 2
+    utils.convert_tensor2numpy = lambda outputs: {
+        key: value.numpy() if isinstance(value, torch.Tensor) else value for key, value in outputs.items()}
+    post_parser = types.ModuleType("romp.post_parser")
+    post_parser.parsing_outputs = lambda center_maps, params_maps, parser: (
+        None if center_maps.item() < 0 else {"cam": params_maps.clone()})
+    post_parser.body_mesh_projection2image = lambda joints, cam, vertices, input2org_offsets: {
+        "pj2d_org": input2org_offsets}
+    monkeypatch.setitem(sys.modules, "romp", types.ModuleType("romp"))
+    monkeypatch.setitem(sys.modules, "romp.utils", utils)
+    monkeypatch.setitem(sys.modules, "romp.post_parser", post_parser)
+
+
+class FakeROMP:
+    '''The loaded romp.ROMP: a backbone for the batched forward and the single image __call__.'''
+
+    tdevice = "cpu"
+    centermap_parser = None
+
+    def __init__(self, **settings):
+        self.settings = SimpleNamespace(**{"onnx": False, "temporal_optimize": False, "render_mesh": False,
+                                           "calc_smpl": True, "root_align": False, **settings})
+        self.backbone_batches = []
+        self.single_images = []
+
+    def model(self, inputs):
+        self.backbone_batches.append(len(inputs))
+        return inputs - 100, torch.log(inputs) / np.log(1.1)
+
+    def smpl_parser(self, outputs, root_align):
+        return {**outputs, "verts": outputs["cam"] + 1, "joints": outputs["cam"] + 2}
+
+    def __call__(self, image):
+        self.single_images.append(float(image.mean()))
+        return None if image.mean() < 100 else {"cam": np.array([[image.mean()]])}
+
+
+def engine_with(model, logger=logger):
+    engine = ROMPEngine([])
+    engine._model = model
+    engine._batch_forward = _BatchedForward.create(model, logger)
+    return engine
+
+
+def test_batch_outputs_follow_image_order(fake_romp):
+    model = FakeROMP()
+    engine = engine_with(model)
+
+    results = engine.infer_batch([image(150), image(50), image(200)], logger)
+
+    assert model.backbone_batches == [3]
+    assert model.single_images == []
+    assert results[1] is None
+    for outputs, value in ((results[0], 150), (results[2], 200)):
+        np.testing.assert_allclose(outputs["cam"], [[value]], rtol=1e-5)
+        np.testing.assert_allclose(outputs["cam_trans"], [[2 * value]], rtol=1e-5)
+        np.testing.assert_allclose(outputs["verts"], [[value + 1]], rtol=1e-5)
+        assert outputs["pj2d_org"] == f"pad-{value}"
+
+
+@pytest.mark.parametrize("setting", ["onnx", "temporal_optimize", "render_mesh"])
+def test_single_image_only_settings_fall_back(fake_romp, setting):
+    model = FakeROMP(**{setting: True})
+    engine = engine_with(model)
+
+    results = engine.infer_batch([image(150), image(50)], logger)
+
+    assert engine._batch_forward is None
+    assert model.backbone_batches == []
+    assert model.single_images == [150.0, 50.0]
+    assert results[0]["cam"].item() == 150.0 and results[1] is None
+
+
+def test_missing_internals_fall_back(monkeypatch):
+    monkeypatch.setitem(sys.modules, "romp.post_parser", None)
+    model = FakeROMP()
+    engine = engine_with(model)
+
+    engine.infer_batch([image(150), image(160)], logger)
+
+    assert engine._batch_forward is None
+    assert model.single_images == [150.0, 160.0]
+
+
+def test_batcher_splits_at_max_size(fake_romp):
+    model = FakeROMP()
+    engine = engine_with(model)
+    values = [110, 50, 130, 140, 150]
+
+    async def scenario():
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batcher = ROMPBatcher(engine, executor, window_ms=50, max_size=2)
+            results = await asyncio.gather(*(batcher.infer(image(value), logger) for value in values),
+                                           return_exceptions=True)
+            await batcher.stop()
+            return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert sorted(model.backbone_batches) == [1, 2, 2]
+    assert (stats["batches"], stats["images"]) == (3, 5)
+    assert isinstance(results[1], ROMPProcessingError)
+    assert [results[i]["pj2d_org"] for i in (0, 2, 3, 4)] == ["pad-110", "pad-130", "pad-140", "pad-150"]
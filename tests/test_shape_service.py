@@ -0,0 +1,79 @@
+import asyncio
+import logging
+
+import pytest
+
+from romp_pipeline.api.exceptions import MeasurementExtractionError
+from romp_pipeline.api.services import shape_service
+from romp_pipeline.api.services.shape_service import ShapeService
+
+logger = logging.getLogger(__name__)
+
+
+class FakeMeasurementService:
+    async def run_in_pool(self, func, *args):
+        return func(*args)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(shape_service.settings, "SHAPE_BATCH_WINDOW_MS", 20)
+    monkeypatch.setattr(shape_service.settings, "SHAPE_BATCH_MAX_SIZE", 3)
+    service = ShapeService(FakeMeasurementService())
+    service.batches = []
+
+    def measure_batch(gender, batch, logger):
+        service.batches.append((gender, [item.betas[0] for item in batch]))
+        if any(item.betas[0] < 0 for item in batch):
+            raise ValueError("negative beta")
+        # a body whose height can't be measured
+        return [None if item.betas[0] == 99 else {"height": item.target_height, "beta": item.betas[0]}
+                for item in batch]
+
+    service._measure_batch = measure_batch
+    return service
+
+
+def run(service, *requests):
+    async def scenario():
+        try:
+            return await asyncio.gather(
+                *(service.measure(gender, [beta], height, logger) for gender, beta, height in requests),
+                return_exceptions=True)
+        finally:
+            await service.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_same_gender_shares_a_batch(service):
+    results = run(service, ("MALE", 1.0, 170.0), ("FEMALE", 2.0, 160.0), ("MALE", 3.0, 180.0))
+
+    assert sorted(service.batches) == [("FEMALE", [2.0]), ("MALE", [1.0, 3.0])]
+    assert results == [{"height": 170.0, "beta": 1.0},
+                       {"height": 160.0, "beta": 2.0},
+                       {"height": 180.0, "beta": 3.0}]
+
+
+def test_full_batch_is_flushed_before_the_window(service):
+    results = run(service, *(("NEUTRAL", float(beta), None) for beta in range(5)))
+
+    assert service.batches == [("NEUTRAL", [0.0, 1.0, 2.0]), ("NEUTRAL", [3.0, 4.0])]
+    assert [result["beta"] for result in results] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_failed_batch_fails_only_its_requests(service):
+    results = run(service, ("MALE", -1.0, 170.0), ("MALE", 1.0, 170.0), ("FEMALE", 2.0, 160.0))
+
+    assert isinstance(results[0], MeasurementExtractionError)
+    assert results[1] is results[0]
+    assert results[2] == {"height": 160.0, "beta": 2.0}
+
+
+def test_unmeasured_shape_fails_only_its_request(service):
+    results = run(service, ("MALE", 99.0, 170.0), ("MALE", 1.0, 170.0))
+
+    assert service.batches == [("MALE", [99.0, 1.0])]
+    assert isinstance(results[0], MeasurementExtractionError)
+    assert "height could not be measured" in results[0].message
+    assert results[1] == {"height": 170.0, "beta": 1.0}
@@ -0,0 +1,76 @@
+import logging
+
+import numpy as np
+import pytest
+
+from romp_pipeline.api.services import shape_service
+from romp_pipeline.api.services.measurement_service import MeasurementService
+from romp_pipeline.api.services.shape_service import ShapeService, _PendingShape
+from romp_pipeline.core import measure
+from romp_pipeline.core.measure import MeasureSMPL
+
+
+@pytest.fixture
+def betas(rng):
+    return rng.normal(0, 1, (4, 10)).astype(np.float32)
+
+
+def test_verts_and_joints(smpl_assets, betas):
+    shape_space = smpl_assets.shape_space
+
+    verts = shape_space.verts(betas)
+    joints = shape_space.joints(betas)
+
+    expected_verts = shape_space.v_template + np.einsum('nck,bk->bnc', shape_space.shapedirs, betas)
+    np.testing.assert_allclose(verts, expected_verts, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(joints, np.matmul(smpl_assets.J_regressor, verts), rtol=1e-5, atol=1e-6)
+
+
+def test_lengths_match_plan(smpl_assets, betas):
+    shape_space = smpl_assets.shape_space
+
+    lengths = shape_space.measure_lengths(betas)
+
+    expected = smpl_assets.plan.measure_lengths(shape_space.verts(betas))
+    np.testing.assert_allclose(lengths, expected, rtol=1e-4)
+
+
+def test_short_betas_are_padded(smpl_assets, betas):
+    shape_space = smpl_assets.shape_space
+    padded = np.concatenate([betas[:, :3], np.zeros((len(betas), 7), dtype=np.float32)], axis=1)
+
+    np.testing.assert_array_equal(shape_space.measure_lengths(betas[:, :3]),
+                                  shape_space.measure_lengths(padded))
+
+
+def test_too_many_betas(smpl_assets):
+    with pytest.raises(ValueError, match="betas need to be of dimension"):
+        smpl_assets.shape_space.verts(np.zeros((1, 11)))
+
+
+def test_measure_betas_matches_measure(smpl_assets, betas, monkeypatch):
+    monkeypatch.setattr(measure, "get_body_model_assets", lambda *args, **kwargs: smpl_assets)
+    measurer = MeasureSMPL(assets=smpl_assets)
+
+    values, names = measurer.measure_betas(betas, gender="NEUTRAL")
+
+    assert values.shape == (len(betas), len(names))
+    for body, body_values in zip(smpl_assets.shape_space.verts(betas), values):
+        body_measurer = MeasureSMPL(assets=smpl_assets)
+        body_measurer.from_verts(body)
+        body_measurer.measure(names)
+        np.testing.assert_allclose(body_values,
+                                   [body_measurer.measurements[name] for name in names],
+                                   rtol=1e-4)
+
+
+def test_shape_service_measures_betas(smpl_assets, betas, monkeypatch):
+    monkeypatch.setattr(measure, "get_body_model_assets", lambda *args, **kwargs: smpl_assets)
+    monkeypatch.setattr(shape_service, "get_body_model_assets", lambda *args, **kwargs: smpl_assets)
+    batch = [_PendingShape(list(body), 170.0, None) for body in betas]
+
+    results = ShapeService(MeasurementService())._measure_batch("NEUTRAL", batch, logging.getLogger(__name__))
+
+    values, names = MeasureSMPL(assets=smpl_assets).measure_betas(betas)
+    assert results == MeasurementService().format_batch(values, names, [170.0] * len(betas))
+    assert all(result["neck"] > 0 for result in results)
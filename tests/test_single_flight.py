@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from romp_pipeline.api.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        single_flight = SingleFlight()
+        calls = []
+
+        async def work(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key.upper()
+
+        results = await asyncio.gather(*(single_flight.do(key, lambda key=key: work(key))
+                                         for key in ["a", "a", "a", "b"]))
+        return results, calls, single_flight.stats()
+
+    results, calls, stats = asyncio.run(scenario())
+
+    assert results == ["A", "A", "A", "B"]
+    assert sorted(calls) == ["a", "b"]
+    assert stats == {"in_flight": 0, "leaders": 2, "shared": 2}
+
+
+def test_finished_work_runs_again():
+    async def scenario():
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        first = await single_flight.do("a", work)
+        second = await single_flight.do("a", work)
+        return first, second
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_errors_reach_every_caller():
+    async def scenario():
+        single_flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("no person detected")
+
+        results = await asyncio.gather(single_flight.do("a", work), single_flight.do("a", work),
+                                       return_exceptions=True)
+        return results, single_flight.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_work():
+    async def scenario():
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.ensure_future(single_flight.do("a", work))
+        follower = asyncio.ensure_future(single_flight.do("a", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        release.set()
+        return await follower, leader
+
+    result, leader = asyncio.run(scenario())
+
+    assert result == "done"
+    with pytest.raises(asyncio.CancelledError):
+        leader.result()
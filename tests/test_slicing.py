@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+import trimesh
+
+from romp_pipeline.core.measure import MeasureSMPL
+from romp_pipeline.core.slicing import slice_faces_with_plane, slice_faces_with_planes
+from romp_pipeline.core.utils import convex_hull_from_3D_points, filter_body_part_slices
+from conftest import body_verts
+
+
+def by_face(segments, faces):
+    '''Segments keyed by their face, with the two endpoints in a fixed order.'''
+    keyed = {}
+    for segment, face in zip(segments, faces):
+        order = np.lexsort(segment.T[::-1])
+        keyed[int(face)] = segment[order]
+    return keyed
+
+
+def assert_same_slices(segments, faces, expected_segments, expected_faces):
+    actual, expected = by_face(segments, faces), by_face(expected_segments, expected_faces)
+    assert actual.keys() == expected.keys()
+    for face, segment in expected.items():
+        np.testing.assert_allclose(actual[face], segment, atol=1e-9)
+
+
+def random_plane(verts, rng):
+    # off the vertices: a vertex exactly on the plane is counted in front
+    # of it, trimesh only slices its faces when an edge crosses the plane
+    origin = verts[rng.integers(len(verts))] + rng.normal(0, 1e-3, 3)
+    normal = np.array([0.0, 1.0, 0.0]) + rng.normal(0, 0.3, 3)
+    return origin, normal
+
+
+def test_slice_matches_trimesh(smpl_assets, rng):
+    verts = body_verts(rng).astype(np.float64)
+    mesh = trimesh.Trimesh(vertices=verts, faces=smpl_assets.faces, process=False)
+
+    for _ in range(10):
+        origin, normal = random_plane(verts, rng)
+        expected_segments, expected_faces = trimesh.intersections.mesh_plane(
+            mesh, plane_normal=normal, plane_origin=origin, return_faces=True)
+
+        segments, faces = slice_faces_with_plane(verts, smpl_assets.faces, origin, normal)
+
+        assert len(faces) > 0
+        assert_same_slices(segments, faces, expected_segments, expected_faces)
+
+
+def test_face_subset_matches_trimesh(smpl_assets, rng):
+    verts = body_verts(rng).astype(np.float64)
+    mesh = trimesh.Trimesh(vertices=verts, faces=smpl_assets.faces, process=False)
+    face_inds = np.flatnonzero(smpl_assets.face_labels == 0)
+    origin, normal = random_plane(verts, rng)
+
+    expected_segments, expected_faces = trimesh.intersections.mesh_plane(
+        mesh, plane_normal=normal, plane_origin=origin, return_faces=True)
+    in_subset = np.isin(expected_faces, face_inds)
+
+    segments, faces = slice_faces_with_plane(verts, smpl_assets.faces[face_inds], origin, normal,
+                                             face_inds=face_inds)
+
+    assert_same_slices(segments, faces, expected_segments[in_subset], expected_faces[in_subset])
+
+
+def test_plane_missing_the_mesh(smpl_assets, rng):
+    verts = body_verts(rng)
+
+    segments, faces = slice_faces_with_plane(verts, smpl_assets.faces,
+                                             plane_origin=np.array([0.0, 10.0, 0.0]),
+                                             plane_normal=np.array([0.0, 1.0, 0.0]))
+
+    assert segments.shape == (0, 2, 3)
+    assert faces.shape == (0,)
+
+
+def test_batch_matches_single(smpl_assets, rng):
+    verts = body_verts(rng, batch_size=3)
+    planes = [random_plane(body, rng) for body in verts]
+    origins = np.stack([origin for origin, _ in planes])
+    normals = np.stack([normal for _, normal in planes])
+
+    segments, faces, mesh_inds = slice_faces_with_planes(verts, smpl_assets.faces, origins, normals)
+
+    assert np.all(np.diff(mesh_inds) >= 0)
+    for i in range(len(verts)):
+        expected_segments, expected_faces = slice_faces_with_plane(verts[i], smpl_assets.faces,
+                                                                   origins[i], normals[i])
+        in_mesh = mesh_inds == i
+        assert_same_slices(segments[in_mesh], faces[in_mesh], expected_segments, expected_faces)
+
+
+def baseline_circumference(assets, verts, joints, name):
+    '''Circumference computed as Measurer.measure_circumference did before the slicer.'''
+    definition = assets.circumf_definitions[name]
+    landmark_inds = [assets.landmarks[landmark] for landmark in definition["LANDMARKS"]]
+    joint_1, joint_2 = (assets.joint2ind[joint] for joint in definition["JOINTS"])
+
+    mesh = trimesh.Trimesh(vertices=verts, faces=assets.faces)
+    segments, faces = trimesh.intersections.mesh_plane(mesh,
+                                                       plane_normal=joints[joint_1] - joints[joint_2],
+                                                       plane_origin=np.mean(verts[landmark_inds], axis=0),
+                                                       return_faces=True)
+    segments = filter_body_part_slices(segments, faces, name,
+                                       assets.circumf_2_bodypart, assets.face_segmentation)
+    hull = convex_hull_from_3D_points(segments)
+    return np.sum(np.linalg.norm(hull[:, 1] - hull[:, 0], axis=1)) * 100
+
+
+def test_circumferences_match_baseline(smpl_assets, rng):
+    verts = body_verts(rng).astype(np.float64)
+    measurer = MeasureSMPL(assets=smpl_assets)
+    measurer.from_verts(verts)
+
+    for name in smpl_assets.circumf_definitions:
+        expected = baseline_circumference(smpl_assets, verts, measurer.joints, name)
+        assert measurer.measure_circumference(name) == pytest.approx(expected, rel=1e-6)
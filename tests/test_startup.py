@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from romp_pipeline.api import startup
+
+logger = logging.getLogger(__name__)
+
+
+class FakeROMPService:
+    def __init__(self):
+        self.use_engine = False
+
+    def load_engine(self, logger):
+        self.use_engine = True
+        return True
+
+    def check_availability(self):
+        return True
+
+
+class FakeMeasurementService:
+    def load_assets(self, logger):
+        return True
+
+
+class FakeScheduler:
+    queue_size = 8
+
+    def start(self, workers):
+        self.workers = workers
+
+
+@pytest.fixture
+def romp_service(monkeypatch):
+    romp_service = FakeROMPService()
+    monkeypatch.setattr(startup, "get_romp_service", lambda: romp_service)
+    monkeypatch.setattr(startup, "get_measurement_service", FakeMeasurementService)
+    monkeypatch.setattr(startup, "get_inference_scheduler", FakeScheduler)
+    monkeypatch.setattr(startup.settings, "ROMP_BACKEND", "engine")
+    monkeypatch.setattr(startup.settings, "ROMP_CONCURRENCY", 2)
+    monkeypatch.setattr(startup.settings, "ROMP_BATCH_MAX_SIZE", 4)
+    return romp_service
+
+
+def test_engine_is_loaded(romp_service):
+    scheduler = startup.start_inference(logger)
+
+    assert romp_service.use_engine
+    assert scheduler.workers == 8
+
+
+def test_engine_is_left_to_the_queue_workers(romp_service):
+    scheduler = startup.start_inference(logger, load_engine=False)
+
+    assert not romp_service.use_engine
+    assert scheduler.workers == 2
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from romp_pipeline.api.services.verts_store import VertsStore
+from conftest import body_verts
+
+ENTRY_BYTES = 6890 * 3 * 4 + 128  # float32 data and the .npy header
+
+
+def key(i):
+    return f"{i:02x}" * 32
+
+
+def test_round_trip(tmp_path, rng):
+    store = VertsStore(str(tmp_path), max_bytes=10 * ENTRY_BYTES)
+    verts = body_verts(rng)
+
+    store.put(key(1), verts)
+    stored = store.get(key(1))
+
+    np.testing.assert_array_equal(stored, verts)
+    assert not stored.flags.writeable
+    assert store.get(key(2)) is None
+    assert store.stats() == {"entries": 1, "size_bytes": ENTRY_BYTES, "max_bytes": 10 * ENTRY_BYTES}
+
+
+def test_float16(tmp_path, rng):
+    store = VertsStore(str(tmp_path), max_bytes=10 * ENTRY_BYTES, dtype="float16")
+    verts = body_verts(rng)
+
+    store.put(key(1), verts)
+
+    assert store.get(key(1)).dtype == np.float16
+    np.testing.assert_allclose(store.get(key(1)), verts, atol=1e-3)
+
+
+def test_evicts_least_recently_used(tmp_path, rng):
+    store = VertsStore(str(tmp_path), max_bytes=2 * ENTRY_BYTES)
+    for i in (1, 2):
+        store.put(key(i), body_verts(rng))
+    store.get(key(1))
+
+    store.put(key(3), body_verts(rng))
+
+    assert list(store.keys()) == [key(1), key(3)]
+    assert not (tmp_path / key(2)[:2] / f"{key(2)}.npy").exists()
+    assert store.stats()["size_bytes"] == 2 * ENTRY_BYTES
+
+
+def test_keeps_an_entry_larger_than_max_bytes(tmp_path, rng):
+    store = VertsStore(str(tmp_path), max_bytes=ENTRY_BYTES // 2)
+
+    store.put(key(1), body_verts(rng))
+    store.put(key(2), body_verts(rng))
+
+    assert list(store.keys()) == [key(2)]
+
+
+def test_eviction_order_survives_restart(tmp_path, rng):
+    store = VertsStore(str(tmp_path), max_bytes=3 * ENTRY_BYTES)
+    for i in (1, 2, 3):
+        store.put(key(i), body_verts(rng))
+    # key 2 is the least recently used, then key 3
+    for i, age in ((1, 10), (2, 30), (3, 20)):
+        path = tmp_path / key(i)[:2] / f"{key(i)}.npy"
+        mtime = path.stat().st_mtime - age
+        os.utime(path, (mtime, mtime))
+
+    restarted = VertsStore(str(tmp_path), max_bytes=3 * ENTRY_BYTES)
+    assert len(restarted) == 3
+    restarted.put(key(4), body_verts(rng))
+
+    assert list(restarted.keys()) == [key(3), key(1), key(4)]
+
+
+@pytest.mark.parametrize("content", [b"", b"not an npy file"])
+def test_unreadable_entry_is_dropped(tmp_path, rng, content):
+    store = VertsStore(str(tmp_path), max_bytes=10 * ENTRY_BYTES)
+    store.put(key(1), body_verts(rng))
+    (tmp_path / key(1)[:2] / f"{key(1)}.npy").write_bytes(content)
+
+    assert store.get(key(1)) is None
+    assert key(1) not in store
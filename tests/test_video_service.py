@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+import cv2
+import numpy as np
+import pytest
+
+from romp_pipeline.api.services.inference_scheduler import InferenceScheduler
+from romp_pipeline.api.services.video_service import VideoService, _FrameReader
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def video(tmp_path):
+    '''A 25 frame clip whose frame i is filled with the gray level 10 * i.'''
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (32, 24))
+    for i in range(25):
+        writer.write(np.full((24, 32, 3), 10 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def frame_index(frame):
+    return int(round(frame.mean() / 10))
+
+
+class FakeROMPService:
+    '''Every frame is a person whose size is its index, no person on frames 10-19.'''
+
+    use_engine = True
+
+    def __init__(self):
+        self.batches = []
+
+    async def run_engine_batch(self, frames, logger):
+        indices = [frame_index(frame) for frame in frames]
+        self.batches.append(indices)
+        return [None if 10 <= i < 20 else {"index": i} for i in indices]
+
+
+class FakeMeasurementService:
+    async def run_in_pool(self, func, *args):
+        return func(*args)
+
+    def select_verts(self, results):
+        return np.full((6890, 3), results["index"], dtype=np.float32)
+
+    def measure_verts_batch(self, verts, target_heights, logger, skip_unmeasured=False):
+        # the height of frame 24 can't be measured
+        assert skip_unmeasured
+        return [None if body[0, 0] == 24 else {"height": height, "chest": float(body[0, 0])}
+                for body, height in zip(verts, target_heights)]
+
+
+@pytest.mark.parametrize("stride, max_frames, expected", [
+    (1, 100, list(range(25))),
+    (4, 100, [0, 4, 8, 12, 16, 20, 24]),
+    (3, 4, [0, 3, 6, 9]),
+])
+def test_frame_reader_sampling(video, stride, max_frames, expected):
+    reader = _FrameReader(video, stride, max_frames)
+    sampled = []
+    while True:
+        frames = reader.read(3)
+        if not frames:
+            break
+        assert len(frames) <= 3
+        sampled += [frame_index(frame) for frame in frames]
+    reader.close()
+
+    assert sampled == expected
+    assert reader.sampled == len(expected)
+    assert reader.decoded == (25 if max_frames >= len(expected) * stride else expected[-1] + 1)
+
+
+def test_measure_video(video, monkeypatch):
+    from romp_pipeline.api.services import video_service
+    monkeypatch.setattr(video_service.settings, "ROMP_BATCH_MAX_SIZE", 4)
+    romp_service = FakeROMPService()
+
+    async def scenario():
+        scheduler = InferenceScheduler(workers=1, queue_size=4)
+        service = VideoService(romp_service, FakeMeasurementService(), scheduler)
+        try:
+            return await service.measure_video(video, 170.0, 2, logger)
+        finally:
+            await scheduler.stop()
+
+    result = asyncio.run(scenario())
+
+    assert romp_service.batches == [[0, 2, 4, 6], [8, 10, 12, 14], [16, 18, 20, 22], [24]]
+    assert result["frames_decoded"] == 25
+    assert result["frames_sampled"] == 13
+    assert result["frames_measured"] == 7
+    assert result["frames_without_person"] == 5
+    # measured frames 0, 2, 4, 6, 8, 20, 22, too few for the trim to drop any
+    assert result["measurements"]["chest"] == {"median": 6.0, "trimmed_mean": 8.86, "frames": 7}
+
+
+def test_aggregate():
+    service = VideoService(None, None, None)
+    # 20 frames: 10%, two values, are trimmed at both ends, the outliers 0 and 300 with them
+    chest = [0.0] + [float(v) for v in range(90, 108)] + [100.0 * 3]
+    per_frame = [{"chest": value} for value in chest]
+    per_frame[0]["waist"] = 70.0
+    per_frame[1]["waist"] = 71.0
+
+    aggregates = service._aggregate(per_frame)
+
+    trimmed = sorted(chest)[2:-2]
+    assert aggregates["chest"] == {"median": round(float(np.median(chest)), 2),
+                                   "trimmed_mean": round(float(np.mean(trimmed)), 2),
+                                   "frames": 20}
+    assert aggregates["waist"] == {"median": 70.5, "trimmed_mean": 70.5, "frames": 2}
+    assert service._aggregate([]) == {}
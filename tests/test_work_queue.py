@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from romp_pipeline.api.exceptions import APIException, LoadSheddingError, ServiceOverloadedError
+from romp_pipeline.api.services.measure_pipeline import MeasurePipeline
+from romp_pipeline.api.services.work_queue import (
+    InMemoryWorkQueue,
+    SQLiteWorkQueue,
+    WorkItem,
+    WorkResult,
+    create_work_queue,
+)
+
+RAW = {"height": 1.7}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "memory":
+        queue = InMemoryWorkQueue(ttl_s=60)
+    else:
+        queue = SQLiteWorkQueue(str(tmp_path / "queue.db"), ttl_s=60)
+        queue.POLL_INTERVAL_S = 0.01
+    yield queue
+    queue.close()
+
+
+def item(item_id, **kwargs):
+    return WorkItem(item_id, item_id.encode(), f"hash-{item_id}", **kwargs)
+
+
+def test_claim_finish_wait(queue):
+    queue.submit(item("a"))
+    queue.submit(item("b"))
+    assert queue.depth() == 2
+
+    claimed = queue.claim(timeout=1)
+    assert (claimed.id, claimed.image, claimed.image_hash) == ("a", b"a", "hash-a")
+    assert queue.depth() == 1
+
+    queue.finish("a", WorkResult(raw=RAW))
+    assert queue.wait("a", timeout=1) == WorkResult(raw=RAW)
+    assert queue.claim(timeout=1).id == "b"
+    assert queue.depth() == 0
+
+
+def test_errors_are_delivered(queue):
+    queue.submit(item("a"))
+    queue.claim(timeout=1)
+
+    queue.finish("a", WorkResult(error="No person detected", status_code=422))
+
+    result = queue.wait("a", timeout=1)
+    assert (result.raw, result.error, result.status_code) == (None, "No person detected", 422)
+
+
+def test_claim_times_out(queue):
+    started = time.monotonic()
+    assert queue.claim(timeout=0.05) is None
+    assert time.monotonic() - started >= 0.05
+
+
+def test_wait_for_another_thread(queue):
+    def worker():
+        claimed = queue.claim(timeout=5)
+        time.sleep(0.05)
+        queue.finish(claimed.id, WorkResult(raw=RAW))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    queue.submit(item("a"))
+
+    assert queue.wait("a", timeout=5) == WorkResult(raw=RAW)
+    thread.join()
+
+
+def test_expired_items_are_not_claimed(queue):
+    queue.submit(item("old", enqueued_at=time.time() - 120))
+    queue.submit(item("new"))
+
+    assert queue.claim(timeout=1).id == "new"
+    assert queue.claim(timeout=0.05) is None
+
+
+def test_waited_out_item_is_not_claimed(queue):
+    queue.submit(item("a"))
+
+    assert queue.wait("a", timeout=0.05) is None
+    assert queue.claim(timeout=0.05) is None
+    assert queue.depth() == 0
+
+
+def test_result_of_abandoned_item_is_dropped(queue):
+    queue.submit(item("a"))
+    queue.claim(timeout=1)
+    assert queue.wait("a", timeout=0.05) is None
+
+    queue.finish("a", WorkResult(raw=RAW))
+
+    assert queue.wait("a", timeout=0.05) is None
+
+
+def test_in_memory_queue_forgets_finished_items():
+    queue = InMemoryWorkQueue(ttl_s=60)
+    for item_id in ("waited", "abandoned", "queued"):
+        queue.submit(item(item_id))
+    queue.claim(timeout=1)
+    queue.claim(timeout=1)
+    queue.finish("waited", WorkResult(raw=RAW))
+    queue.wait("waited", timeout=1)
+    queue.wait("abandoned", timeout=0.01)
+    queue.finish("abandoned", WorkResult(raw=RAW))
+    queue.wait("queued", timeout=0.01)
+
+    assert not queue._items
+    assert not queue._results
+    assert not queue._claimed
+    assert not queue._abandoned
+
+
+def test_sqlite_queue_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "queue.db")
+    api, worker = SQLiteWorkQueue(path, ttl_s=60), SQLiteWorkQueue(path, ttl_s=60)
+
+    api.submit(item("a"))
+    worker.finish(worker.claim(timeout=1).id, WorkResult(raw=RAW))
+
+    assert api.wait("a", timeout=1) == WorkResult(raw=RAW)
+    api.close()
+    worker.close()
+
+
+def test_serialization():
+    work_item = item("a")
+    assert WorkItem.from_bytes(work_item.to_bytes()) == work_item
+    result = WorkResult(error="No person detected", status_code=422)
+    assert WorkResult.from_json(result.to_json()) == result
+    result = WorkResult(error="Server is busy, retry later", status_code=429, headers={"Retry-After": "2"})
+    assert WorkResult.from_json(result.to_json()) == result
+
+
+@pytest.mark.parametrize("result, error_type, headers", [
+    (WorkResult(error="Server is busy, retry later", status_code=429, headers={"Retry-After": "2"}),
+     ServiceOverloadedError, {"Retry-After": "2"}),
+    (WorkResult(error="Server overloaded, request shed", status_code=503, headers={"Retry-After": "3"}),
+     LoadSheddingError, {"Retry-After": "3"}),
+    (WorkResult(error="No person detected", status_code=422), APIException, None),
+])
+def test_worker_errors_keep_their_type_and_headers(result, error_type, headers):
+    queue = InMemoryWorkQueue(ttl_s=60)
+    pipeline = MeasurePipeline(None, None, None, None, None, None, None, work_queue=queue)
+
+    def worker():
+        queue.finish(queue.claim(timeout=5).id, result)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    with pytest.raises(APIException) as raised:
+        asyncio.run(pipeline._compute_remote(b"image", "hash", logging.getLogger(__name__)))
+    thread.join()
+
+    assert type(raised.value) is error_type
+    assert (raised.value.message, raised.value.status_code) == (result.error, result.status_code)
+    assert raised.value.headers == headers
+
+
+def test_create_work_queue(tmp_path):
+    assert create_work_queue(None, "romp", ttl_s=60) is None
+    assert isinstance(create_work_queue("memory://", "romp", ttl_s=60), InMemoryWorkQueue)
+    sqlite_queue = create_work_queue(f"sqlite://{tmp_path}/queue.db", "romp", ttl_s=60)
+    assert isinstance(sqlite_queue, SQLiteWorkQueue)
+    assert sqlite_queue.path == f"{tmp_path}/queue.db"
+    sqlite_queue.close()
+    with pytest.raises(ValueError, match="Unsupported"):
+        create_work_queue("kafka://broker", "romp", ttl_s=60)